@@ -1 +1 @@
-python3.12 ./src/main.py
\ No newline at end of file
+python3.12 ./src/cli.py "${@:-sync}"
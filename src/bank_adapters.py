@@ -0,0 +1,164 @@
+import csv
+import importlib
+import os
+import pkgutil
+import pandas as pd
+
+from csv_schema import CsvSchema
+from normalize_names import NameCache, NameRules
+from project_enums import Bank
+from typing import Callable, Dict, FrozenSet, Iterator, List, NamedTuple, Optional, Tuple
+
+# Prefix of the modules that define a bank adapter, which are imported when the registry is first used
+ADAPTER_MODULE_PREFIX: str = 'clean_data_'
+
+class BankAdapter(NamedTuple):
+    """
+    Everything the pipeline needs to recognize and clean one bank's CSV export.
+
+    Attributes:
+        bank (Bank): The bank of the export.
+        header (List[str]): The column names of the export's header row, which identify its format.
+        schema (CsvSchema): The columns and dtypes read from the export.
+        name_rules (NameRules): The rules that standardize the export's transaction names.
+        name_cache (NameCache): The cache of names standardized with `name_rules` in this process.
+        clean (Callable[[str], pd.DataFrame]): Cleans a whole export, given its file path.
+        clean_chunks (Callable[[str, int], Iterator[pd.DataFrame]]): Cleans an export a given number of rows at a time.
+    """
+    bank: Bank
+    header: List[str]
+    schema: CsvSchema
+    name_rules: NameRules
+    name_cache: NameCache
+    clean: Callable[[str], pd.DataFrame]
+    clean_chunks: Callable[[str, int], Iterator[pd.DataFrame]]
+
+# Adapter of every bank, filled in by `register_adapter` as the adapter modules are imported
+_adapters: Dict[Bank, BankAdapter] = {}
+
+# Bank of every header signature, as the set of column names so the column order does not matter
+_signatures: Dict[FrozenSet[str], Bank] = {}
+
+# Whether the modules with the `ADAPTER_MODULE_PREFIX` have been imported
+_loaded: bool = False
+
+def register_adapter(adapter: BankAdapter) -> BankAdapter:
+    """
+    Adds a bank's adapter to the registry. Called by each adapter module when it is imported.
+
+    Args:
+        adapter (BankAdapter): The adapter to register.
+
+    Returns:
+        BankAdapter: The registered adapter, so modules can keep it as a constant.
+
+    Raises:
+        ValueError: If `adapter` is not of class BankAdapter, its schema reads columns that are not in its
+            header, or its bank or header signature is already registered by another adapter.
+    """
+    if not isinstance(adapter, BankAdapter):
+        raise ValueError('Arg: adapter must be of class BankAdapter')
+    if not set(adapter.schema.columns).issubset(adapter.header):
+        raise ValueError(f'Arg: adapter of {adapter.bank.value} must read only columns of its header')
+
+    signature: FrozenSet[str] = frozenset(adapter.header)
+    registered: Optional[BankAdapter] = _adapters.get(adapter.bank)
+    if registered is not None and registered is not adapter:
+        raise ValueError(f'Arg: adapter of {adapter.bank.value} is already registered')
+    if _signatures.get(signature, adapter.bank) != adapter.bank:
+        raise ValueError(f'Arg: header of {adapter.bank.value} is already registered by {_signatures[signature].value}')
+
+    _adapters[adapter.bank] = adapter
+    _signatures[signature] = adapter.bank
+    return adapter
+
+def get_adapter(bank: Bank) -> BankAdapter:
+    """
+    Looks up the adapter of a bank.
+
+    Args:
+        bank (Bank): The bank.
+
+    Returns:
+        BankAdapter: The bank's adapter.
+
+    Raises:
+        ValueError: If no adapter is registered for `bank`.
+    """
+    _load_adapters()
+    if bank not in _adapters:
+        raise ValueError(f'Arg: bank {bank} has no registered adapter')
+    return _adapters[bank]
+
+def read_header(csv_path: str) -> List[str]:
+    """
+    Reads the column names of a CSV file from its first line, without reading the rest of the file.
+
+    Args:
+        csv_path (str): The file path to the CSV file.
+
+    Returns:
+        List[str]: The column names, stripped of surrounding whitespace and any byte order mark.
+    """
+    with open(csv_path, newline='', encoding='utf-8-sig') as file:
+        first_line: str = file.readline()
+    return [column.strip() for column in next(csv.reader([first_line]), [])]
+
+def detect_bank(csv_path: str) -> Optional[Bank]:
+    """
+    Detects the bank of a CSV export by sniffing its header row.
+
+    Args:
+        csv_path (str): The file path to the CSV export.
+
+    Returns:
+        Bank: The bank whose adapter declares the same columns as the header, or None if no adapter does.
+    """
+    _load_adapters()
+    return _signatures.get(frozenset(read_header(csv_path)))
+
+def route_directory(input_dir: str) -> Tuple[List[Tuple[Bank, str]], List[str]]:
+    """
+    Detects the bank of every CSV export in a directory, reading only the first line of each file.
+
+    Args:
+        input_dir (str): The directory of the CSV exports.
+
+    Returns:
+        Tuple[List[Tuple[Bank, str]], List[str]]: The bank and file path of each recognized export, and
+            the file paths of the CSV files no adapter recognized, both sorted by file name.
+
+    Raises:
+        ValueError: If `input_dir` is not a valid string or directory.
+    """
+    if not input_dir or not isinstance(input_dir, str):
+        raise ValueError('Arg: input_dir must exist and be of type str')
+    if not os.path.isdir(input_dir):
+        raise ValueError('Arg: input_dir must be a valid directory')
+
+    inputs: List[Tuple[Bank, str]] = []
+    unrecognized: List[str] = []
+    csv_paths: List[str] = sorted(
+        entry.path for entry in os.scandir(input_dir) if entry.is_file() and entry.name.endswith('.csv')
+    )
+    for csv_path in csv_paths:
+        bank: Optional[Bank] = detect_bank(csv_path)
+        if bank is None:
+            unrecognized.append(csv_path)
+        else:
+            inputs.append((bank, csv_path))
+
+    return inputs, unrecognized
+
+def _load_adapters() -> None:
+    """
+    Imports every adapter module next to this one, each of which registers its bank's adapter.
+    """
+    global _loaded
+    if _loaded:
+        return
+
+    for module in pkgutil.iter_modules([os.path.dirname(os.path.abspath(__file__))]):
+        if module.name.startswith(ADAPTER_MODULE_PREFIX):
+            importlib.import_module(module.name)
+    _loaded = True
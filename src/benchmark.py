@@ -0,0 +1,287 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import pandas as pd
+
+from googleapiclient.discovery import build, Resource
+from googleapiclient.http import HttpMock
+from google_cloud import write_all_data
+from instrument import StageRecorder, record_stages
+from project_enums import Bank
+from synthetic_statements import write_statement
+from typing import Dict, List, Optional, Tuple
+from wrangle_data import wrangle_data
+
+# Statement sizes benchmarked when none are given, in rows per bank
+DEFAULT_SIZES: List[str] = ['10k', '100k']
+
+# Directory of the generated statements and the benchmark history
+BENCHMARK_DIR: str = './benchmarks'
+
+# Suffixes accepted in statement sizes and the number of rows they stand for
+_SIZE_SUFFIXES: dict = {'k': 1_000, 'M': 1_000_000}
+
+# Line of `python -X importtime` output: self and cumulative microseconds, then the indented module name
+_IMPORT_TIME_LINE: re.Pattern = re.compile(r'import time:\s+\d+ \|\s+(\d+) \| ( *)(\S+)')
+
+# Directory of the source modules, where the CLI is run from
+_SRC_DIR: str = os.path.dirname(os.path.abspath(__file__))
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """
+    Benchmarks every stage of the pipeline on synthetic statements of each bank.
+
+    For each size, a deterministic statement of that many rows is generated for every bank (and
+    reused by later runs), then the statements are wrangled and written to a mocked Google Sheets
+    API while every stage is recorded. The wall time, throughput and memory of each stage are
+    printed, compared with the previous run of the same size, and appended to a JSON lines history.
+
+    The cold start of every CLI command is measured with `python -X importtime` as well.
+
+    Args:
+        argv (List[str], optional): The command line arguments. Defaults to `sys.argv`.
+    """
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description=main.__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', nargs='+', default=DEFAULT_SIZES, help='rows per bank, e.g. 10k 100k 1M 10M')
+    parser.add_argument('--dir', default=BENCHMARK_DIR, help='directory of the statements and history')
+    parser.add_argument('--trace-memory', action='store_true', help='trace the peak Python memory of each stage')
+    parser.add_argument('--trace', help='write a Chrome trace of the last size to this .json file')
+    args: argparse.Namespace = parser.parse_args(argv)
+
+    history_path: str = os.path.join(args.dir, 'history.jsonl')
+    history: List[dict] = _read_history(history_path)
+
+    # Measure the import time of each CLI command once, on the statements of the first size
+    startup: Dict[str, float] = _startup(_statements(args.dir, _parse_size(args.sizes[0])), args.dir)
+
+    for size in args.sizes:
+        rows: int = _parse_size(size)
+        inputs: List[Tuple[Bank, str]] = _statements(args.dir, rows)
+
+        recorder, frame_mb = _run(inputs, args.dir, args.trace_memory)
+        result: dict = _result(rows, args.trace_memory, recorder, frame_mb)
+        result['startup'] = startup
+
+        # Compare with the last run of the same size, since tracing memory slows down every stage
+        previous: Optional[dict] = next((
+            entry for entry in reversed(history)
+            if entry['rows'] == rows and entry['trace_memory'] == args.trace_memory
+        ), None)
+        _print_result(result, previous)
+
+        # Append the result, so later runs can be compared with this one
+        with open(history_path, 'a') as file:
+            file.write(json.dumps(result) + '\n')
+        history.append(result)
+
+        if args.trace:
+            recorder.to_chrome_trace(args.trace)
+
+    print('\nCLI import time')
+    for command, seconds in startup.items():
+        print(f'  {command:<40} {seconds:>9.3f}s')
+
+def _parse_size(size: str) -> int:
+    """
+    Parses a statement size such as '100k' or '1M'.
+
+    Args:
+        size (str): The number of rows, optionally with a 'k' or 'M' suffix.
+
+    Returns:
+        int: The number of rows.
+
+    Raises:
+        ValueError: If `size` is not a positive number of rows.
+    """
+    multiplier: int = _SIZE_SUFFIXES.get(size[-1:], 1)
+    digits: str = size[:-1] if size[-1:] in _SIZE_SUFFIXES else size
+    if not digits.isdigit() or int(digits) <= 0:
+        raise ValueError('Arg: size must be a positive number of rows, optionally suffixed with k or M')
+    return int(digits) * multiplier
+
+def _statements(benchmark_dir: str, rows: int) -> List[Tuple[Bank, str]]:
+    """
+    Generates a statement of every bank with `rows` rows, unless an earlier run already did.
+
+    Args:
+        benchmark_dir (str): The directory of the generated statements.
+        rows (int): The number of rows of each statement.
+
+    Returns:
+        List[Tuple[Bank, str]]: The bank and file path of each statement.
+    """
+    inputs: List[Tuple[Bank, str]] = []
+    for bank in Bank:
+        csv_path: str = os.path.join(benchmark_dir, 'statements', f'{bank.value.lower()}_{rows}.csv')
+        if not os.path.exists(csv_path):
+            write_statement(bank, rows, csv_path)
+        inputs.append((bank, csv_path))
+    return inputs
+
+def _run(inputs: List[Tuple[Bank, str]], benchmark_dir: str, trace_memory: bool) -> Tuple[StageRecorder, float]:
+    """
+    Runs the pipeline on the statements while recording every stage.
+
+    Exports are cleaned in this process, without the cleaned export cache or the ledger, so
+    every stage does its full work. The Google Sheets API is mocked with a local response.
+
+    Args:
+        inputs (List[Tuple[Bank, str]]): The bank and file path of each statement.
+        benchmark_dir (str): The directory of the mocked API response.
+        trace_memory (bool): Whether to trace the peak Python memory of each stage.
+
+    Returns:
+        Tuple[StageRecorder, float]: The measurements of every stage, and the memory held by the wrangled
+            transactions in MB per million rows, counting the strings of text columns.
+    """
+    response_path: str = os.path.join(benchmark_dir, 'sheets_response.json')
+    with open(response_path, 'w') as file:
+        json.dump({'totalUpdatedCells': 0}, file)
+    service: Resource = build('sheets', 'v4', http=HttpMock(response_path, {'status': '200'}), static_discovery=True)
+
+    with record_stages(trace_memory) as recorder:
+        df: pd.DataFrame = wrangle_data(inputs, max_workers=1, cache_dir=None, ledger_dir=None)
+        write_all_data(service, 'benchmark', df)
+    return recorder, round(float(df.memory_usage(deep=True).sum()) / 1e6 / (len(df) / 1e6), 1)
+
+def _startup(inputs: List[Tuple[Bank, str]], benchmark_dir: str) -> Dict[str, float]:
+    """
+    Measures the time each CLI command spends importing modules, from a cold start.
+
+    Every command is run on the statements in a new interpreter with `-X importtime`. The 'sync'
+    command needs Google credentials, so only the import of its `main` module is measured, and
+    'watch' scans an empty inbox once without syncing.
+
+    Args:
+        inputs (List[Tuple[Bank, str]]): The bank and file path of each statement.
+        benchmark_dir (str): The directory of the files written by the commands.
+
+    Returns:
+        Dict[str, float]: The import seconds of each command.
+    """
+    startup_dir: str = os.path.abspath(os.path.join(benchmark_dir, 'startup'))
+    input_args: List[str] = [arg for bank, csv_path in inputs for arg in ('-i', bank.value, os.path.abspath(csv_path))]
+    cli: List[str] = [sys.executable, '-X', 'importtime', os.path.join(_SRC_DIR, 'cli.py')]
+    ledger_args: List[str] = ['--ledger-dir', os.path.join(startup_dir, 'ledger')]
+
+    # The 'watch' command scans an empty inbox once, so only its imports are measured
+    inbox_dir: str = os.path.join(startup_dir, 'inbox')
+    os.makedirs(inbox_dir, exist_ok=True)
+    commands: Dict[str, List[str]] = {
+        'help': cli + ['--help'],
+        'validate': cli + ['validate'] + input_args,
+        'categorize': cli + ['categorize', '--no-cache', '-o', os.path.join(startup_dir, 'categorized.parquet')] + input_args,
+        'ingest': cli + ['ingest', '--no-cache'] + ledger_args + input_args,
+        'export': cli + ['export', '-o', os.path.join(startup_dir, 'export.parquet')] + ledger_args,
+        'watch': cli + ['watch', '--once', '--no-sync', '--inbox', inbox_dir] + ledger_args,
+        'sync': [sys.executable, '-X', 'importtime', '-c', 'import main'],
+    }
+
+    startup: Dict[str, float] = {}
+    for command, arguments in commands.items():
+        stderr: str = subprocess.run(
+            arguments, cwd=_SRC_DIR, capture_output=True, text=True, check=True
+        ).stderr
+
+        # Sum the cumulative time of the modules imported at the top level, which includes their own imports
+        imports: List[re.Match] = [match for match in map(_IMPORT_TIME_LINE.match, stderr.splitlines()) if match]
+        startup[command] = round(sum(int(match.group(1)) for match in imports if len(match.group(2)) == 2) / 1e6, 4)
+
+    return startup
+
+def _result(rows: int, trace_memory: bool, recorder: StageRecorder, frame_mb: float) -> dict:
+    """
+    Summarizes the measurements of a run as one entry of the benchmark history.
+
+    Args:
+        rows (int): The number of rows of each statement.
+        trace_memory (bool): Whether the peak Python memory of each stage was traced.
+        recorder (StageRecorder): The measurements of every stage.
+        frame_mb (float): The memory held by the wrangled transactions in MB per million rows.
+
+    Returns:
+        dict: The run's metadata and the seconds, rows, throughput and memory of each stage.
+    """
+    summary: pd.DataFrame = recorder.summary()
+    stages: dict = {
+        name: {
+            'seconds': round(float(stage['total_seconds']), 4),
+            'rows_out': int(stage['rows_out']),
+            'rows_per_second': round(float(stage['rows_out'] / stage['total_seconds'])) if stage['total_seconds'] else None,
+            'max_rss_mb': round(float(stage['max_rss_bytes']) / 1e6, 1),
+            'peak_traced_mb': None if pd.isna(stage['max_peak_traced_bytes'])
+                else round(float(stage['max_peak_traced_bytes']) / 1e6, 1),
+        }
+        for name, stage in summary.iterrows()
+    }
+    return {
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'commit': _commit(),
+        'rows': rows,
+        'trace_memory': trace_memory,
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'frame_mb_per_million_rows': frame_mb,
+        'stages': stages,
+    }
+
+def _print_result(result: dict, previous: Optional[dict]) -> None:
+    """
+    Prints the measurements of each stage, slowest first, next to those of the previous run.
+
+    Args:
+        result (dict): The entry of this run.
+        previous (dict, optional): The entry of the previous run of the same size, if any.
+    """
+    print(f"\n{result['rows']:,} rows per bank at {result['commit'] or 'unknown commit'}")
+    line: str = f"  {'transactions in memory':<40} {result['frame_mb_per_million_rows']:>8.1f} MB per million rows"
+    if previous and previous.get('frame_mb_per_million_rows'):
+        line += f"  x{result['frame_mb_per_million_rows'] / previous['frame_mb_per_million_rows']:.2f} vs {previous['commit']}"
+    print(line)
+    for name, stage in result['stages'].items():
+        line = f"  {name:<40} {stage['seconds']:>9.3f}s {stage['rows_out']:>11,} rows {stage['max_rss_mb']:>8.1f} MB RSS"
+        if stage['peak_traced_mb'] is not None:
+            line += f" {stage['peak_traced_mb']:>8.1f} MB peak"
+        if previous and name in previous['stages'] and previous['stages'][name]['seconds']:
+            line += f"  x{stage['seconds'] / previous['stages'][name]['seconds']:.2f} vs {previous['commit']}"
+        print(line)
+
+def _read_history(history_path: str) -> List[dict]:
+    """
+    Reads the results of earlier benchmark runs.
+
+    Args:
+        history_path (str): The file path of the JSON lines history.
+
+    Returns:
+        List[dict]: The entry of each earlier run, oldest first.
+    """
+    if not os.path.exists(history_path):
+        os.makedirs(os.path.dirname(history_path) or '.', exist_ok=True)
+        return []
+    with open(history_path) as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+def _commit() -> Optional[str]:
+    """
+    Looks up the commit the benchmark runs on.
+
+    Returns:
+        str: The abbreviated hash of the checked out commit, or None outside of a git checkout.
+    """
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+if __name__ == '__main__':
+    main()
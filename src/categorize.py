@@ -1,6 +1,8 @@
+import numpy as np
 import pandas as pd
 
-from project_enums import Category, TransactionType
+from fuzzy_match import MerchantIndex
+from project_enums import Category
 
 # Mapping of transaction names to their respective categories
 transaction_dict: dict = {
@@ -29,78 +31,49 @@ transaction_dict: dict = {
     'INTERNET' : Category.UTILITIES
 }
 
-def _categorize_data_income(combined_df: pd.DataFrame) -> pd.DataFrame:
-    """
-    Categorizes income transactions in the given DataFrame.
-
-    This function filters transactions classified as 'CREDIT' and assigns them to 
-    the 'INCOME' category.
-
-    Args:
-        combined_df (pd.DataFrame): A DataFrame containing transaction data.
-
-    Returns:
-        pd.DataFrame: A DataFrame containing only income transactions with a 'Category' column set to 'INCOME'.
+# Categorical dtype of the 'Category' column, so category filters compare integer codes instead of strings
+CATEGORY_DTYPE: pd.CategoricalDtype = pd.CategoricalDtype([category.value for category in Category])
 
-    Raises:
-        ValueError: If the `combined_df` is empty or not of type `pd.DataFrame`.
-    """
-    if combined_df.empty or not isinstance(combined_df, pd.DataFrame):
-        raise ValueError('Arg: combined_df must not be empty and must be of class pd.DataFrame')
-
-    # Filter transactions classified as 'CREDIT' and set their category to 'INCOME'
-    income_df: pd.DataFrame = combined_df[combined_df['Transaction'] == TransactionType.CREDIT.value].copy()
-    income_df.loc[:, 'Category'] = Category.INCOME.value
+# Mapping of transaction names to the code of their category in `CATEGORY_DTYPE`
+_category_codes: dict = {
+    name: CATEGORY_DTYPE.categories.get_loc(category.value) for name, category in transaction_dict.items()
+}
 
-    return income_df
+# Blocked trigram index over the names of `transaction_dict`, used to categorize near-variants of known names
+_merchant_index: MerchantIndex = MerchantIndex(_category_codes)
 
-def _categorize_data_expenses(combined_df: pd.DataFrame) -> pd.DataFrame:
+def _category_lookup(names: pd.Series, fuzzy: bool = False) -> pd.Categorical:
     """
-    Categorizes expense transactions in the given DataFrame.
+    Looks up the category of each transaction based on its 'Name'.
 
-    This function filters transactions classified as 'DEBIT' and categorizes them 
-    based on predefined mappings in `transaction_dict`. Transactions not found 
-    in the dictionary are categorized as 'OTHER'.
+    This function maps each distinct name through `transaction_dict` once and expands the 
+    resulting category codes back to every transaction. Names not found are categorized as 'OTHER'.
+    With `fuzzy`, the distinct names not found are first matched against `_merchant_index`, so 
+    near-variants such as 'KING SOOPERS #123' get the category of 'KING SOOPERS'.
 
     Args:
-        combined_df (pd.DataFrame): A DataFrame containing transaction data.
+        names (pd.Series): The 'Name' column of the DataFrame containing transaction data.
+        fuzzy (bool): Whether to categorize names not found by their closest known name. Defaults to False.
 
     Returns:
-        pd.DataFrame: A DataFrame containing only expense transactions with a 'Category' column assigned.
+        pd.Categorical: The category of each transaction, with dtype `CATEGORY_DTYPE`.
 
     Raises:
-        ValueError: If the `combined_df` is empty or not of type `pd.DataFrame`.
+        ValueError: If `names` is not of type `pd.Series`.
     """
-    if combined_df.empty or not isinstance(combined_df, pd.DataFrame):
-        raise ValueError('Arg: combined_df must not be empty and must be of class pd.DataFrame')
+    if not isinstance(names, pd.Series):
+        raise ValueError('Arg: names must be of class pd.Series')
 
-    # Filter transactions classified as 'DEBIT' and categorize them based on `transaction_dict`
-    expenses_df: pd.DataFrame = combined_df[combined_df['Transaction'] == TransactionType.DEBIT.value].copy()
-    expenses_df.loc[:, 'Category'] = expenses_df.apply(_category_lookup, axis=1)
+    # Look up the category code of each distinct name, falling back to 'OTHER' if it is not in the dictionary
+    codes, uniques = pd.factorize(names, use_na_sentinel=False)
+    other: int = CATEGORY_DTYPE.categories.get_loc(Category.OTHER.value)
+    exact: pd.Series = pd.Series(uniques, dtype=object).map(_category_codes)
 
-    return expenses_df
+    # Only the distinct names without an exact match are matched fuzzily
+    if fuzzy:
+        unmatched: np.ndarray = exact.isna().to_numpy()
+        exact[unmatched] = _merchant_index.match(uniques[unmatched], default=other)
 
-def _category_lookup(row: pd.Series) -> str:
-    """
-    Looks up and assigns a category to a transaction based on its 'Name'.
-
-    This function checks the transaction's 'Name' in `transaction_dict` and returns 
-    the corresponding category. If not found, it assigns the category as 'OTHER'.
-
-    Args:
-        row (pd.DataFrame): A single row of the DataFrame containing transaction data.
-
-    Returns:
-        str: The category of the transaction.
-
-    Raises:
-        ValueError: If the `row` is empty or not of type `pd.DataFrame`.
-    """
-    if row.empty or not isinstance(row, pd.Series):
-        raise ValueError('Arg: row must not be empty and must be of class pd.DataFrame')
+    category_codes: np.ndarray = exact.fillna(other).to_numpy(dtype=np.int8)
 
-    # Check if the transaction name exists in the dictionary and assign its category
-    if row['Name'] in transaction_dict:
-        return transaction_dict[row['Name']].value
-    else:
-        return Category.OTHER.value
\ No newline at end of file
+    return pd.Categorical.from_codes(category_codes[codes], dtype=CATEGORY_DTYPE)
@@ -0,0 +1,143 @@
+import hashlib
+import importlib
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+from functools import lru_cache
+from instrument import stage
+from typing import Callable, List, Tuple
+
+# Directory of the cleaned data of each CSV export, one Feather file per export and rules version
+CACHE_DIR: str = './cache/cleaned'
+
+# Upper bound on the total size of the cache, beyond which the least recently used files are evicted
+MAX_CACHE_BYTES: int = 512 * 1024 * 1024
+
+# Modules shared by every cleaner, whose rules also decide the cleaned output
+_SHARED_MODULES: List[str] = ['csv_schema', 'normalize_names', 'project_enums']
+
+# Number of bytes read at a time when hashing a CSV export
+_READ_BYTES: int = 1024 * 1024
+
+@stage
+def cached_clean(cleaner: Callable[[str], pd.DataFrame], csv_path: str, cache_dir: str = CACHE_DIR) -> pd.DataFrame:
+    """
+    Cleans a CSV export with a bank's cleaning function, reusing the cleaned data of an earlier run if it exists.
+
+    The cache is content addressed: cleaned data is stored under a hash of the CSV file's bytes and
+    of the rules version, the source of the cleaner's module and the modules shared by every cleaner.
+    Renaming or moving an export still hits the cache, while editing the export or any cleaning
+    rule misses it. Cached data is stored as uncompressed Feather and read back memory-mapped.
+
+    Args:
+        cleaner (Callable[[str], pd.DataFrame]): The bank's cleaning function, such as `clean_data_fidelity`.
+        csv_path (str): The file path to the CSV file.
+        cache_dir (str): The directory of the cache. Defaults to `CACHE_DIR`.
+
+    Returns:
+        pd.DataFrame: The cleaned DataFrame, identical to calling `cleaner(csv_path)`.
+
+    Raises:
+        ValueError: If the `csv_path` is not a valid string or file path, or if `cache_dir` is not a valid string.
+    """
+    if not csv_path or not isinstance(csv_path, str):
+        raise ValueError('Arg: csv_path must exist and be of type str')
+    if not os.path.exists(csv_path):
+        raise ValueError('Arg: csv_path must be a valid file path')
+    if not cache_dir or not isinstance(cache_dir, str):
+        raise ValueError('Arg: cache_dir must exist and be of type str')
+
+    cache_path: str = os.path.join(cache_dir, f'{_cache_key(cleaner, csv_path)}.feather')
+
+    if os.path.exists(cache_path):
+        # Mark the file as recently used, since eviction removes the files used longest ago first
+        os.utime(cache_path)
+        return feather.read_table(cache_path, memory_map=True).to_pandas()
+
+    df: pd.DataFrame = cleaner(csv_path)
+
+    # Write to a temporary file first so a concurrent or interrupted run never reads a partial file
+    os.makedirs(cache_dir, exist_ok=True)
+    temp_path: str = f'{cache_path}.{os.getpid()}.tmp'
+    feather.write_feather(pa.Table.from_pandas(df, preserve_index=True), temp_path, compression='uncompressed')
+    os.replace(temp_path, cache_path)
+
+    return df
+
+def evict_cache(cache_dir: str = CACHE_DIR, max_bytes: int = MAX_CACHE_BYTES) -> int:
+    """
+    Evicts the least recently used files from the cache until it fits in `max_bytes`.
+
+    Args:
+        cache_dir (str): The directory of the cache. Defaults to `CACHE_DIR`.
+        max_bytes (int): The maximum total size of the cache in bytes. Defaults to `MAX_CACHE_BYTES`.
+
+    Returns:
+        int: The number of files evicted.
+
+    Raises:
+        ValueError: If `cache_dir` is not a valid string or `max_bytes` is not a non-negative int.
+    """
+    if not cache_dir or not isinstance(cache_dir, str):
+        raise ValueError('Arg: cache_dir must exist and be of type str')
+    if not isinstance(max_bytes, int) or max_bytes < 0:
+        raise ValueError('Arg: max_bytes must be a non-negative int')
+    if not os.path.isdir(cache_dir):
+        return 0
+
+    # Order the cached files from most to least recently used
+    entries: List[Tuple[float, int, str]] = sorted(
+        ((entry.stat().st_mtime, entry.stat().st_size, entry.path)
+         for entry in os.scandir(cache_dir) if entry.name.endswith('.feather')),
+        reverse=True
+    )
+
+    # Keep the most recently used files that fit in the budget and remove the rest
+    total_bytes: int = 0
+    evicted: int = 0
+    for _, size, path in entries:
+        total_bytes += size
+        if total_bytes > max_bytes:
+            os.remove(path)
+            evicted += 1
+
+    return evicted
+
+def _cache_key(cleaner: Callable[[str], pd.DataFrame], csv_path: str) -> str:
+    """
+    Builds the cache key of a CSV export cleaned by a bank's cleaning function.
+
+    Args:
+        cleaner (Callable[[str], pd.DataFrame]): The bank's cleaning function.
+        csv_path (str): The file path to the CSV file.
+
+    Returns:
+        str: The hex digest of the file's contents combined with the rules version of the cleaner.
+    """
+    digest = hashlib.sha256(_rules_version(cleaner.__module__, cleaner.__name__).encode())
+    with open(csv_path, 'rb') as file:
+        while block := file.read(_READ_BYTES):
+            digest.update(block)
+    return digest.hexdigest()
+
+@lru_cache(maxsize=None)
+def _rules_version(module_name: str, function_name: str) -> str:
+    """
+    Hashes the source of a cleaner's module and of the modules shared by every cleaner.
+
+    The hash is computed once per process, as the source does not change while the pipeline runs.
+
+    Args:
+        module_name (str): The name of the module defining the cleaning function.
+        function_name (str): The name of the cleaning function.
+
+    Returns:
+        str: The hex digest identifying the version of the cleaning rules.
+    """
+    digest = hashlib.sha256(f'{function_name}:{pd.__version__}'.encode())
+    for name in [module_name, *_SHARED_MODULES]:
+        with open(importlib.import_module(name).__file__, 'rb') as file:
+            digest.update(file.read())
+    return digest.hexdigest()
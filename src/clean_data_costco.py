@@ -1,10 +1,38 @@
+import numpy as np
 import os
 import pandas as pd
-import re
 
-from project_enums import PaidOff, TransactionName
-
-def clean_data_costco(csv_path: str) -> pd.DataFrame:
+from bank_adapters import BankAdapter, register_adapter
+from csv_schema import CsvSchema, read_csv, read_csv_chunks
+from instrument import stage
+from normalize_names import CARD_RULES, NameCache, NameRules, extend_rules, normalize_names
+from project_enums import Bank, PaidOff, TransactionName, TransactionType
+from typing import Iterator, Optional
+
+# Costco's name rules layered on top of the rules shared by card statements
+_NAME_RULES: NameRules = extend_rules(
+    CARD_RULES,
+    prefix_renames={
+        TransactionName.COMCAST.value: TransactionName.INTERNET.value,
+    },
+    substring_renames=[
+        ((TransactionName.WAX.value,), TransactionName.WAX.value),
+    ]
+)
+
+# Standardized names of the raw names this process has already cleaned with `_NAME_RULES`
+NAME_CACHE: NameCache = NameCache()
+
+# Columns and dtypes read from Costco's CSV export, skipping the 'Status' and 'Member Name' columns
+_SCHEMA: CsvSchema = CsvSchema(
+    columns=['Date', 'Description', 'Debit', 'Credit'],
+    dtypes={'Description': 'object', 'Debit': 'float64', 'Credit': 'float64'},
+    date_column='Date',
+    date_format='%m/%d/%Y'
+)
+
+@stage
+def clean_data_costco(csv_path: str, engine: Optional[str] = None) -> pd.DataFrame:
     """
     Cleans the Costco CSV file and standardizes the data for further processing.
 
@@ -13,6 +41,7 @@ def clean_data_costco(csv_path: str) -> pd.DataFrame:
 
     Args:
         csv_path (str): The file path to the Costco CSV file.
+        engine (str, optional): The CSV parser engine, 'c' or 'pyarrow'. Defaults to 'c'.
 
     Returns:
         pd.DataFrame: A cleaned DataFrame with standardized columns and values.
@@ -27,29 +56,26 @@ def clean_data_costco(csv_path: str) -> pd.DataFrame:
     if not csv_path.endswith('.csv'):
         raise ValueError('Arg: csv_path must be of file type .csv')
 
-    # Clean the CSV data
-    df: pd.DataFrame = _clean_csv(csv_path)
-
-    # Remove entries associated with Costco payments, as these are not considered transactions
-    df = df[df['Name'] != PaidOff.COSTCO_PAYMENT.value]
-
-    # Apply `_clean_transaction_name` to each row to standardize the 'Name' column
-    df['Name'] = df.apply(_clean_transaction_name, axis=1)
-
-    return df
+    # Read and clean the raw CSV data
+    return _clean_transactions(_clean_csv(read_csv(csv_path, _SCHEMA, engine)))
 
-def _clean_csv(csv_path: str) -> pd.DataFrame:
+def clean_data_costco_chunks(csv_path: str, chunksize: int) -> Iterator[pd.DataFrame]:
     """
-    Reads and cleans the raw CSV file, removing unnecessary columns and standardizing values.
+    Cleans the Costco CSV file in chunks of rows, yielding each cleaned chunk as it is read.
+
+    This function applies the same cleaning as `clean_data_costco` to `chunksize` rows at a time, 
+    so exports larger than memory can be processed.
 
     Args:
-        csv_path (str): The file path to the CSV file.
+        csv_path (str): The file path to the Costco CSV file.
+        chunksize (int): The number of raw rows read per chunk.
 
-    Returns:
-        pd.DataFrame: A cleaned DataFrame with updated column names and standardized values.
+    Yields:
+        pd.DataFrame: A cleaned DataFrame with standardized columns and values for each chunk.
 
     Raises:
-        ValueError: If the `csv_path` is not a valid string or file path, or if it is not a CSV file.
+        ValueError: If the `csv_path` is not a valid string or file path, if it is not a CSV file, 
+            or if `chunksize` is not a positive int.
     """
     if not csv_path or not isinstance(csv_path, str):
         raise ValueError('Arg: csv_path must exist and be of type str')
@@ -57,90 +83,71 @@ def _clean_csv(csv_path: str) -> pd.DataFrame:
         raise ValueError('Arg: csv_path must be a valid file path')
     if not csv_path.endswith('.csv'):
         raise ValueError('Arg: csv_path must be of file type .csv')
+    if not isinstance(chunksize, int) or chunksize <= 0:
+        raise ValueError('Arg: chunksize must be a positive int')
 
-    df: pd.DataFrame = pd.read_csv(csv_path)
-
-    # Drop unnecessary columns that do not contribute to financial analysis
-    df = df.drop(['Status', 'Member Name'], axis=1)
+    # Read the raw CSV data `chunksize` rows at a time and clean each chunk as it is read
+    for chunk in read_csv_chunks(csv_path, _SCHEMA, chunksize):
+        yield _clean_transactions(_clean_csv(chunk))
 
-    # Determine transaction type ('DEBIT' or 'CREDIT') based on values in 'Debit' column
-    df['Transaction'] = ['DEBIT' if not pd.isna(a) else 'CREDIT' for a in df['Debit']]
-
-    # Move 'Transaction' to the second column for better organization
-    col = df.pop('Transaction')
-    df.insert(1, 'Transaction', col)
+@stage
+def _clean_transactions(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Removes specific entries and standardizes the values of cleaned Costco data.
 
-    # Rename 'Description' to 'Name' for consistency in naming conventions
-    df = df.rename(columns={'Description': 'Name'})
+    Args:
+        df (pd.DataFrame): A DataFrame returned by `_clean_csv`.
 
-    # Calculate 'Amount' based on 'Debit' or the negative of the value in 'Credit' for consistency
-    df['Amount'] = [a if not pd.isna(a) else b * -1 for a, b in zip(df['Debit'], df['Credit'])]
+    Returns:
+        pd.DataFrame: A cleaned DataFrame with standardized columns and values.
+    """
+    # Remove entries associated with Costco payments, as these are not considered transactions
+    df = df[df['Name'] != PaidOff.COSTCO_PAYMENT.value]
 
-    # Drop the 'Debit' and 'Credit' columns, as their information has been consolidated into 'Amount'
-    df = df.drop(['Debit', 'Credit'], axis=1)
+    # Standardize the 'Name' column a whole column at a time
+    df['Name'] = normalize_names(df['Name'], _NAME_RULES, NAME_CACHE)
 
     return df
 
-def _clean_transaction_name(row: pd.Series) -> str:
+@stage
+def _clean_csv(df: pd.DataFrame) -> pd.DataFrame:
     """
-    Cleans and standardizes transaction names based on predefined patterns.
+    Cleans the raw CSV data, consolidating columns and standardizing values.
 
     Args:
-        row (pd.DataFrame): A single row of the DataFrame containing transaction data.
+        df (pd.DataFrame): The raw data read from the CSV file, or a chunk of it.
 
     Returns:
-        str: A standardized transaction name.
-
-    Raises:
-        ValueError: If the `row` is empty or not of type `pd.DataFrame`.
+        pd.DataFrame: A cleaned DataFrame with updated column names and standardized values.
     """
-    if row.empty or not isinstance(row, pd.Series):
-        raise ValueError('Arg: row must not be empty and must be of class pd.DataFrame')
-
-    name: str = row['Name']
-
-    # Remove unwanted characters and extract the meaningful portion of the name
-    result = re.split(r'[*#\d\.-]', name)
-
-    # Match transaction names with predefined patterns for standardization
-    match result[0]:
-        case TransactionName.PAYPAL.value:
-            # Strip trailing whitespace for consistency
-            name = result[1].rstrip()
-            # Rename Starbucks shorthand to standard format
-            if name == TransactionName.STARBUCKSSE.value:
-                name = TransactionName.STARBUCKS.value
-
-        case TransactionName.CPI.value:
-            name = TransactionName.VENDING_MACHINE.value
-
-        case TransactionName.VC.value:
-            name = TransactionName.VET.value
+    # Determine transaction type ('DEBIT' or 'CREDIT') based on values in 'Debit' column
+    df['Transaction'] = pd.Categorical(
+        np.where(df['Debit'].isna(), TransactionType.CREDIT.value, TransactionType.DEBIT.value)
+    )
 
-        case TransactionName.SQ.value:
-            # Strip trailing whitespace and standardize the groomer's name
-            name = result[1].rstrip()
-            if name == TransactionName.A_CLIP_ABOVE.value:
-                name = TransactionName.GROOMER.value
+    # Move 'Transaction' to the second column for better organization
+    col = df.pop('Transaction')
+    df.insert(1, 'Transaction', col)
 
-        case TransactionName.COMCAST.value:
-            name = TransactionName.INTERNET.value
+    # Rename 'Description' to 'Name' for consistency in naming conventions
+    df = df.rename(columns={'Description': 'Name'})
 
-        case TransactionName.AMAZON_PRIME.value:
-            # Ensure Amazon Prime is consistently capitalized
-            name = TransactionName.AMAZON_PRIME.value.upper()
+    # Calculate 'Amount' based on 'Debit' or the negative of the value in 'Credit' for consistency
+    df['Amount'] = [a if not pd.isna(a) else b * -1 for a, b in zip(df['Debit'], df['Credit'])]
 
-        case _:
-            # Use the first extracted portion, stripping trailing whitespace and converting to uppercase
-            name = result[0].rstrip().upper()
+    # Drop the 'Debit' and 'Credit' columns, as their information has been consolidated into 'Amount'
+    df = df.drop(['Debit', 'Credit'], axis=1)
 
-            # Check if the name contains any substring related to 'Amazon' and standardize it
-            for substring in TransactionName.AMAZON.value:
-                if substring in name:
-                    name = TransactionName.AMAZON.value[0]
 
-            # Standardize wax-related transactions
-            if TransactionName.WAX.value in name:
-                name = TransactionName.WAX.value
+    return df
 
-    return name
\ No newline at end of file
+# Adapter routing Costco exports, recognized by their header row, to the cleaners of this module
+ADAPTER: BankAdapter = register_adapter(BankAdapter(
+    bank=Bank.COSTCO,
+    header=['Status', 'Date', 'Description', 'Debit', 'Credit', 'Member Name'],
+    schema=_SCHEMA,
+    name_rules=_NAME_RULES,
+    name_cache=NAME_CACHE,
+    clean=clean_data_costco,
+    clean_chunks=clean_data_costco_chunks
+))
@@ -1,10 +1,34 @@
 import os
 import pandas as pd
-import re
 
-from project_enums import PaidOff, TransactionName, TransactionType
-
-def clean_data_fidelity(csv_path: str) -> pd.DataFrame:
+from bank_adapters import BankAdapter, register_adapter
+from csv_schema import CsvSchema, read_csv, read_csv_chunks
+from instrument import stage
+from normalize_names import CARD_RULES, NameCache, NameRules, extend_rules, normalize_names
+from project_enums import Bank, PaidOff, TransactionName, TransactionType
+from typing import Iterator, Optional
+
+# Fidelity's name rules layered on top of the rules shared by card statements
+_NAME_RULES: NameRules = extend_rules(
+    CARD_RULES,
+    substring_renames=[
+        ((TransactionName.COSTCO.value,), TransactionName.COSTCO.value),
+    ]
+)
+
+# Standardized names of the raw names this process has already cleaned with `_NAME_RULES`
+NAME_CACHE: NameCache = NameCache()
+
+# Columns and dtypes read from Fidelity's CSV export, skipping the 'Memo' column
+_SCHEMA: CsvSchema = CsvSchema(
+    columns=['Date', 'Transaction', 'Name', 'Amount'],
+    dtypes={'Transaction': 'category', 'Name': 'object', 'Amount': 'float64'},
+    date_column='Date',
+    date_format='%Y-%m-%d'
+)
+
+@stage
+def clean_data_fidelity(csv_path: str, engine: Optional[str] = None) -> pd.DataFrame:
     """
     Cleans the Fidelity CSV file and standardizes the data for further processing.
 
@@ -13,6 +37,7 @@ def clean_data_fidelity(csv_path: str) -> pd.DataFrame:
 
     Args:
         csv_path (str): The file path to the Fidelity CSV file.
+        engine (str, optional): The CSV parser engine, 'c' or 'pyarrow'. Defaults to 'c'.
 
     Returns:
         pd.DataFrame: A cleaned DataFrame with standardized columns and values.
@@ -28,38 +53,25 @@ def clean_data_fidelity(csv_path: str) -> pd.DataFrame:
         raise ValueError('Arg: csv_path must be of file type .csv')
 
     # Read and clean the raw CSV data
-    df: pd.DataFrame = _clean_csv(csv_path)
-
-    # Truncate 'Name' column to a maximum of 22 characters for consistency
-    df['Name'] = df['Name'].str[:22]
-
-    # Remove specific entries marked as payments to Fidelity
-    df = df[df['Name'] != PaidOff.FIDELITY_PAYMENT.value]
+    return _clean_transactions(read_csv(csv_path, _SCHEMA, engine))
 
-    # Apply `_fix_date` to each row to standardize the date format
-    df['Date'] = df.apply(_fix_date, axis=1)
-
-    # Apply `_fix_amount` to each row to correct negative amounts for debits
-    df['Amount'] = df.apply(_fix_amount, axis=1)
-
-    # Apply `_clean_transaction_name` to each row to standardize the 'Name' column
-    df['Name'] = df.apply(_clean_transaction_name, axis=1)
-
-    return df
-
-
-def _clean_csv(csv_path: str) -> pd.DataFrame:
+def clean_data_fidelity_chunks(csv_path: str, chunksize: int) -> Iterator[pd.DataFrame]:
     """
-    Reads and cleans the raw CSV file, removing unnecessary columns.
+    Cleans the Fidelity CSV file in chunks of rows, yielding each cleaned chunk as it is read.
+
+    This function applies the same cleaning as `clean_data_fidelity` to `chunksize` rows at a time, 
+    so exports larger than memory can be processed.
 
     Args:
-        csv_path (str): The file path to the CSV file.
+        csv_path (str): The file path to the Fidelity CSV file.
+        chunksize (int): The number of raw rows read per chunk.
 
-    Returns:
-        pd.DataFrame: A cleaned DataFrame with unnecessary columns removed.
+    Yields:
+        pd.DataFrame: A cleaned DataFrame with standardized columns and values for each chunk.
 
     Raises:
-        ValueError: If the `csv_path` is not a valid string or file path, or if it is not a CSV file.
+        ValueError: If the `csv_path` is not a valid string or file path, if it is not a CSV file, 
+            or if `chunksize` is not a positive int.
     """
     if not csv_path or not isinstance(csv_path, str):
         raise ValueError('Arg: csv_path must exist and be of type str')
@@ -67,32 +79,38 @@ def _clean_csv(csv_path: str) -> pd.DataFrame:
         raise ValueError('Arg: csv_path must be a valid file path')
     if not csv_path.endswith('.csv'):
         raise ValueError('Arg: csv_path must be of file type .csv')
+    if not isinstance(chunksize, int) or chunksize <= 0:
+        raise ValueError('Arg: chunksize must be a positive int')
 
-    df = pd.read_csv(csv_path)
+    # Read the raw CSV data `chunksize` rows at a time and clean each chunk as it is read
+    for chunk in read_csv_chunks(csv_path, _SCHEMA, chunksize):
+        yield _clean_transactions(chunk)
 
-    # Drop the 'Memo' column as it does not contribute to financial analysis
-    return df.drop('Memo', axis=1)
-
-def _fix_date(row: pd.Series) -> str:
+@stage
+def _clean_transactions(df: pd.DataFrame) -> pd.DataFrame:
     """
-    Fixes the date format to MM/DD/YYYY for consistency.
+    Removes specific entries and standardizes the values of cleaned Fidelity data.
 
     Args:
-        row (pd.DataFrame): A single row of the DataFrame containing transaction data.
+        df (pd.DataFrame): The raw data read from the CSV file, or a chunk of it.
 
     Returns:
-        str: The formatted date as a string in MM/DD/YYYY format.
-
-    Raises:
-        ValueError: If the `row` is empty or not of type `pd.DataFrame`.
+        pd.DataFrame: A cleaned DataFrame with standardized columns and values.
     """
+    # Truncate 'Name' column to a maximum of 22 characters for consistency
+    df['Name'] = df['Name'].str[:22]
 
-    if row.empty or not isinstance(row, pd.Series):
-        raise ValueError('Arg: row must not be empty and must be of class pd.DataFrame')
+    # Remove specific entries marked as payments to Fidelity
+    df = df[df['Name'] != PaidOff.FIDELITY_PAYMENT.value]
+
+    # Apply `_fix_amount` to each row to correct negative amounts for debits
+    df['Amount'] = df.apply(_fix_amount, axis=1)
+
+    # Standardize the 'Name' column a whole column at a time
+    df['Name'] = normalize_names(df['Name'], _NAME_RULES, NAME_CACHE)
+
+    return df
 
-    date: pd.Timestamp = pd.to_datetime(row['Date'], format='%Y-%m-%d')
-    return date.strftime('%m/%d/%Y')
-    
 def _fix_amount(row: pd.Series) -> float:
     """
     Adjusts the 'Amount' value based on the transaction type.
@@ -114,64 +132,14 @@ def _fix_amount(row: pd.Series) -> float:
     if row['Transaction'] == TransactionType.DEBIT.value:
         return row['Amount'] * -1
     return row['Amount']
-    
-def _clean_transaction_name(row: pd.Series) -> str:
-    """
-    Cleans and standardizes transaction names based on predefined patterns.
-
-    Args:
-        row (pd.DataFrame): A single row of the DataFrame containing transaction data.
-
-    Returns:
-        str: A standardized transaction name.
-
-    Raises:
-        ValueError: If the `row` is empty or not of type `pd.DataFrame`.
-    """
-    if row.empty or not isinstance(row, pd.Series):
-        raise ValueError('Arg: row must not be empty and must be of class pd.DataFrame')
 
-    name: str = row['Name']
-
-    # Remove unwanted characters and extract the meaningful portion of the name
-    result = re.split(r'[*#\d\.-]', name)
-
-    # Match transaction names with predefined patterns for standardization
-    match result[0]:
-        case TransactionName.PAYPAL.value:
-            # Strip trailing whitespace for consistency
-            name = result[1].rstrip()
-            # Rename Starbucks shorthand to standard format
-            if name == TransactionName.STARBUCKSSE.value:
-                name = TransactionName.STARBUCKS.value
-
-        case TransactionName.CPI.value:
-            name = TransactionName.VENDING_MACHINE.value
-
-        case TransactionName.VC.value:
-            name = TransactionName.VET.value
-
-        case TransactionName.SQ.value:
-            # Strip trailing whitespace and standardize the groomer's name
-            name = result[1].rstrip()
-            if name == TransactionName.A_CLIP_ABOVE.value:
-                name = TransactionName.GROOMER.value
-
-        case TransactionName.AMAZON_PRIME.value:
-            # Ensure Amazon Prime is consistently capitalized
-            name = TransactionName.AMAZON_PRIME.value.upper()
-
-        case _:
-            # Use the first extracted portion, stripping trailing whitespace and converting to uppercase
-            name = result[0].rstrip().upper()
-
-            # Check if the name contains any substring related to 'Amazon' and standardize it
-            for substring in TransactionName.AMAZON.value:
-                if substring in name:
-                    name = TransactionName.AMAZON.value[0]
-
-            # Standardize Costco-related transactions
-            if TransactionName.COSTCO.value in name:
-                name = TransactionName.COSTCO.value
-            
-    return name
\ No newline at end of file
+# Adapter routing Fidelity exports, recognized by their header row, to the cleaners of this module
+ADAPTER: BankAdapter = register_adapter(BankAdapter(
+    bank=Bank.FIDELITY,
+    header=['Date', 'Transaction', 'Name', 'Memo', 'Amount'],
+    schema=_SCHEMA,
+    name_rules=_NAME_RULES,
+    name_cache=NAME_CACHE,
+    clean=clean_data_fidelity,
+    clean_chunks=clean_data_fidelity_chunks
+))
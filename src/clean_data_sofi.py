@@ -1,11 +1,41 @@
+import numpy as np
 import os
 import pandas as pd
-import re
 
-from project_enums import TransactionName, TransactionType
-from typing import List
-
-def clean_data_sofi(csv_path: str) -> pd.DataFrame:
+from bank_adapters import BankAdapter, register_adapter
+from csv_schema import CsvSchema, read_csv, read_csv_chunks
+from instrument import stage
+from normalize_names import EMPTY_RULES, NameCache, NameRules, extend_rules, normalize_names
+from project_enums import Bank, TransactionName, TransactionType
+from typing import Iterator, List, Optional
+
+# SoFi's name rules, which share nothing with card statements and match against uppercased names
+_NAME_RULES: NameRules = extend_rules(
+    EMPTY_RULES,
+    prefix_renames={
+        TransactionName.ENT_CU.value: TransactionName.CAR_PAYMENT.value,
+        TransactionName.STRATFORD.value: TransactionName.RENT.value,
+        TransactionName.DHHA.value: TransactionName.DENVER_HEALTH.value,
+        TransactionName.AH.value: TransactionName.ADVENT.value,
+        TransactionName.INTEREST_EARNED.value: TransactionName.INTEREST.value,
+        TransactionName.HEALTH_ONE.value: TransactionName.SWEDISH.value,
+    },
+    uppercase_first=True
+)
+
+# Standardized names of the raw names this process has already cleaned with `_NAME_RULES`
+NAME_CACHE: NameCache = NameCache()
+
+# Columns and dtypes read from SoFi's CSV export, skipping the 'Current balance' and 'Status' columns
+_SCHEMA: CsvSchema = CsvSchema(
+    columns=['Date', 'Description', 'Type', 'Amount'],
+    dtypes={'Description': 'object', 'Type': 'category', 'Amount': 'float64'},
+    date_column='Date',
+    date_format='%Y-%m-%d'
+)
+
+@stage
+def clean_data_sofi(csv_path: str, engine: Optional[str] = None) -> pd.DataFrame:
     """
     Cleans the SoFi CSV file and standardizes the data for further processing.
 
@@ -14,6 +44,7 @@ def clean_data_sofi(csv_path: str) -> pd.DataFrame:
 
     Args:
         csv_path (str): The file path to the SoFi CSV file.
+        engine (str, optional): The CSV parser engine, 'c' or 'pyarrow'. Defaults to 'c'.
 
     Returns:
         pd.DataFrame: A cleaned DataFrame with standardized columns and values.
@@ -29,25 +60,25 @@ def clean_data_sofi(csv_path: str) -> pd.DataFrame:
         raise ValueError('Arg: csv_path must be of file type .csv')
 
     # Read and clean the raw CSV data
-    df: pd.DataFrame = _clean_csv(csv_path)
+    return _clean_transactions(_clean_csv(read_csv(csv_path, _SCHEMA, engine)))
 
-    # Apply `_clean_name` to each row to standardize 'Transaction', 'Name', and 'Amount' columns
-    df[['Transaction', 'Name', 'Amount']] = df.apply(_clean_name, axis=1).apply(pd.Series)
-    
-    return df
-
-def _clean_csv(csv_path: str) -> pd.DataFrame:
+def clean_data_sofi_chunks(csv_path: str, chunksize: int) -> Iterator[pd.DataFrame]:
     """
-    Reads and cleans the raw CSV file, removing unnecessary data and standardizing columns.
+    Cleans the SoFi CSV file in chunks of rows, yielding each cleaned chunk as it is read.
+
+    This function applies the same cleaning as `clean_data_sofi` to `chunksize` rows at a time, 
+    so exports larger than memory can be processed.
 
     Args:
-        csv_path (str): The file path to the CSV file.
+        csv_path (str): The file path to the SoFi CSV file.
+        chunksize (int): The number of raw rows read per chunk.
 
-    Returns:
-        pd.DataFrame: A cleaned DataFrame with updated column names and standardized values.
+    Yields:
+        pd.DataFrame: A cleaned DataFrame with standardized columns and values for each chunk.
 
     Raises:
-        ValueError: If the `csv_path` is not a valid string or file path, or if it is not a CSV file.
+        ValueError: If the `csv_path` is not a valid string or file path, if it is not a CSV file, 
+            or if `chunksize` is not a positive int.
     """
     if not csv_path or not isinstance(csv_path, str):
         raise ValueError('Arg: csv_path must exist and be of type str')
@@ -55,12 +86,54 @@ def _clean_csv(csv_path: str) -> pd.DataFrame:
         raise ValueError('Arg: csv_path must be a valid file path')
     if not csv_path.endswith('.csv'):
         raise ValueError('Arg: csv_path must be of file type .csv')
+    if not isinstance(chunksize, int) or chunksize <= 0:
+        raise ValueError('Arg: chunksize must be a positive int')
 
-    df: pd.DataFrame = pd.read_csv(csv_path)
-    
-    # Drop columns that are not needed for analysis
-    df.drop(['Current balance', 'Status'], axis=1, inplace=True)
-    
+    # Read the raw CSV data `chunksize` rows at a time and clean each chunk as it is read
+    for chunk in read_csv_chunks(csv_path, _SCHEMA, chunksize):
+        yield _clean_transactions(_clean_csv(chunk))
+
+@stage
+def _clean_transactions(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Removes specific entries and standardizes the values of cleaned SoFi data.
+
+    Args:
+        df (pd.DataFrame): A DataFrame returned by `_clean_csv`.
+
+    Returns:
+        pd.DataFrame: A cleaned DataFrame with standardized columns and values.
+    """
+    # Standardize the transaction type, treating direct deposits and earned interest as income
+    is_credit: pd.Series = (
+        (df['Transaction'] == TransactionName.DIRECT_DEPOSIT.value) |
+        (df['Transaction'].str.upper() == TransactionName.INTEREST_EARNED.value)
+    )
+    df['Transaction'] = pd.Categorical(np.where(is_credit, TransactionType.CREDIT.value, TransactionType.DEBIT.value))
+
+    # Standardize the 'Name' column a whole column at a time
+    df['Name'] = normalize_names(df['Name'], _NAME_RULES, NAME_CACHE)
+
+    # Determine insurance type of Liberty Mutual payments based on the transaction amount
+    is_liberty_mutual: pd.Series = df['Name'] == TransactionName.LIBERTY_MUTUAL.value
+    insurance_names: List[str] = [TransactionName.RENTERS_INSURANCE.value, TransactionName.CAR_INSURANCE.value]
+    insurance: np.ndarray = np.where(df['Amount'] < 25.00, *insurance_names)
+    names: pd.Series = df['Name'].cat.set_categories(df['Name'].cat.categories.union(insurance_names, sort=False))
+    df['Name'] = names.mask(is_liberty_mutual, insurance)
+
+    return df
+
+@stage
+def _clean_csv(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Cleans the raw CSV data, removing unnecessary rows and standardizing columns.
+
+    Args:
+        df (pd.DataFrame): The raw data read from the CSV file, or a chunk of it.
+
+    Returns:
+        pd.DataFrame: A cleaned DataFrame with updated column names and standardized values.
+    """
     # Filter out unwanted rows based on specific descriptions and transaction types
     df = df[
         (df['Description'] != 'CARDMEMBER SERV') & 
@@ -79,73 +152,16 @@ def _clean_csv(csv_path: str) -> pd.DataFrame:
     # Standardize the 'Amount' column by converting negative amounts to positive for easier analysis
     df['Amount'] = df['Amount'].mask(df['Amount'] < 0, df['Amount'] * -1, axis=0)
 
-    # Convert date format to MM/DD/YYYY for consistency
-    df['Date'] = pd.to_datetime(df['Date'], format='%Y-%m-%d')
-    df['Date'] = df['Date'].dt.strftime('%m/%d/%Y')
     
     return df
 
-def _clean_name(row: pd.Series) -> tuple[str, str, float]:
-    """
-    Cleans and standardizes transaction names based on predefined patterns.
-
-    Args:
-        row (pd.DataFrame): A single row of the DataFrame containing transaction data.
-
-    Returns:
-        tuple[str, str, float]: A tuple containing the cleaned transaction type, standardized name, and amount.
-
-    Raises:
-        ValueError: If the `row` is empty or not of type `pd.DataFrame`.
-    """
-    if row.empty or not isinstance(row, pd.Series):
-        raise ValueError('Arg: row must not be empty and must be of class pd.DataFrame')
-
-    transaction: str = row['Transaction']
-    name: str = row['Name']
-    amount: float = row['Amount']
-
-    # Convert the name to uppercase for consistency
-    name = name.upper()
-
-    # Standardize the transaction type based on predefined conditions
-    if transaction == TransactionName.DIRECT_DEPOSIT.value or transaction.upper() == TransactionName.INTEREST_EARNED.value:
-        transaction = TransactionType.CREDIT.value
-    else:
-        transaction = TransactionType.DEBIT.value
-
-    # Remove unwanted characters and split name into meaningful parts
-    result: List[str] = re.split(r'[*#\d\.-]', name)
-
-    # Match against predefined patterns to standardize common transaction names
-    match result[0]:
-        case TransactionName.LIBERTY_MUTUAL.value:
-            # Determine insurance type based on the transaction amount
-            if amount < 25.00:
-                name = TransactionName.RENTERS_INSURANCE.value
-            else:
-                name = TransactionName.CAR_INSURANCE.value
-
-        case TransactionName.ENT_CU.value:
-            name = TransactionName.CAR_PAYMENT.value
-        
-        case TransactionName.STRATFORD.value:
-            name = TransactionName.RENT.value
-        
-        case TransactionName.DHHA.value:
-            name = TransactionName.DENVER_HEALTH.value
-        
-        case TransactionName.AH.value:
-            name = TransactionName.ADVENT.value
-        
-        case TransactionName.INTEREST_EARNED.value:
-            name = TransactionName.INTEREST.value
-        
-        case TransactionName.HEALTH_ONE.value:
-            name = TransactionName.SWEDISH.value
-        
-        case _:
-            # Use the first part of the name by default if no specific pattern is matched
-            name = result[0]
-    
-    return transaction, name, amount
\ No newline at end of file
+# Adapter routing SoFi exports, recognized by their header row, to the cleaners of this module
+ADAPTER: BankAdapter = register_adapter(BankAdapter(
+    bank=Bank.SOFI,
+    header=['Date', 'Description', 'Type', 'Amount', 'Current balance', 'Status'],
+    schema=_SCHEMA,
+    name_rules=_NAME_RULES,
+    name_cache=NAME_CACHE,
+    clean=clean_data_sofi,
+    clean_chunks=clean_data_sofi_chunks
+))
@@ -0,0 +1,409 @@
+import argparse
+import datetime
+import os
+import sys
+
+from project_enums import Bank
+from typing import List, Optional, Tuple
+
+# File types the transactions can be written to by the 'categorize' and 'export' commands
+OUTPUT_TYPES: List[str] = ['.csv', '.parquet']
+
+# The handlers below import pandas, the cleaners and the Google API client inside the function,
+# so each command only pays for the dependencies it uses, and `--help` or `validate` start instantly.
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """
+    Runs a command of the finance automation CLI.
+
+    Commands:
+        validate: Checks that the CSV exports exist and have a header, without parsing them, and detects
+            the bank of the exports in an input directory.
+        ingest: Cleans and categorizes the CSV exports and appends them to the ledger.
+        categorize: Cleans and categorizes the CSV exports and writes them to a local file.
+        export: Writes the transactions of the ledger, optionally filtered, or its monthly summary to a local file.
+        sync: Cleans and categorizes the CSV exports, appends them to the ledger and syncs the ledger to the
+            Google Spreadsheets.
+        watch: Imports every CSV export that lands in an inbox directory into the ledger, and syncs the tabs it changed.
+
+    Args:
+        argv (List[str], optional): The command line arguments. Defaults to `sys.argv`.
+    """
+    parser: argparse.ArgumentParser = _parser()
+    args: argparse.Namespace = parser.parse_args(argv)
+
+    # Check the banks of the inputs up front, since argparse cannot convert a single value of a pair
+    try:
+        _inputs(args)
+    except argparse.ArgumentTypeError as error:
+        parser.error(f'argument -i/--input: {error}')
+
+    args.handler(args)
+
+def _parser() -> argparse.ArgumentParser:
+    """
+    Builds the argument parser of every command.
+
+    Returns:
+        argparse.ArgumentParser: The parser, whose parsed arguments hold the `handler` of the command.
+    """
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(
+        prog='finance_automation', description='Cleans, categorizes and syncs bank statement exports.'
+    )
+    commands = parser.add_subparsers(dest='command', required=True, metavar='command')
+
+    # Options shared by the commands that read CSV exports
+    inputs: argparse.ArgumentParser = argparse.ArgumentParser(add_help=False)
+    inputs.add_argument(
+        '-i', '--input', dest='inputs', action='append', nargs=2, metavar=('BANK', 'CSV'), type=str,
+        help=f"a bank ({', '.join(bank.value.lower() for bank in Bank)}) and the path of its CSV export; "
+             'repeat for several exports (default: the exports in ./test_csv)'
+    )
+    inputs.add_argument(
+        '--input-dir', metavar='DIR',
+        help='directory of CSV exports, each routed to its bank by its header row; unrecognized files are skipped'
+    )
+    cleaning: argparse.ArgumentParser = argparse.ArgumentParser(add_help=False)
+    cleaning.add_argument('--workers', type=int, help='processes used to clean the exports (default: CPUs)')
+    cleaning.add_argument('--no-cache', action='store_true', help='clean every export instead of using the cache')
+    cleaning.add_argument(
+        '--fuzzy', action='store_true', help='categorize unknown names by their closest known name instead of as OTHER'
+    )
+    cleaning.add_argument(
+        '--name-cache', metavar='DIR',
+        help='directory where standardized names are kept between runs (e.g. ./cache/names)'
+    )
+
+    # Only offered by 'ingest' and 'categorize': a tab holds every transaction of its category, so the commands
+    # that sync the Google Spreadsheets must never skip the transactions imported by earlier runs
+    dedup: argparse.ArgumentParser = argparse.ArgumentParser(add_help=False)
+    dedup.add_argument(
+        '--dedup-index', metavar='NPY', help='.npy index of imported transactions, to skip them in later runs'
+    )
+
+    validate = commands.add_parser('validate', parents=[inputs], help='check the CSV exports without parsing them')
+    validate.set_defaults(handler=_validate)
+
+    ingest = commands.add_parser(
+        'ingest', parents=[inputs, cleaning, dedup], help='append the CSV exports to the ledger'
+    )
+    ingest.add_argument('--ledger-dir', help='directory of the ledger (default: ./ledger)')
+    ingest.set_defaults(handler=_ingest)
+
+    categorize = commands.add_parser(
+        'categorize', parents=[inputs, cleaning, dedup], help='write the categorized CSV exports to a file'
+    )
+    categorize.add_argument('-o', '--output', required=True, type=_output_path, help='.csv or .parquet file to write')
+    categorize.set_defaults(handler=_categorize)
+
+    export = commands.add_parser('export', help='write the transactions of the ledger to a file')
+    export.add_argument('-o', '--output', required=True, type=_output_path, help='.csv or .parquet file to write')
+    export.add_argument('--ledger-dir', help='directory of the ledger (default: ./ledger)')
+    export.add_argument('--start', type=datetime.date.fromisoformat, help='first date to export, YYYY-MM-DD')
+    export.add_argument('--end', type=datetime.date.fromisoformat, help='last date to export, YYYY-MM-DD')
+    export.add_argument(
+        '--bank', dest='banks', action='append', type=_bank, help='bank to export; repeat for several banks'
+    )
+    export.add_argument(
+        '--summary', action='store_true', help='export the totals and counts by month, category, name and bank instead'
+    )
+    export.set_defaults(handler=_export)
+
+    sync = commands.add_parser(
+        'sync', parents=[inputs, cleaning], help='append the CSV exports to the ledger and sync it to the spreadsheets'
+    )
+    sync.add_argument('--ledger-dir', help='directory of the ledger the tabs are synced from (default: ./ledger)')
+    sync.add_argument(
+        '--spreadsheet-id', dest='spreadsheet_ids', action='append',
+        help='ID of a Google Spreadsheet to sync; repeat for several spreadsheets (default: the IDs in main.py)'
+    )
+    sync.set_defaults(handler=_sync)
+
+    watch = commands.add_parser(
+        'watch', parents=[cleaning], help='import the CSV exports that land in an inbox directory as they arrive'
+    )
+    watch.add_argument('--inbox', help='directory watched for CSV exports (default: ./inbox)')
+    watch.add_argument('--interval', type=float, help='seconds between two scans of the inbox (default: 5)')
+    watch.add_argument('--ledger-dir', help='directory of the ledger (default: ./ledger)')
+    watch.add_argument(
+        '--spreadsheet-id', dest='spreadsheet_ids', action='append',
+        help='ID of a Google Spreadsheet to sync; repeat for several spreadsheets (default: the IDs in main.py)'
+    )
+    watch.add_argument('--no-sync', action='store_true', help='only update the ledger, without syncing any spreadsheet')
+    watch.add_argument('--once', action='store_true', help='import the exports already in the inbox, then exit')
+    watch.set_defaults(handler=_watch)
+
+    return parser
+
+def _validate(args: argparse.Namespace) -> None:
+    """
+    Checks that every CSV export exists, is a CSV file and has a header row. pandas is only imported,
+    by the bank adapters, to detect the banks of the exports in an `--input-dir`.
+
+    Args:
+        args (argparse.Namespace): The parsed arguments of the 'validate' command.
+
+    Raises:
+        SystemExit: If any export is invalid or not recognized.
+    """
+    if not args.inputs and not args.input_dir:
+        sys.exit('validate: at least one --input BANK CSV or an --input-dir is required')
+
+    detected, unrecognized = _detect_inputs(args)
+    failed: bool = bool(unrecognized)
+    for bank, csv_path in _inputs(args) + detected:
+        if not csv_path.endswith('.csv'):
+            print(f'{bank.value} {csv_path}: not a .csv file')
+            failed = True
+            continue
+        try:
+            # Count the rows below the header without parsing them
+            with open(csv_path, 'rb') as file:
+                header: bytes = file.readline().strip()
+                rows: int = sum(1 for line in file if line.strip())
+        except OSError as error:
+            print(f'{bank.value} {csv_path}: {error.strerror}')
+            failed = True
+            continue
+        if not header:
+            print(f'{bank.value} {csv_path}: missing header row')
+            failed = True
+            continue
+        print(f'{bank.value} {csv_path}: {rows} rows')
+
+    if failed:
+        sys.exit(1)
+
+def _ingest(args: argparse.Namespace) -> None:
+    """
+    Cleans and categorizes the CSV exports and appends them to the ledger.
+
+    Args:
+        args (argparse.Namespace): The parsed arguments of the 'ingest' command.
+    """
+    from ledger import LEDGER_DIR
+    from wrangle_data import wrangle_data
+
+    ledger_dir: str = args.ledger_dir or LEDGER_DIR
+    df = wrangle_data(**_wrangle_options(args), ledger_dir=ledger_dir)
+    print(f'{len(df)} transactions ingested into {ledger_dir}')
+
+def _categorize(args: argparse.Namespace) -> None:
+    """
+    Cleans and categorizes the CSV exports and writes them to a local file, without updating the ledger.
+
+    Args:
+        args (argparse.Namespace): The parsed arguments of the 'categorize' command.
+    """
+    from dedup import record_keys
+    from wrangle_data import wrangle_new_data
+
+    df, keys = wrangle_new_data(**_wrangle_options(args))
+    _write_output(df, args.output)
+
+    # Mark the transactions as imported only once they were written, so a failed write leaves them to the next run
+    if args.dedup_index:
+        record_keys(args.dedup_index, keys)
+
+def _export(args: argparse.Namespace) -> None:
+    """
+    Writes the transactions of the ledger, or its summary, optionally limited to a date range and some banks,
+    to a local file.
+
+    Args:
+        args (argparse.Namespace): The parsed arguments of the 'export' command.
+    """
+    from ledger import LEDGER_DIR, read_ledger
+
+    if not args.summary:
+        df = read_ledger(args.ledger_dir or LEDGER_DIR, args.start, args.end, args.banks)
+        _write_output(df, args.output)
+        return
+
+    from summary import read_summary
+
+    # The summary holds a few rows per month, so it is filtered after reading it in full
+    df = read_summary(args.ledger_dir or LEDGER_DIR)
+    if args.start:
+        df = df[df['Month'] >= str(args.start.replace(day=1))]
+    if args.end:
+        df = df[df['Month'] <= str(args.end)]
+    if args.banks:
+        df = df[df['Bank'].isin([bank.value for bank in args.banks])]
+    _write_output(df, args.output)
+
+def _sync(args: argparse.Namespace) -> None:
+    """
+    Cleans and categorizes the CSV exports, appends them to the ledger, and syncs the ledger to the
+    Google Spreadsheets.
+
+    Args:
+        args (argparse.Namespace): The parsed arguments of the 'sync' command.
+    """
+    import main as app
+
+    app.main(
+        spreadsheet_ids=args.spreadsheet_ids or app.SPREADSHEET_IDS,
+        ledger_dir=args.ledger_dir or app.LEDGER_DIR,
+        **_wrangle_options(args)
+    )
+
+def _watch(args: argparse.Namespace) -> None:
+    """
+    Imports the CSV exports that land in the inbox into the ledger, syncing the tabs they changed,
+    until interrupted.
+
+    Args:
+        args (argparse.Namespace): The parsed arguments of the 'watch' command.
+    """
+    from ledger import LEDGER_DIR
+    from watch import INBOX_DIR, POLL_SECONDS, watch_inbox
+
+    options: dict = {
+        'inbox_dir': args.inbox or INBOX_DIR,
+        'ledger_dir': args.ledger_dir or LEDGER_DIR,
+        'poll_seconds': args.interval or POLL_SECONDS,
+        'once': args.once,
+        'fuzzy': args.fuzzy,
+    }
+    if args.no_cache:
+        options['cache_dir'] = None
+    if args.name_cache:
+        options['name_cache_dir'] = args.name_cache
+    if not os.path.isdir(options['inbox_dir']):
+        sys.exit(f"watch: --inbox {options['inbox_dir']} is not a directory")
+
+    try:
+        if args.no_sync:
+            watch_inbox(**options)
+        else:
+            import main as app
+
+            app.watch(spreadsheet_ids=args.spreadsheet_ids or app.SPREADSHEET_IDS, **options)
+    except KeyboardInterrupt:
+        print('watch: stopped')
+
+def _wrangle_options(args: argparse.Namespace) -> dict:
+    """
+    Builds the `wrangle_data` options of the commands that read CSV exports.
+
+    Args:
+        args (argparse.Namespace): The parsed arguments of the command.
+
+    Returns:
+        dict: The inputs, workers, fuzzy matching, cache directory, dedup index and name cache directory,
+            leaving out the options that were not given.
+
+    Raises:
+        SystemExit: If an `--input-dir` was given without any other inputs and none of its files were recognized.
+    """
+    inputs: List[Tuple[Bank, str]] = _inputs(args)
+    if args.input_dir:
+        detected, _ = _detect_inputs(args)
+        if not inputs and not detected:
+            sys.exit(f'{args.command}: no recognized CSV exports in {args.input_dir}')
+        inputs += detected
+
+    options: dict = {'inputs': inputs or None, 'max_workers': args.workers, 'fuzzy': args.fuzzy}
+    if args.no_cache:
+        options['cache_dir'] = None
+    if getattr(args, 'dedup_index', None):
+        options['dedup_index'] = args.dedup_index
+    if args.name_cache:
+        options['name_cache_dir'] = args.name_cache
+    return options
+
+def _inputs(args: argparse.Namespace) -> List[Tuple[Bank, str]]:
+    """
+    Converts the `--input BANK CSV` options to the bank and file path of each export.
+
+    Args:
+        args (argparse.Namespace): The parsed arguments of the command.
+
+    Returns:
+        List[Tuple[Bank, str]]: The bank and file path of each export, or an empty list if none were given.
+    """
+    return [(_bank(bank), csv_path) for bank, csv_path in getattr(args, 'inputs', None) or []]
+
+def _detect_inputs(args: argparse.Namespace) -> Tuple[List[Tuple[Bank, str]], List[str]]:
+    """
+    Routes the CSV exports of the `--input-dir` option to their banks by their header rows, reporting
+    the files that no bank adapter recognizes.
+
+    Args:
+        args (argparse.Namespace): The parsed arguments of the command.
+
+    Returns:
+        Tuple[List[Tuple[Bank, str]], List[str]]: The bank and file path of each recognized export, and the
+            file paths of the unrecognized ones, or two empty lists if no directory was given.
+
+    Raises:
+        SystemExit: If the directory does not exist.
+    """
+    if not args.input_dir:
+        return [], []
+
+    from bank_adapters import route_directory
+
+    try:
+        detected, unrecognized = route_directory(args.input_dir)
+    except ValueError:
+        sys.exit(f'{args.command}: --input-dir {args.input_dir} is not a directory')
+    for csv_path in unrecognized:
+        print(f'{csv_path}: header matches no bank, skipped')
+    return detected, unrecognized
+
+def _bank(name: str) -> Bank:
+    """
+    Parses a bank name given on the command line.
+
+    Args:
+        name (str): The name of the bank, in any case.
+
+    Returns:
+        Bank: The bank.
+
+    Raises:
+        argparse.ArgumentTypeError: If `name` is not the name of a bank.
+    """
+    try:
+        return Bank[name.upper()]
+    except KeyError:
+        raise argparse.ArgumentTypeError(
+            f"unknown bank '{name}', expected one of {', '.join(bank.value.lower() for bank in Bank)}"
+        )
+
+def _output_path(path: str) -> str:
+    """
+    Validates the path of the file a command writes transactions to.
+
+    Args:
+        path (str): The file path given on the command line.
+
+    Returns:
+        str: The same file path.
+
+    Raises:
+        argparse.ArgumentTypeError: If the file type is not one of `OUTPUT_TYPES`.
+    """
+    if os.path.splitext(path)[1] not in OUTPUT_TYPES:
+        raise argparse.ArgumentTypeError(f"output must be one of the file types {', '.join(OUTPUT_TYPES)}")
+    return path
+
+def _write_output(df, output_path: str) -> None:
+    """
+    Writes transactions to a CSV or Parquet file, depending on its file type.
+
+    Args:
+        df (pd.DataFrame): The transactions to write.
+        output_path (str): The .csv or .parquet file to write.
+    """
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    if output_path.endswith('.parquet'):
+        df.to_parquet(output_path, index=False)
+    else:
+        df.to_csv(output_path, index=False)
+    print(f'{len(df)} rows written to {output_path}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+import os
+import pandas as pd
+
+from instrument import stage
+from typing import Iterator, List, NamedTuple, Optional
+
+# Parser engines that can be used to read a bank's CSV export
+ENGINES: List[str] = ['c', 'pyarrow']
+
+class CsvSchema(NamedTuple):
+    """
+    Schema of a bank's CSV export, passed straight to the CSV reader.
+
+    Only the listed columns are read, with their dtypes given up front so pandas does not have
+    to infer them, and the date column is parsed with its known format.
+
+    Attributes:
+        columns (List[str]): The columns read from the CSV file; all other columns are skipped.
+        dtypes (dict): The dtype of each column other than the date column.
+        date_column (str): The column holding the transaction date.
+        date_format (str): The strftime format of the date column.
+    """
+    columns: List[str]
+    dtypes: dict
+    date_column: str
+    date_format: str
+
+@stage
+def read_csv(csv_path: str, schema: CsvSchema, engine: Optional[str] = None) -> pd.DataFrame:
+    """
+    Reads a bank's CSV export using its schema.
+
+    Args:
+        csv_path (str): The file path to the CSV file.
+        schema (CsvSchema): The schema of the bank's CSV export.
+        engine (str, optional): The parser engine, one of `ENGINES`. The 'pyarrow' engine requires
+            the optional pyarrow package. Defaults to 'c'.
+
+    Returns:
+        pd.DataFrame: The columns of the schema with their pinned dtypes and a parsed date column.
+
+    Raises:
+        ValueError: If the `csv_path` is not a valid string or file path, if it is not a CSV file,
+            or if `engine` is not one of `ENGINES`.
+    """
+    _validate_csv_path(csv_path)
+    if engine is not None and engine not in ENGINES:
+        raise ValueError(f'Arg: engine must be one of {ENGINES}')
+
+    return _parse_dates(pd.read_csv(csv_path, engine=engine, **_reader_options(schema)), schema)
+
+def read_csv_chunks(csv_path: str, schema: CsvSchema, chunksize: int) -> Iterator[pd.DataFrame]:
+    """
+    Reads a bank's CSV export using its schema, `chunksize` rows at a time.
+
+    Args:
+        csv_path (str): The file path to the CSV file.
+        schema (CsvSchema): The schema of the bank's CSV export.
+        chunksize (int): The number of rows read per chunk.
+
+    Yields:
+        pd.DataFrame: The columns of the schema with their pinned dtypes and a parsed date column.
+
+    Raises:
+        ValueError: If the `csv_path` is not a valid string or file path, if it is not a CSV file,
+            or if `chunksize` is not a positive int.
+    """
+    _validate_csv_path(csv_path)
+    if not isinstance(chunksize, int) or chunksize <= 0:
+        raise ValueError('Arg: chunksize must be a positive int')
+
+    # The pyarrow engine does not support chunked reads, so always use the 'c' engine
+    with pd.read_csv(csv_path, chunksize=chunksize, **_reader_options(schema)) as reader:
+        for chunk in reader:
+            yield _parse_dates(chunk, schema)
+
+def _reader_options(schema: CsvSchema) -> dict:
+    """
+    Builds the `pd.read_csv` options for a bank's CSV export from its schema.
+
+    Args:
+        schema (CsvSchema): The schema of the bank's CSV export.
+
+    Returns:
+        dict: The keyword arguments passed to `pd.read_csv`.
+
+    Raises:
+        ValueError: If `schema` is not of class CsvSchema.
+    """
+    if not isinstance(schema, CsvSchema):
+        raise ValueError('Arg: schema must be of class CsvSchema')
+
+    # Dates are read as strings and parsed afterwards, since combining `dtype` with `parse_dates`
+    # makes the 'c' engine fall back to a much slower date parser
+    return {
+        'usecols': schema.columns,
+        'dtype': {**schema.dtypes, schema.date_column: 'object'},
+    }
+
+def _parse_dates(df: pd.DataFrame, schema: CsvSchema) -> pd.DataFrame:
+    """
+    Parses the date column of a bank's CSV data with the known format of its schema.
+
+    Args:
+        df (pd.DataFrame): The data read from the CSV file, or a chunk of it.
+        schema (CsvSchema): The schema of the bank's CSV export.
+
+    Returns:
+        pd.DataFrame: The same DataFrame with its date column parsed to datetime64.
+    """
+    df[schema.date_column] = pd.to_datetime(df[schema.date_column], format=schema.date_format)
+    return df
+
+def _validate_csv_path(csv_path: str) -> None:
+    """
+    Validates the file path to a CSV file.
+
+    Args:
+        csv_path (str): The file path to the CSV file.
+
+    Raises:
+        ValueError: If the `csv_path` is not a valid string or file path, or if it is not a CSV file.
+    """
+    if not csv_path or not isinstance(csv_path, str):
+        raise ValueError('Arg: csv_path must exist and be of type str')
+    if not os.path.exists(csv_path):
+        raise ValueError('Arg: csv_path must be a valid file path')
+    if not csv_path.endswith('.csv'):
+        raise ValueError('Arg: csv_path must be of file type .csv')
@@ -0,0 +1,132 @@
+import os
+import numpy as np
+import pandas as pd
+
+from instrument import stage
+from typing import Optional, Tuple
+
+# File of the keys of every transaction imported by earlier runs, used to skip them in later runs
+DEDUP_INDEX_PATH: str = './cache/dedup_index.npy'
+
+def transaction_keys(df: pd.DataFrame, export_ids: np.ndarray) -> np.ndarray:
+    """
+    Hashes every transaction to a key that is the same in every export it appears in.
+
+    The key combines the date, cleaned name, amount in cents, bank, and the intra-day ordinal of
+    the transaction: the number of identical (date, name, amount, bank) transactions before it
+    in the same export. Two exports with overlapping date ranges produce the same keys for their
+    overlap, while repeated purchases on the same day within one export get distinct keys.
+
+    Args:
+        df (pd.DataFrame): Cleaned transaction data with 'Date', 'Name', 'Amount' and 'Bank' columns.
+        export_ids (np.ndarray): The position of the export each transaction was read from.
+
+    Returns:
+        np.ndarray: The uint64 key of every transaction, aligned with `df`.
+    """
+    # Compare amounts in cents, so the key does not depend on how the amount is stored. Categorical names
+    # and banks hash like their values, but only their distinct values are hashed
+    columns: pd.DataFrame = pd.DataFrame({
+        'Date': df['Date'].to_numpy(),
+        'Name': df['Name'].array,
+        'Cents': np.round(df['Amount'].to_numpy(dtype=np.float64) * 100).astype(np.int64),
+        'Bank': df['Bank'].array,
+    })
+    transaction: np.ndarray = pd.util.hash_pandas_object(columns, index=False).to_numpy()
+
+    # Number the occurrences of each transaction within its export, in the order they were read
+    columns['Ordinal'] = pd.Series(transaction).groupby([export_ids, transaction]).cumcount().to_numpy()
+    return pd.util.hash_pandas_object(columns, index=False).to_numpy()
+
+@stage
+def deduplicate(
+    df: pd.DataFrame, export_ids: np.ndarray, index_path: Optional[str] = None
+) -> Tuple[pd.DataFrame, np.ndarray]:
+    """
+    Drops the transactions that were already read from another export.
+
+    The first occurrence of every key is kept, so transactions are kept from the first export
+    listed that contains them. If `index_path` is given, transactions whose keys were stored by
+    an earlier run are dropped as well, so new exports are checked against the history without
+    reading it again. The index itself is left unchanged: the keys of the remaining transactions
+    are returned, to be added with `record_keys` once those transactions have been stored.
+
+    Args:
+        df (pd.DataFrame): Cleaned transaction data with 'Date', 'Name', 'Amount' and 'Bank' columns.
+        export_ids (np.ndarray): The position of the export each transaction was read from.
+        index_path (str, optional): The .npy file of the keys imported by earlier runs, or None to only
+            drop duplicates between the given exports. Defaults to None.
+
+    Returns:
+        Tuple[pd.DataFrame, np.ndarray]: The transactions of `df` seen for the first time, in their
+            original order, and their uint64 keys.
+
+    Raises:
+        ValueError: If `export_ids` is not aligned with `df`, or if `index_path` is not a .npy file path.
+    """
+    if len(export_ids) != len(df):
+        raise ValueError('Arg: export_ids must have one entry per row of df')
+    if index_path is not None and (not isinstance(index_path, str) or not index_path.endswith('.npy')):
+        raise ValueError('Arg: index_path must be of type str and of file type .npy')
+
+    keys: pd.Index = pd.Index(transaction_keys(df, export_ids))
+
+    # Keep the first occurrence of each key among the given exports
+    is_new: np.ndarray = ~keys.duplicated(keep='first')
+
+    # Skip keys imported by an earlier run
+    if index_path is not None:
+        is_new &= ~keys.isin(_load_index(index_path))
+
+    return df[is_new], keys.to_numpy()[is_new]
+
+def record_keys(index_path: str, keys: np.ndarray) -> None:
+    """
+    Adds the keys of newly imported transactions to the index, so later runs skip them.
+
+    Only call this once the transactions have been stored, such as appended to the ledger: a key
+    recorded for a transaction that was then lost would make every later run skip it.
+
+    Args:
+        index_path (str): The .npy file of the keys imported by earlier runs.
+        keys (np.ndarray): The uint64 keys of the imported transactions, as returned by `deduplicate`.
+
+    Raises:
+        ValueError: If `index_path` is not a .npy file path.
+    """
+    if not index_path or not isinstance(index_path, str) or not index_path.endswith('.npy'):
+        raise ValueError('Arg: index_path must be of type str and of file type .npy')
+
+    # Keys already in the index are skipped, so recording the same transactions twice is harmless
+    history: np.ndarray = _load_index(index_path)
+    _save_index(index_path, np.concatenate([history, keys[~np.isin(keys, history)]]))
+
+def _load_index(index_path: str) -> np.ndarray:
+    """
+    Loads the keys of every transaction imported by earlier runs.
+
+    Args:
+        index_path (str): The .npy file of the keys.
+
+    Returns:
+        np.ndarray: The stored uint64 keys, or an empty array if nothing was imported yet.
+    """
+    if not os.path.exists(index_path):
+        return np.empty(0, dtype=np.uint64)
+    return np.load(index_path)
+
+def _save_index(index_path: str, keys: np.ndarray) -> None:
+    """
+    Stores the keys of every transaction imported so far, replacing the stored index.
+
+    Args:
+        index_path (str): The .npy file of the keys.
+        keys (np.ndarray): The uint64 keys to store.
+    """
+    os.makedirs(os.path.dirname(index_path) or '.', exist_ok=True)
+
+    # Write to a temporary file first so an interrupted run never leaves a partial index behind
+    temp_path: str = f'{index_path}.tmp'
+    with open(temp_path, 'wb') as file:
+        np.save(file, keys)
+    os.replace(temp_path, index_path)
@@ -0,0 +1,136 @@
+import numpy as np
+
+from typing import Dict, Iterable, List
+
+# Smallest share of a known name's trigrams that an unmatched name must contain to be matched to it
+FUZZY_THRESHOLD: float = 0.9
+
+# Known names with fewer trigrams than this, such as 'VET' or 'RENT', are only ever matched exactly,
+# since they occur inside too many unrelated names
+MIN_KEY_TRIGRAMS: int = 5
+
+class MerchantIndex:
+    """
+    Blocked trigram index matching unknown transaction names to the closest known name.
+
+    Every known name is split into the trigrams of its space padded upper case form, and each
+    trigram keeps a posting list of the known names containing it. A query is only compared
+    with the known names sharing at least one of its trigrams (its block), and all queries are
+    scored at once by counting the shared trigrams of every (query, known name) pair of the
+    concatenated posting lists with `np.unique(..., return_counts=True)`.
+
+    A query matches a known name if it contains at least `threshold` of the known name's
+    trigrams, as 'KING SOOPERS #123' contains all of 'KING SOOPERS'. If several known names
+    qualify, the one with the highest Dice similarity wins, so 'COSTCO GAS #42' matches
+    'COSTCO GAS' rather than 'COSTCO'.
+
+    Attributes:
+        threshold (float): The smallest share of a known name's trigrams a query must contain.
+    """
+    def __init__(self, known: Dict[str, int], threshold: float = FUZZY_THRESHOLD) -> None:
+        """
+        Builds the index over the known names.
+
+        Args:
+            known (Dict[str, int]): The value, such as a category code, of every known name.
+            threshold (float): The smallest share of a known name's trigrams a query must contain.
+                Defaults to `FUZZY_THRESHOLD`.
+
+        Raises:
+            ValueError: If `threshold` is not a number in (0, 1].
+        """
+        if not isinstance(threshold, (int, float)) or not 0 < threshold <= 1:
+            raise ValueError('Arg: threshold must be a number greater than 0 and at most 1')
+        self.threshold: float = threshold
+
+        # Only index names long enough to be matched fuzzily
+        keys: List[str] = [name for name in known if len(_trigrams(name)) >= MIN_KEY_TRIGRAMS]
+        self._values: np.ndarray = np.array([known[name] for name in keys], dtype=np.int64)
+
+        # Number every trigram of the known names, and list the known names containing each one
+        self._trigram_ids: Dict[str, int] = {}
+        pairs: List[tuple] = []
+        for key_id, name in enumerate(keys):
+            for trigram in _trigrams(name):
+                pairs.append((self._trigram_ids.setdefault(trigram, len(self._trigram_ids)), key_id))
+        trigram_of_pair, key_of_pair = np.array(pairs, dtype=np.int64).reshape(-1, 2).T
+
+        # Store the posting lists in CSR form: the known names of trigram t are keys[offsets[t]:offsets[t + 1]]
+        order: np.ndarray = np.argsort(trigram_of_pair, kind='stable')
+        self._postings: np.ndarray = key_of_pair[order]
+        self._offsets: np.ndarray = np.concatenate(
+            ([0], np.cumsum(np.bincount(trigram_of_pair, minlength=len(self._trigram_ids))))
+        )
+        self._key_sizes: np.ndarray = np.bincount(key_of_pair, minlength=len(keys))
+
+    def match(self, names: Iterable[str], default: int = -1) -> np.ndarray:
+        """
+        Finds the value of the closest known name of every name.
+
+        Args:
+            names (Iterable[str]): The names to match, typically the distinct names without an exact match.
+            default (int): The value of names without a close enough known name. Defaults to -1.
+
+        Returns:
+            np.ndarray: The int64 value of the matched known name of every name, or `default`.
+        """
+        names = list(names)
+        values: np.ndarray = np.full(len(names), default, dtype=np.int64)
+        key_count: int = len(self._key_sizes)
+        if not names or not key_count:
+            return values
+
+        # Look up the known trigrams of every query; the others cannot be shared, but still count towards its size
+        query_trigrams: List[List[int]] = []
+        query_sizes: np.ndarray = np.empty(len(names), dtype=np.int64)
+        for query_id, name in enumerate(names):
+            trigrams: set = _trigrams(name)
+            query_sizes[query_id] = len(trigrams)
+            query_trigrams.append([self._trigram_ids[trigram] for trigram in trigrams if trigram in self._trigram_ids])
+
+        # Expand every (query, trigram) pair to the posting list of the trigram, giving one entry per shared trigram
+        trigram_counts: np.ndarray = np.fromiter(map(len, query_trigrams), dtype=np.int64, count=len(names))
+        trigram_ids: np.ndarray = np.fromiter(
+            (trigram for trigrams in query_trigrams for trigram in trigrams), dtype=np.int64, count=trigram_counts.sum()
+        )
+        query_of_trigram: np.ndarray = np.repeat(np.arange(len(names)), trigram_counts)
+        posting_lengths: np.ndarray = self._offsets[trigram_ids + 1] - self._offsets[trigram_ids]
+        posting_positions: np.ndarray = (
+            np.repeat(self._offsets[trigram_ids] - np.cumsum(posting_lengths) + posting_lengths, posting_lengths)
+            + np.arange(posting_lengths.sum())
+        )
+        pair_ids: np.ndarray = (
+            np.repeat(query_of_trigram, posting_lengths) * key_count + self._postings[posting_positions]
+        )
+
+        # Count the shared trigrams of every candidate pair within the blocks
+        candidates, shared = np.unique(pair_ids, return_counts=True)
+        query_ids: np.ndarray = candidates // key_count
+        key_ids: np.ndarray = candidates % key_count
+
+        # Keep the candidates containing enough of the known name, and pick the most similar one per query
+        containment: np.ndarray = shared / self._key_sizes[key_ids]
+        dice: np.ndarray = 2 * shared / (query_sizes[query_ids] + self._key_sizes[key_ids])
+        eligible: np.ndarray = containment >= self.threshold
+        query_ids, key_ids, dice = query_ids[eligible], key_ids[eligible], dice[eligible]
+
+        # Sort by query, then by descending similarity, so the first candidate of each query is its best match
+        order: np.ndarray = np.lexsort((-dice, query_ids))
+        query_ids, key_ids = query_ids[order], key_ids[order]
+        first: np.ndarray = np.r_[True, query_ids[1:] != query_ids[:-1]] if len(query_ids) else np.empty(0, dtype=bool)
+        values[query_ids[first]] = self._values[key_ids[first]]
+
+        return values
+
+def _trigrams(name: str) -> set:
+    """
+    Splits a name into the distinct trigrams of its space padded upper case form.
+
+    Args:
+        name (str): The name to split.
+
+    Returns:
+        set: The distinct three character substrings of the name.
+    """
+    padded: str = f' {" ".join(str(name).upper().split())} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
@@ -1,34 +1,108 @@
+import json
+import os
+import numpy as np
 import pandas as pd
 
-from googleapiclient.discovery import Resource
+from concurrent.futures import ThreadPoolExecutor
+from googleapiclient.discovery import build, Resource
+from googleapiclient.http import HttpRequest
 from google_auth_oauthlib.flow import InstalledAppFlow
+from google.auth.exceptions import RefreshError
+from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
-from typing import List
+from instrument import stage
+from project_enums import DateFormat
+from sheets_upload import SheetsUploader
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
 # Project and secret identifiers
 PROJECT_ID: str = '438040797905'
 SECRET_ID: str = 'sheets_access'
 SCOPES: List[str] = ['https://www.googleapis.com/auth/spreadsheets']
 
-def get_credentials() -> Credentials:
+# OAuth 2.0 client secrets of the desktop app
+CLIENT_SECRET_PATH: str = './sensitive/client_secret_desktop.json'
+
+# Stored OAuth 2.0 token, refreshed and reused by later runs so they do not need a browser
+TOKEN_PATH: str = './sensitive/token.json'
+
+# Columns written to each Google Sheet tab, in column order
+SHEET_COLUMNS: List[str] = ['Date', 'Name', 'Amount']
+
+# Encoder for the JSON request bodies, using the same separators as the Google API client
+_encoder: json.JSONEncoder = json.JSONEncoder()
+
+# Number of rows encoded to JSON at once when sizing request bodies
+_BLOCK_ROWS: int = 1_000
+
+# Directory of the row hashes last synced to each spreadsheet, one file per spreadsheet
+SYNC_STATE_DIR: str = './cache/sheets'
+
+# Upper bound on the size of the values sent in a single batchUpdate request, well below the API's request size limit
+MAX_PAYLOAD_BYTES: int = 2_000_000
+
+def get_credentials(token_path: str = TOKEN_PATH) -> Credentials:
     """
     Obtains OAuth 2.0 credentials for accessing the Google Sheets API.
 
-    This function uses OAuth 2.0 installed app flow to obtain credentials for accessing
-    the Google Sheets API, allowing the user to authorize access through their Google account.
+    The token stored by an earlier run is reused, and refreshed if it has expired, so scheduled
+    runs start without a browser. The installed app flow, which asks the user to authorize access
+    through their Google account, only runs if there is no stored token or it can no longer be
+    refreshed. The new token is then stored in `token_path`, readable only by the current user.
+
+    Args:
+        token_path (str): The file path of the stored token. Defaults to `TOKEN_PATH`.
 
     Returns:
         Credentials: An authorized credentials object for accessing the Google Sheets API.
+
+    Raises:
+        ValueError: If `token_path` is not a valid string or is not a JSON file.
     """
-    # Initialize the OAuth flow with client secrets and the required scopes
-    flow: InstalledAppFlow = InstalledAppFlow.from_client_secrets_file(
-        './sensitive/client_secret_desktop.json', SCOPES
-    )
-    # Run the local server to obtain user authorization and get the credentials
-    creds = flow.run_local_server(port=0)
+    if not token_path or not isinstance(token_path, str):
+        raise ValueError('Arg: token_path must exist and be of type str')
+    if not token_path.endswith('.json'):
+        raise ValueError('Arg: token_path must be of file type .json')
+
+    # Reuse the stored token if it grants the required scopes
+    creds: Optional[Credentials] = None
+    if os.path.exists(token_path):
+        creds = Credentials.from_authorized_user_file(token_path, SCOPES)
+    if creds and creds.valid:
+        return creds
+
+    if creds and creds.expired and creds.refresh_token:
+        # Refresh the expired access token without user interaction
+        try:
+            creds.refresh(Request())
+        except RefreshError:
+            creds = None
+    else:
+        creds = None
+
+    if creds is None:
+        # Initialize the OAuth flow with client secrets and the required scopes
+        flow: InstalledAppFlow = InstalledAppFlow.from_client_secrets_file(CLIENT_SECRET_PATH, SCOPES)
+        # Run the local server to obtain user authorization and get the credentials
+        creds = flow.run_local_server(port=0)
+
+    _save_token(token_path, creds)
     return creds
 
+def build_service(credentials: Credentials) -> Resource:
+    """
+    Creates a Google Sheets API service resource from the discovery document bundled with the client.
+
+    Args:
+        credentials (Credentials): The credentials to authorize requests with.
+
+    Returns:
+        Resource: An authorized Google Sheets API service resource.
+    """
+    # The static discovery document ships with the client, so building the service makes no request
+    return build('sheets', 'v4', credentials=credentials, static_discovery=True, cache_discovery=False)
 
+@stage
 def write_data(service: Resource, sheet_name: str, spreadsheet_id: str, df: pd.DataFrame) -> None:
     """
     Writes data from a DataFrame to a specific Google Sheet.
@@ -62,11 +136,8 @@ def write_data(service: Resource, sheet_name: str, spreadsheet_id: str, df: pd.D
     # Convert the sheet name to uppercase to match the 'Category' column in the DataFrame
     category: str = sheet_name.upper()
 
-    # Filter the DataFrame by the specified category and drop unnecessary columns
-    df: pd.DataFrame = df[df['Category'] == category].copy().drop(['Transaction', 'Category'], axis=1)
-
-    # Convert the filtered DataFrame to a list of lists for Google Sheets API
-    values: List[List] = df.apply(lambda row: row.tolist(), axis=1).tolist()
+    # Filter the DataFrame by the specified category and convert it to a list of lists for Google Sheets API
+    values: List[List] = _sheet_rows(df[df['Category'] == category])
 
     # Define the range in the sheet to write the values
     range_name: str = f'{sheet_name}!A2:C'
@@ -81,4 +152,463 @@ def write_data(service: Resource, sheet_name: str, spreadsheet_id: str, df: pd.D
     ).execute()
 
     # Print the number of cells updated
-    print(f"{results.get('updatedCells')} cells updated in {sheet_name}")
\ No newline at end of file
+    print(f"{results.get('updatedCells')} cells updated in {sheet_name}")
+
+@stage
+def write_all_data(
+    service: Resource,
+    spreadsheet_id: str,
+    df: pd.DataFrame,
+    max_payload_bytes: int = MAX_PAYLOAD_BYTES,
+    uploader: Optional[SheetsUploader] = None
+) -> None:
+    """
+    Writes data from a DataFrame to the Google Sheet tab of every category in a single request.
+
+    This function groups the provided DataFrame by category once, builds the range of each 
+    category's tab, and writes all of them with one `values.batchUpdate` call. If the values 
+    are larger than `max_payload_bytes`, they are split over as few requests as possible, which
+    are sent concurrently by `uploader`.
+
+    Args:
+        service (Resource): An authorized Google Sheets API service resource.
+        spreadsheet_id (str): The ID of the Google Spreadsheet.
+        df (pd.DataFrame): A DataFrame containing the data to be written to the sheet.
+        max_payload_bytes (int): The maximum size of the values sent in a single request.
+            Defaults to `MAX_PAYLOAD_BYTES`.
+        uploader (SheetsUploader, optional): Sends the requests, retrying transient errors. Defaults to
+            sending them one at a time over the service's own connection.
+
+    Raises:
+        ValueError: If any of the provided arguments are invalid or if the DataFrame is empty.
+
+    Prints:
+        The number of cells updated by each request.
+    """
+    # Validate the service object and other input arguments
+    if not service or not isinstance(service, Resource):
+        raise ValueError('Arg: service must exist and be of class Resource')
+    if not spreadsheet_id or not isinstance(spreadsheet_id, str):
+        raise ValueError('Arg: spreadsheet_id must exist and be of type str')
+    if df.empty or not isinstance(df, pd.DataFrame):
+        raise ValueError('Arg: df must not be empty and must be of class pd.DataFrame')
+    if not isinstance(max_payload_bytes, int) or max_payload_bytes <= 0:
+        raise ValueError('Arg: max_payload_bytes must be a positive int')
+
+    # Write every tab in full, starting at the top of its data
+    sheet_values: Iterator[Tuple[str, int, List[List]]] = (
+        (sheet_name, 0, values) for sheet_name, values in _sheet_values(df)
+    )
+    chunks: List[List[dict]] = list(_chunk_value_ranges(sheet_values, max_payload_bytes))
+
+    # Update every range of each chunk using a single Google Sheets API request
+    requests: List[HttpRequest] = [_batch_update(service, spreadsheet_id, data) for data in chunks]
+    for data, results in zip(chunks, (uploader or SheetsUploader()).execute_all(requests)):
+        # Print the number of cells updated
+        print(f"{results.get('totalUpdatedCells')} cells updated in {len(data)} ranges")
+
+@stage
+def sync_all_data(
+    service: Resource,
+    spreadsheet_id: str,
+    df: pd.DataFrame,
+    state_dir: str = SYNC_STATE_DIR,
+    max_payload_bytes: int = MAX_PAYLOAD_BYTES,
+    uploader: Optional[SheetsUploader] = None,
+    categories: Optional[Iterable[str]] = None
+) -> None:
+    """
+    Syncs the Google Sheet tab of every category with a DataFrame, sending only the rows that changed.
+
+    A hash of every row written to each tab is kept in `state_dir`. On the next sync the rows 
+    of each tab are compared with those hashes, and only runs of changed or appended rows are 
+    written. Rows left over below a tab that shrank, and tabs of categories that no longer have 
+    any data, are cleared. Tabs without a stored state are written in full and cleared below.
+    The cleared and written ranges never overlap, so all requests are sent concurrently by `uploader`.
+
+    Given `categories`, only the tabs of those categories are compared and written, and the stored
+    state of every other tab is kept as is.
+
+    The stored state is trusted to match the spreadsheet. If a tab is edited by hand, delete the 
+    spreadsheet's state file to force a full write on the next sync.
+
+    Args:
+        service (Resource): An authorized Google Sheets API service resource.
+        spreadsheet_id (str): The ID of the Google Spreadsheet.
+        df (pd.DataFrame): A DataFrame containing the data to be written to the sheet.
+        state_dir (str): The directory where the row hashes of each spreadsheet are stored.
+            Defaults to `SYNC_STATE_DIR`.
+        max_payload_bytes (int): The maximum size of the values sent in a single request.
+            Defaults to `MAX_PAYLOAD_BYTES`.
+        uploader (SheetsUploader, optional): Sends the requests, retrying transient errors. Defaults to
+            sending them one at a time over the service's own connection.
+        categories (Iterable[str], optional): The categories whose tabs are synced. Defaults to every category.
+
+    Raises:
+        ValueError: If any of the provided arguments are invalid or if the DataFrame is empty.
+
+    Prints:
+        The number of cleared ranges and the number of cells updated by each request.
+    """
+    # Validate the service object and other input arguments
+    if not service or not isinstance(service, Resource):
+        raise ValueError('Arg: service must exist and be of class Resource')
+    if not spreadsheet_id or not isinstance(spreadsheet_id, str):
+        raise ValueError('Arg: spreadsheet_id must exist and be of type str')
+    if df.empty or not isinstance(df, pd.DataFrame):
+        raise ValueError('Arg: df must not be empty and must be of class pd.DataFrame')
+    if not state_dir or not isinstance(state_dir, str):
+        raise ValueError('Arg: state_dir must exist and be of type str')
+    if not isinstance(max_payload_bytes, int) or max_payload_bytes <= 0:
+        raise ValueError('Arg: max_payload_bytes must be a positive int')
+
+    state_path: str = os.path.join(state_dir, f'{spreadsheet_id}.npz')
+    previous: Dict[str, np.ndarray] = _load_sync_state(state_path)
+    current: Dict[str, np.ndarray] = {}
+
+    if categories is not None:
+        # Only sync the tabs of the given categories, carrying the state of every other tab over
+        categories = list(categories)
+        synced: set = {_sheet_name(category) for category in categories}
+        current = {sheet_name: hashes for sheet_name, hashes in previous.items() if sheet_name not in synced}
+        df = df[df['Category'].isin(categories)]
+    changed_values: List[Tuple[str, int, List[List]]] = []
+    clear_ranges: List[str] = []
+
+    for sheet_name, frame in _sheet_frames(df):
+        # Hash every row as it is written to the sheet and compare it with the last sync
+        hashes: np.ndarray = pd.util.hash_pandas_object(frame, index=False).to_numpy()
+        current[sheet_name] = hashes
+        last_hashes: Optional[np.ndarray] = previous.get(sheet_name)
+
+        for start, end in _changed_runs(last_hashes, hashes):
+            changed_values.append((sheet_name, start, frame.iloc[start:end].to_numpy(dtype=object).tolist()))
+
+        # Clear the rows below the tab's data if it shrank, or if nothing is known about the tab
+        if last_hashes is None or len(last_hashes) > len(hashes):
+            clear_ranges.append(f'{sheet_name}!A{2 + len(hashes)}:C')
+
+    # Clear the tabs of categories that no longer have any data
+    clear_ranges.extend(f'{sheet_name}!A2:C' for sheet_name in previous if sheet_name not in current)
+
+    requests: List[HttpRequest] = []
+    if clear_ranges:
+        # Clear every leftover range using a single Google Sheets API request
+        requests.append(service.spreadsheets().values().batchClear(
+            spreadsheetId=spreadsheet_id,
+            body={'ranges': clear_ranges}
+        ))
+
+    # Update every changed range of each chunk using a single Google Sheets API request
+    chunks: List[List[dict]] = list(_chunk_value_ranges(changed_values, max_payload_bytes))
+    requests.extend(_batch_update(service, spreadsheet_id, data) for data in chunks)
+
+    responses: List[dict] = (uploader or SheetsUploader()).execute_all(requests)
+    if clear_ranges:
+        print(f'{len(clear_ranges)} ranges cleared')
+    for data, results in zip(chunks, responses[1:] if clear_ranges else responses):
+        # Print the number of cells updated
+        print(f"{results.get('totalUpdatedCells')} cells updated in {len(data)} ranges")
+
+    # Only store the new state once every request has succeeded
+    _save_sync_state(state_path, current)
+
+def sync_spreadsheets(
+    service: Resource,
+    spreadsheets: Dict[str, pd.DataFrame],
+    uploader: SheetsUploader,
+    state_dir: str = SYNC_STATE_DIR,
+    max_payload_bytes: int = MAX_PAYLOAD_BYTES,
+    categories: Optional[Iterable[str]] = None
+) -> None:
+    """
+    Syncs several Google Spreadsheets at once, such as one per household member.
+
+    Each spreadsheet is synced by `sync_all_data` in its own thread, while all of their requests
+    share the workers and request budget of `uploader`. A run therefore takes about as long as
+    its slowest spreadsheet, rather than the sum of all of them.
+
+    Args:
+        service (Resource): An authorized Google Sheets API service resource.
+        spreadsheets (Dict[str, pd.DataFrame]): The data to sync to each spreadsheet, keyed by spreadsheet ID.
+        uploader (SheetsUploader): Sends the requests of every spreadsheet, retrying transient errors.
+        state_dir (str): The directory where the row hashes of each spreadsheet are stored.
+            Defaults to `SYNC_STATE_DIR`.
+        max_payload_bytes (int): The maximum size of the values sent in a single request.
+            Defaults to `MAX_PAYLOAD_BYTES`.
+        categories (Iterable[str], optional): The categories whose tabs are synced. Defaults to every category.
+
+    Raises:
+        ValueError: If `spreadsheets` is empty or any of the provided arguments are invalid.
+    """
+    if not spreadsheets or not isinstance(spreadsheets, dict):
+        raise ValueError('Arg: spreadsheets must exist and be of type dict')
+    if not isinstance(uploader, SheetsUploader):
+        raise ValueError('Arg: uploader must be of class SheetsUploader')
+
+    with ThreadPoolExecutor(len(spreadsheets), thread_name_prefix='spreadsheet') as pool:
+        futures = [
+            pool.submit(
+                sync_all_data, service, spreadsheet_id, df, state_dir, max_payload_bytes, uploader,
+                None if categories is None else list(categories)
+            )
+            for spreadsheet_id, df in spreadsheets.items()
+        ]
+
+    # Raise the first error, once every other spreadsheet has finished syncing
+    for future in futures:
+        future.result()
+
+def _encode_blocks(values: List[List]) -> Iterator[str]:
+    """
+    Encodes rows of Google Sheet values as JSON, `_BLOCK_ROWS` rows at a time.
+
+    Args:
+        values (List[List]): The rows to encode.
+
+    Yields:
+        str: The comma separated JSON encoding of each block of rows, without enclosing brackets.
+    """
+    for block_start in range(0, len(values), _BLOCK_ROWS):
+        yield _encoder.encode(values[block_start:block_start + _BLOCK_ROWS])[1:-1]
+
+def _sheet_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Converts transaction data to the values written to a Google Sheet tab.
+
+    The values are built column by column, and dates are formatted as MM/DD/YYYY once per 
+    distinct date.
+
+    Args:
+        df (pd.DataFrame): A DataFrame containing transaction data.
+
+    Returns:
+        pd.DataFrame: The values of `SHEET_COLUMNS` for each transaction, in the order of `df`, 
+            with a default index.
+    """
+    # Format dates as MM/DD/YYYY, as they are kept as datetime64 until they are written to the sheet
+    date_codes, dates = pd.factorize(df['Date'])
+    formatted_dates: np.ndarray = dates.strftime(DateFormat.DISPLAY.value).to_numpy(dtype=object)
+
+    columns: dict = {column: df[column].to_numpy() for column in SHEET_COLUMNS}
+    columns['Date'] = formatted_dates[date_codes]
+
+    return pd.DataFrame(columns, columns=SHEET_COLUMNS)
+
+def _sheet_rows(df: pd.DataFrame) -> List[List]:
+    """
+    Converts transaction data to the rows written to a Google Sheet tab.
+
+    The rows are built from the columns of `_sheet_frame` rather than by materializing a Series 
+    for every row.
+
+    Args:
+        df (pd.DataFrame): A DataFrame containing transaction data.
+
+    Returns:
+        List[List]: The values of `SHEET_COLUMNS` for each transaction, in the order of `df`.
+    """
+    return _sheet_frame(df).to_numpy(dtype=object).tolist()
+
+def _sheet_frames(df: pd.DataFrame) -> Iterator[Tuple[str, pd.DataFrame]]:
+    """
+    Groups a DataFrame by category into the values written to each category's Google Sheet tab.
+
+    The values of a tab are only built when it is reached, so the values of every tab are never 
+    held in memory at the same time.
+
+    Args:
+        df (pd.DataFrame): A DataFrame containing categorized transaction data.
+
+    Yields:
+        Tuple[str, pd.DataFrame]: The tab name of each category with data and the values to write to it.
+    """
+    # Group the rows by category once with a stable sort, keeping each category in its original order
+    codes, categories = pd.factorize(df['Category'], sort=True)
+    order: np.ndarray = np.argsort(codes, kind='stable')
+
+    # Rows without a category sort first and are not written to any tab
+    start: int = int(np.count_nonzero(codes < 0))
+    for category, count in zip(categories, np.bincount(codes[codes >= 0], minlength=len(categories))):
+        yield _sheet_name(category), _sheet_frame(df.iloc[order[start:start + count]])
+        start += count
+
+def _sheet_name(category: str) -> str:
+    """
+    Names the Google Sheet tab of a category.
+
+    Args:
+        category (str): The category, such as 'GROCERIES'.
+
+    Returns:
+        str: The capitalized category name, such as 'Groceries', matching the tab name.
+    """
+    return str(category).capitalize()
+
+def _sheet_values(df: pd.DataFrame) -> Iterator[Tuple[str, List[List]]]:
+    """
+    Groups a DataFrame by category into the rows written to each category's Google Sheet tab.
+
+    Args:
+        df (pd.DataFrame): A DataFrame containing categorized transaction data.
+
+    Yields:
+        Tuple[str, List[List]]: The tab name of each category with data and the rows to write to it.
+    """
+    for sheet_name, frame in _sheet_frames(df):
+        yield sheet_name, frame.to_numpy(dtype=object).tolist()
+
+def _changed_runs(last_hashes: Optional[np.ndarray], hashes: np.ndarray) -> List[Tuple[int, int]]:
+    """
+    Finds the runs of consecutive rows of a tab that changed since the last sync.
+
+    Args:
+        last_hashes (np.ndarray, optional): The row hashes of the last sync, or None if the tab was never synced.
+        hashes (np.ndarray): The row hashes of the rows to write.
+
+    Returns:
+        List[Tuple[int, int]]: The start and end offset of each run of changed or appended rows.
+    """
+    if last_hashes is None:
+        return [(0, len(hashes))] if len(hashes) else []
+
+    # Compare the rows both syncs have in common; every row past the old end is appended
+    common: int = min(len(last_hashes), len(hashes))
+    changed: np.ndarray = np.flatnonzero(last_hashes[:common] != hashes[:common])
+    changed = np.concatenate([changed, np.arange(common, len(hashes))])
+    if not len(changed):
+        return []
+
+    # Split the changed rows wherever the offsets stop being consecutive
+    breaks: np.ndarray = np.flatnonzero(np.diff(changed) > 1) + 1
+    starts: np.ndarray = changed[np.concatenate([[0], breaks])]
+    ends: np.ndarray = changed[np.concatenate([breaks - 1, [len(changed) - 1]])] + 1
+    return list(zip(starts.tolist(), ends.tolist()))
+
+def _save_token(token_path: str, creds: Credentials) -> None:
+    """
+    Stores an OAuth 2.0 token, replacing the stored token.
+
+    Args:
+        token_path (str): The file path of the stored token.
+        creds (Credentials): The credentials whose token, refresh token and client are stored.
+    """
+    os.makedirs(os.path.dirname(token_path) or '.', exist_ok=True)
+
+    # Write to a temporary file first, readable only by the current user, so the token is never partially written
+    temp_path: str = f'{token_path}.tmp'
+    with open(os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'w') as file:
+        file.write(creds.to_json())
+    os.replace(temp_path, token_path)
+
+def _load_sync_state(state_path: str) -> Dict[str, np.ndarray]:
+    """
+    Loads the row hashes of every tab of a spreadsheet from its last sync.
+
+    Args:
+        state_path (str): The file path of the spreadsheet's sync state.
+
+    Returns:
+        Dict[str, np.ndarray]: The row hashes of each synced tab, or an empty dict if it was never synced.
+    """
+    if not os.path.exists(state_path):
+        return {}
+    with np.load(state_path) as state:
+        return {sheet_name: state[sheet_name] for sheet_name in state.files}
+
+def _save_sync_state(state_path: str, state: Dict[str, np.ndarray]) -> None:
+    """
+    Stores the row hashes of every tab of a spreadsheet, replacing the state of its last sync.
+
+    Args:
+        state_path (str): The file path of the spreadsheet's sync state.
+        state (Dict[str, np.ndarray]): The row hashes of each synced tab.
+    """
+    os.makedirs(os.path.dirname(state_path) or '.', exist_ok=True)
+
+    # Write to a temporary file first so an interrupted run never leaves a partial state behind
+    temp_path: str = f'{state_path}.tmp'
+    with open(temp_path, 'wb') as file:
+        np.savez(file, **state)
+    os.replace(temp_path, state_path)
+
+def _chunk_value_ranges(
+    sheet_values: Iterable[Tuple[str, int, List[List]]], max_payload_bytes: int
+) -> Iterator[List[dict]]:
+    """
+    Splits the values written to Google Sheet tabs into batchUpdate requests of a bounded size.
+
+    Ranges are packed into the same request while they fit. A range that does not fit is split 
+    across requests, with each part starting at the row where the previous part ended. Rows 
+    are sized in blocks, and only a block that does not fit is sized row by row.
+
+    Args:
+        sheet_values (Iterable[Tuple[str, int, List[List]]]): The tab name, the offset of the first 
+            row from the top of the tab's data, and the rows of each range to write.
+        max_payload_bytes (int): The maximum size of the JSON encoded rows sent in a single request.
+
+    Yields:
+        List[dict]: The value ranges sent in one batchUpdate request.
+    """
+    data: List[dict] = []
+    payload_bytes: int = 0
+
+    for sheet_name, offset, values in sheet_values:
+        start: int = 0
+        for block_start, block in zip(range(0, len(values), _BLOCK_ROWS), _encode_blocks(values)):
+            block_bytes: int = len(block) + 2
+
+            # Add the whole block to the current request if it fits
+            if payload_bytes + block_bytes <= max_payload_bytes:
+                payload_bytes += block_bytes
+                continue
+
+            # Otherwise find the row at which the current request is full
+            for end in range(block_start, min(block_start + _BLOCK_ROWS, len(values))):
+                row_bytes: int = len(_encoder.encode(values[end])) + 2
+
+                # Send the current request once the next row would not fit, unless it would be empty
+                if payload_bytes + row_bytes > max_payload_bytes and (data or end > start):
+                    if end > start:
+                        data.append(_value_range(sheet_name, offset + start, values[start:end]))
+                    yield data
+                    data, payload_bytes, start = [], 0, end
+
+                payload_bytes += row_bytes
+
+        if start < len(values):
+            data.append(_value_range(sheet_name, offset + start, values[start:]))
+
+    if data:
+        yield data
+
+def _batch_update(service: Resource, spreadsheet_id: str, data: List[dict]) -> HttpRequest:
+    """
+    Builds a request updating several ranges of a spreadsheet with user entered values.
+
+    Args:
+        service (Resource): An authorized Google Sheets API service resource.
+        spreadsheet_id (str): The ID of the Google Spreadsheet.
+        data (List[dict]): The value range of every range to update.
+
+    Returns:
+        HttpRequest: The unsent `values.batchUpdate` request.
+    """
+    return service.spreadsheets().values().batchUpdate(
+        spreadsheetId=spreadsheet_id,
+        body={'valueInputOption': 'USER_ENTERED', 'data': data}
+    )
+
+def _value_range(sheet_name: str, start: int, values: List[List]) -> dict:
+    """
+    Builds the value range that writes rows to a Google Sheet tab, below its header row.
+
+    Args:
+        sheet_name (str): The name of the Google Sheet tab.
+        start (int): The offset of the first row from the top of the tab's data.
+        values (List[List]): The rows to write.
+
+    Returns:
+        dict: A ValueRange for the Google Sheets API.
+    """
+    return {'range': f'{sheet_name}!A{2 + start}:C', 'values': values}
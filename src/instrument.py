@@ -0,0 +1,250 @@
+import json
+import os
+import threading
+import time
+import tracemalloc
+import pandas as pd
+import psutil
+
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Iterator, List, NamedTuple, Optional
+
+class StageEvent(NamedTuple):
+    """
+    Measurements of a single run of a pipeline stage.
+
+    Attributes:
+        name (str): The module and function name of the stage.
+        start (float): The start time in seconds, relative to the start of the recording.
+        duration (float): The wall time of the stage in seconds.
+        depth (int): The number of stages the stage ran inside of.
+        thread (int): The identifier of the thread the stage ran in.
+        rows_in (int, optional): The rows of the first DataFrame or Series passed to the stage.
+        rows_out (int, optional): The rows of the DataFrame or Series returned by the stage.
+        rss_bytes (int): The resident set size of the process when the stage finished.
+        peak_traced_bytes (int, optional): The peak memory allocated by Python while the stage ran,
+            if memory tracing was enabled.
+    """
+    name: str
+    start: float
+    duration: float
+    depth: int
+    thread: int
+    rows_in: Optional[int]
+    rows_out: Optional[int]
+    rss_bytes: int
+    peak_traced_bytes: Optional[int]
+
+class StageRecorder:
+    """
+    Collects the measurements of every instrumented stage run while a recording is active.
+
+    Attributes:
+        events (List[StageEvent]): The measurements of each stage, in the order the stages finished.
+        trace_memory (bool): Whether peak Python memory is traced for each stage.
+    """
+    def __init__(self, trace_memory: bool = False) -> None:
+        """
+        Creates an empty recorder.
+
+        Args:
+            trace_memory (bool): Whether to trace the peak Python memory of each stage with `tracemalloc`,
+                which slows down allocation heavy stages. Defaults to False.
+        """
+        self.events: List[StageEvent] = []
+        self.trace_memory: bool = trace_memory
+        self._origin: float = time.perf_counter()
+        self._process: psutil.Process = psutil.Process()
+        self._local: threading.local = threading.local()
+
+    def summary(self) -> pd.DataFrame:
+        """
+        Totals the measurements of each stage across all of its runs.
+
+        Returns:
+            pd.DataFrame: The calls, total and maximum wall time, rows in and out, and the maximum RSS
+                and traced peak of each stage, sorted by total wall time.
+        """
+        events: pd.DataFrame = pd.DataFrame(self.events, columns=StageEvent._fields)
+        return events.groupby('name').agg(
+            calls=('duration', 'size'),
+            total_seconds=('duration', 'sum'),
+            max_seconds=('duration', 'max'),
+            rows_in=('rows_in', 'sum'),
+            rows_out=('rows_out', 'sum'),
+            max_rss_bytes=('rss_bytes', 'max'),
+            max_peak_traced_bytes=('peak_traced_bytes', 'max'),
+        ).sort_values('total_seconds', ascending=False)
+
+    def to_json(self, json_path: str) -> None:
+        """
+        Writes the measurements of every stage run as a JSON list of objects.
+
+        Args:
+            json_path (str): The file path of the JSON file to write.
+
+        Raises:
+            ValueError: If `json_path` is not a valid string or is not a JSON file.
+        """
+        _validate_json_path(json_path)
+        with open(json_path, 'w') as file:
+            json.dump([event._asdict() for event in self.events], file, indent=2)
+
+    def to_chrome_trace(self, json_path: str) -> None:
+        """
+        Writes the measurements of every stage run in the Chrome trace event format.
+
+        The file can be opened in chrome://tracing or https://ui.perfetto.dev, where nested stages
+        are shown below the stage they ran in.
+
+        Args:
+            json_path (str): The file path of the JSON file to write.
+
+        Raises:
+            ValueError: If `json_path` is not a valid string or is not a JSON file.
+        """
+        _validate_json_path(json_path)
+
+        # Complete events ('X') carry their own start and duration, in microseconds
+        trace_events: List[dict] = [
+            {
+                'name': event.name,
+                'cat': 'stage',
+                'ph': 'X',
+                'ts': event.start * 1e6,
+                'dur': event.duration * 1e6,
+                'pid': os.getpid(),
+                'tid': event.thread,
+                'args': {
+                    'rows_in': event.rows_in,
+                    'rows_out': event.rows_out,
+                    'rss_bytes': event.rss_bytes,
+                    'peak_traced_bytes': event.peak_traced_bytes,
+                },
+            }
+            for event in self.events
+        ]
+        with open(json_path, 'w') as file:
+            json.dump({'traceEvents': trace_events, 'displayTimeUnit': 'ms'}, file)
+
+    def _run(self, func: Callable, args: tuple, kwargs: dict) -> Any:
+        """
+        Runs a stage and records its measurements.
+
+        Args:
+            func (Callable): The stage function.
+            args (tuple): The positional arguments of the stage.
+            kwargs (dict): The keyword arguments of the stage.
+
+        Returns:
+            Any: The return value of the stage.
+        """
+        # Each thread keeps its own stack of the traced peaks of the stages it is running
+        if not hasattr(self._local, 'peaks'):
+            self._local.peaks = []
+        peaks: List[int] = self._local.peaks
+        depth: int = len(peaks)
+
+        # Fold the peak so far into the enclosing stage before resetting it for this stage
+        if self.trace_memory:
+            if peaks:
+                peaks[-1] = max(peaks[-1], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        peaks.append(0)
+
+        start: float = time.perf_counter()
+        try:
+            result: Any = func(*args, **kwargs)
+        finally:
+            duration: float = time.perf_counter() - start
+            peak: int = peaks.pop()
+
+        peak_traced: Optional[int] = None
+        if self.trace_memory:
+            peak_traced = max(peak, tracemalloc.get_traced_memory()[1])
+            if peaks:
+                peaks[-1] = max(peaks[-1], peak_traced)
+
+        self.events.append(StageEvent(
+            name=f'{func.__module__}.{func.__name__}',
+            start=start - self._origin,
+            duration=duration,
+            depth=depth,
+            thread=threading.get_ident(),
+            rows_in=next((len(arg) for arg in args if isinstance(arg, (pd.DataFrame, pd.Series))), None),
+            rows_out=len(result) if isinstance(result, (pd.DataFrame, pd.Series)) else None,
+            rss_bytes=self._process.memory_info().rss,
+            peak_traced_bytes=peak_traced,
+        ))
+        return result
+
+# Recorder of the active recording, or None when stages are not being recorded
+_recorder: Optional[StageRecorder] = None
+
+# Serializes recordings, since the active recorder is shared by every thread of the process
+_recording_lock: threading.Lock = threading.Lock()
+
+def stage(func: Callable) -> Callable:
+    """
+    Marks a function as a pipeline stage, whose runs are measured while a recording is active.
+
+    When no recording is active the function is called directly, so instrumented stages cost a
+    single check. Stages run in worker processes, such as the cleaners of a process pool, are
+    not recorded; clean with `max_workers=1` to measure them.
+
+    Args:
+        func (Callable): The stage function.
+
+    Returns:
+        Callable: The instrumented function.
+    """
+    @wraps(func)
+    def instrumented(*args, **kwargs):
+        if _recorder is None:
+            return func(*args, **kwargs)
+        return _recorder._run(func, args, kwargs)
+    return instrumented
+
+@contextmanager
+def record_stages(trace_memory: bool = False) -> Iterator[StageRecorder]:
+    """
+    Records the wall time, rows and memory of every instrumented stage run within the block.
+
+    Args:
+        trace_memory (bool): Whether to trace the peak Python memory of each stage with `tracemalloc`,
+            which slows down allocation heavy stages. Defaults to False.
+
+    Yields:
+        StageRecorder: The recorder collecting the measurements.
+    """
+    global _recorder
+
+    with _recording_lock:
+        recorder: StageRecorder = StageRecorder(trace_memory)
+        started_tracing: bool = trace_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+
+        _recorder = recorder
+        try:
+            yield recorder
+        finally:
+            _recorder = None
+            if started_tracing:
+                tracemalloc.stop()
+
+def _validate_json_path(json_path: str) -> None:
+    """
+    Validates the file path of a JSON file to write.
+
+    Args:
+        json_path (str): The file path of the JSON file.
+
+    Raises:
+        ValueError: If `json_path` is not a valid string or is not a JSON file.
+    """
+    if not json_path or not isinstance(json_path, str):
+        raise ValueError('Arg: json_path must exist and be of type str')
+    if not json_path.endswith('.json'):
+        raise ValueError('Arg: json_path must be of file type .json')
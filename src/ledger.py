@@ -0,0 +1,249 @@
+import operator
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from categorize import CATEGORY_DTYPE
+from functools import reduce
+from instrument import stage
+from project_enums import Bank
+from typing import List, Optional
+
+# Directory of the ledger, partitioned into year=YYYY/month=M/bank=BANK directories of Parquet files
+LEDGER_DIR: str = './ledger'
+
+# Columns stored for every transaction in the ledger, in column order
+LEDGER_COLUMNS: List[str] = ['Date', 'Transaction', 'Name', 'Amount', 'Category', 'Bank']
+
+# Columns that identify a transaction within a partition, whose bank is already fixed by the partition
+KEY_COLUMNS: List[str] = ['Date', 'Name', 'Amount']
+
+# Categorical dtype of the 'Bank' column, with one category per bank in enum order
+BANK_DTYPE: pd.CategoricalDtype = pd.CategoricalDtype([bank.value for bank in Bank])
+
+# Schema of the Parquet files, pinned so the files of every bank and month can be read as one dataset
+_SCHEMA: pa.Schema = pa.schema([
+    ('Date', pa.timestamp('ns')),
+    ('Transaction', pa.string()),
+    ('Name', pa.string()),
+    ('Amount', pa.float64()),
+    ('Category', pa.dictionary(pa.int8(), pa.string())),
+    ('Bank', pa.dictionary(pa.int8(), pa.string())),
+])
+
+@stage
+def append_ledger(df: pd.DataFrame, ledger_dir: str = LEDGER_DIR) -> int:
+    """
+    Appends categorized transactions to the ledger, skipping transactions it already contains.
+
+    Transactions are split into one partition per year, month and bank. Each partition is only
+    ever appended to: the transactions that are new to it are written as a new Parquet file
+    next to its existing files. A transaction is new if its (Date, Name, Amount) occurs more
+    often in `df` than in the partition, so re-importing an overlapping export adds nothing
+    while repeated purchases on the same day are kept.
+
+    Args:
+        df (pd.DataFrame): A DataFrame containing categorized transaction data with a 'Bank' column.
+        ledger_dir (str): The directory of the ledger. Defaults to `LEDGER_DIR`.
+
+    Returns:
+        int: The number of transactions added to the ledger.
+
+    Raises:
+        ValueError: If `df` is not of class `pd.DataFrame` or is missing any of `LEDGER_COLUMNS`,
+            or if `ledger_dir` is not a valid string.
+    """
+    if not isinstance(df, pd.DataFrame) or not set(LEDGER_COLUMNS).issubset(df.columns):
+        raise ValueError(f'Arg: df must be of class pd.DataFrame with columns {LEDGER_COLUMNS}')
+    if not ledger_dir or not isinstance(ledger_dir, str):
+        raise ValueError('Arg: ledger_dir must exist and be of type str')
+
+    added: int = 0
+    dates: pd.Series = df['Date']
+    partitions = df[LEDGER_COLUMNS].groupby(
+        [dates.dt.year.rename('year'), dates.dt.month.rename('month'), 'Bank'], observed=True, sort=True
+    )
+
+    for (year, month, bank), partition in partitions:
+        partition_dir: str = os.path.join(ledger_dir, f'year={year}', f'month={month}', f'bank={bank}')
+
+        # Only keep the transactions the partition does not already contain
+        new_rows: pd.DataFrame = partition[_is_new(partition, _read_keys(partition_dir))]
+        if new_rows.empty:
+            continue
+
+        # Write to a temporary file first so an interrupted run never leaves a partial file behind
+        os.makedirs(partition_dir, exist_ok=True)
+        part_path: str = os.path.join(partition_dir, f'part-{len(_part_files(partition_dir)):05d}.parquet')
+        pq.write_table(_to_table(new_rows), f'{part_path}.tmp')
+        os.replace(f'{part_path}.tmp', part_path)
+
+        added += len(new_rows)
+
+    return added
+
+@stage
+def read_ledger(
+    ledger_dir: str = LEDGER_DIR,
+    start: Optional[pd.Timestamp] = None,
+    end: Optional[pd.Timestamp] = None,
+    banks: Optional[List[Bank]] = None
+) -> pd.DataFrame:
+    """
+    Reads the transactions of the ledger, optionally limited to a date range and to some banks.
+
+    The filters are pushed down to the Parquet dataset: partitions outside the range of months
+    or banks are never opened, and row groups of the remaining files are skipped using their
+    date statistics.
+
+    Args:
+        ledger_dir (str): The directory of the ledger. Defaults to `LEDGER_DIR`.
+        start (pd.Timestamp, optional): The first date to read, inclusive. Defaults to the start of the ledger.
+        end (pd.Timestamp, optional): The last date to read, inclusive. Defaults to the end of the ledger.
+        banks (List[Bank], optional): The banks to read. Defaults to every bank.
+
+    Returns:
+        pd.DataFrame: The transactions with `LEDGER_COLUMNS`, sorted by date.
+
+    Raises:
+        ValueError: If `ledger_dir` is not a valid string or `banks` contains a value that is not a Bank.
+    """
+    if not ledger_dir or not isinstance(ledger_dir, str):
+        raise ValueError('Arg: ledger_dir must exist and be of type str')
+    if banks is not None and not all(isinstance(bank, Bank) for bank in banks):
+        raise ValueError('Arg: banks must only contain values of class Bank')
+
+    if not _part_files(ledger_dir, recursive=True):
+        return _to_frame(_SCHEMA.empty_table())
+
+    # Prune partitions by their year, month and bank, and row groups by their dates
+    conditions: List[ds.Expression] = []
+    if start is not None:
+        start = pd.Timestamp(start).as_unit('ns')
+        conditions.append(
+            (ds.field('year') > start.year) | ((ds.field('year') == start.year) & (ds.field('month') >= start.month))
+        )
+        conditions.append(ds.field('Date') >= pa.scalar(start.to_datetime64(), pa.timestamp('ns')))
+    if end is not None:
+        end = pd.Timestamp(end).as_unit('ns')
+        conditions.append(
+            (ds.field('year') < end.year) | ((ds.field('year') == end.year) & (ds.field('month') <= end.month))
+        )
+        conditions.append(ds.field('Date') <= pa.scalar(end.to_datetime64(), pa.timestamp('ns')))
+    if banks is not None:
+        conditions.append(ds.field('bank').isin([bank.value for bank in banks]))
+
+    dataset: ds.Dataset = ds.dataset(ledger_dir, format='parquet', partitioning='hive')
+    table: pa.Table = dataset.to_table(
+        columns=LEDGER_COLUMNS,
+        filter=reduce(operator.and_, conditions) if conditions else None
+    )
+
+    # Sort by date, keeping transactions on the same date in the order they were appended
+    return _to_frame(table).sort_values(by='Date', kind='stable').reset_index(drop=True)
+
+def _is_new(partition: pd.DataFrame, existing: pd.DataFrame) -> np.ndarray:
+    """
+    Finds the transactions of a partition that are not already stored in it.
+
+    The n-th occurrence of a (Date, Name, Amount) key in `partition` is new if the key is stored
+    fewer than n times.
+
+    Args:
+        partition (pd.DataFrame): The transactions to append to the partition.
+        existing (pd.DataFrame): The `KEY_COLUMNS` of the transactions already stored in the partition.
+
+    Returns:
+        np.ndarray: A boolean mask over `partition` that is True for new transactions.
+    """
+    if existing.empty:
+        return np.ones(len(partition), dtype=bool)
+
+    # Hash each key once, so occurrences can be counted over a single integer column
+    hashes: pd.Series = pd.util.hash_pandas_object(partition[KEY_COLUMNS].astype({'Name': object}), index=False)
+    stored: pd.Series = pd.util.hash_pandas_object(existing[KEY_COLUMNS].astype({'Name': object}), index=False)
+
+    occurrence: np.ndarray = hashes.groupby(hashes.to_numpy()).cumcount().to_numpy()
+    stored_count: np.ndarray = stored.value_counts().reindex(hashes.to_numpy(), fill_value=0).to_numpy()
+    return occurrence >= stored_count
+
+def _read_keys(partition_dir: str) -> pd.DataFrame:
+    """
+    Reads the `KEY_COLUMNS` of the transactions stored in a partition.
+
+    Args:
+        partition_dir (str): The directory of the partition.
+
+    Returns:
+        pd.DataFrame: The stored keys, or an empty DataFrame if the partition does not exist yet.
+    """
+    part_files: List[str] = _part_files(partition_dir)
+    if not part_files:
+        return pd.DataFrame(columns=KEY_COLUMNS)
+    return ds.dataset(part_files, format='parquet').to_table(columns=KEY_COLUMNS).to_pandas()
+
+def _part_files(directory: str, recursive: bool = False) -> List[str]:
+    """
+    Lists the Parquet files in a directory of the ledger.
+
+    Files whose name starts with an underscore, such as the ledger's summary, are not part of the
+    ledger and are skipped, as they are by `pyarrow.dataset`.
+
+    Args:
+        directory (str): The directory to list.
+        recursive (bool): Whether to also list the files of every subdirectory. Defaults to False.
+
+    Returns:
+        List[str]: The paths of the Parquet files, sorted by name.
+    """
+    if not os.path.isdir(directory):
+        return []
+    if recursive:
+        return sorted(
+            os.path.join(root, name)
+            for root, _, names in os.walk(directory) for name in names if _is_part_file(name)
+        )
+    return sorted(entry.path for entry in os.scandir(directory) if _is_part_file(entry.name))
+
+def _is_part_file(name: str) -> bool:
+    """
+    Checks whether a file name is that of a Parquet file of the ledger.
+
+    Args:
+        name (str): The file name.
+
+    Returns:
+        bool: True for Parquet files that do not start with an underscore.
+    """
+    return name.endswith('.parquet') and not name.startswith('_')
+
+def _to_table(df: pd.DataFrame) -> pa.Table:
+    """
+    Converts transactions to a table with the ledger's pinned schema.
+
+    Args:
+        df (pd.DataFrame): The transactions with `LEDGER_COLUMNS`.
+
+    Returns:
+        pa.Table: The transactions as an Arrow table with `_SCHEMA`.
+    """
+    # The 'Transaction' and 'Name' columns are dictionary encoded in memory, but stored as plain strings
+    return pa.Table.from_pandas(
+        df.astype({'Transaction': object, 'Name': object}), schema=_SCHEMA, preserve_index=False
+    )
+
+def _to_frame(table: pa.Table) -> pd.DataFrame:
+    """
+    Converts a table read from the ledger to transactions with the pipeline's dtypes.
+
+    Args:
+        table (pa.Table): The transactions read from the ledger.
+
+    Returns:
+        pd.DataFrame: The transactions with categorical 'Category' and 'Bank' columns.
+    """
+    df: pd.DataFrame = table.to_pandas()
+    return df.astype({'Category': CATEGORY_DTYPE, 'Bank': BANK_DTYPE})
@@ -1,41 +1,87 @@
 import pandas as pd
 
-from googleapiclient.discovery import build, Resource
+from googleapiclient.discovery import Resource
 from google.oauth2.credentials import Credentials
 
-from google_cloud import get_credentials, write_data
-from project_enums import Category
+from google_cloud import build_service, get_credentials, sync_spreadsheets
+from ledger import LEDGER_DIR, read_ledger
+from sheets_upload import SheetsUploader, authorized_http_factory
+from typing import List
+from watch import watch_inbox
 from wrangle_data import wrangle_data
 
-def main() -> None:
+# IDs of the Google Spreadsheets the transactions are synced to, such as one per household member
+SPREADSHEET_IDS: List[str] = ['1V5VGf8PrAFo6rbGqjZjbyeq_AZm87ETtUbt2wMwiHQs']
+
+def main(spreadsheet_ids: List[str] = SPREADSHEET_IDS, ledger_dir: str = LEDGER_DIR, **wrangle_options) -> None:
     """
     Main function to clean, categorize, and upload transaction data to a Google Spreadsheet.
 
     This function performs the following tasks:
-    1. Wrangles the transaction data by cleaning and categorizing it.
-    2. Obtains Google Sheets API credentials via OAuth 2.0.
-    3. Creates a Google Sheets API service resource.
-    4. Iterates through all defined categories and uploads the filtered data to the Google Sheet.
+    1. Wrangles the transaction data by cleaning and categorizing it, and appends it to the ledger.
+    2. Obtains Google Sheets API credentials via OAuth 2.0, reusing the stored token if there is one.
+    3. Creates a Google Sheets API service resource from the bundled discovery document.
+    4. Syncs every transaction of the ledger to the tab of its category of each Google Sheet, sending only
+       the rows that changed. The requests are sent concurrently and retried with backoff if they are rate
+       limited or fail.
+
+    The tabs mirror the whole ledger, as they do when synced by `watch`, so both share the same sync state
+    and neither clears the rows the other wrote.
+
+    Args:
+        spreadsheet_ids (List[str]): The IDs of the Google Spreadsheets to sync. Defaults to `SPREADSHEET_IDS`.
+        ledger_dir (str): The directory of the ledger the transactions are appended to and synced from.
+            Defaults to `LEDGER_DIR`.
+        **wrangle_options: The options passed to `wrangle_data`, such as the `inputs` to process.
 
     Raises:
+        ValueError: If `ledger_dir` is not a valid string.
         Exception: If any errors occur during the API call or data processing.
     """
-    # Wrangle and clean the transaction data
-    df: pd.DataFrame = wrangle_data()
+    if not ledger_dir or not isinstance(ledger_dir, str):
+        raise ValueError('Arg: ledger_dir must exist and be of type str')
 
-    # Obtain OAuth 2.0 credentials for Google Sheets API
+    # Wrangle and clean the transaction data, appending the transactions the ledger does not hold yet
+    wrangle_data(ledger_dir=ledger_dir, **wrangle_options)
+
+    # Sync from the ledger rather than this run's exports, so the tabs keep the transactions of earlier runs
+    df: pd.DataFrame = read_ledger(ledger_dir)
+    if df.empty:
+        return
+
+    # Obtain OAuth 2.0 credentials for Google Sheets API, refreshing the stored token if it expired
     credentials: Credentials = get_credentials()
 
-    # Build the Google Sheets API service resource
-    service: Resource = build('sheets', 'v4', credentials=credentials)
+    # Build the Google Sheets API service resource without fetching the discovery document
+    service: Resource = build_service(credentials)
+
+    # Sync the data of every category to its tab of each spreadsheet at once, sending only the rows that changed
+    with SheetsUploader(authorized_http_factory(credentials)) as uploader:
+        sync_spreadsheets(service, {spreadsheet_id: df for spreadsheet_id in spreadsheet_ids}, uploader)
+
+def watch(spreadsheet_ids: List[str] = SPREADSHEET_IDS, **watch_options) -> None:
+    """
+    Watches the inbox for new CSV exports, importing each one into the ledger and syncing the tabs it changed.
+
+    The credentials, service and uploader are set up once, so every sync reuses the same connections.
+    Each tab synced by the watcher holds every transaction of its category in the ledger, as it does
+    when synced by `main`.
+
+    Args:
+        spreadsheet_ids (List[str]): The IDs of the Google Spreadsheets to sync. Defaults to `SPREADSHEET_IDS`.
+        **watch_options: The options passed to `watch_inbox`, such as the `inbox_dir` to watch.
+    """
+    # Obtain OAuth 2.0 credentials and build the service once for the lifetime of the watcher
+    credentials: Credentials = get_credentials()
+    service: Resource = build_service(credentials)
 
-    # Specify the Google Spreadsheet ID to write data to
-    spreadsheet_id: str = '1V5VGf8PrAFo6rbGqjZjbyeq_AZm87ETtUbt2wMwiHQs'
+    with SheetsUploader(authorized_http_factory(credentials)) as uploader:
+        def sync(df: pd.DataFrame, categories: List[str]) -> None:
+            # Sync only the tabs of the categories that gained transactions
+            spreadsheets = {spreadsheet_id: df for spreadsheet_id in spreadsheet_ids}
+            sync_spreadsheets(service, spreadsheets, uploader, categories=categories)
 
-    # Iterate through each category and upload the corresponding data to the Google Sheet
-    for category in Category:
-        # Capitalize the category name to match the Google Sheet tab name
-        write_data(service, category.value.capitalize(), spreadsheet_id, df)
+        watch_inbox(sync=sync, **watch_options)
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,360 @@
+import hashlib
+import json
+import os
+import re
+import numpy as np
+import pandas as pd
+
+from collections import OrderedDict
+from instrument import stage
+from project_enums import TransactionName
+from typing import List, NamedTuple, Optional, Tuple
+
+# Leading segment of a name and the segment after the first separator ('*', '#', digits, '.' or '-')
+_NAME_SEGMENTS: re.Pattern = re.compile(r'^(?P<head>[^*#\d\.-]*)(?:[*#\d\.-](?P<segment>[^*#\d\.-]*))?')
+
+# Number of raw names a name cache holds before it evicts the least recently used ones
+DEFAULT_NAME_CACHE_SIZE: int = 10_000
+
+# Directory where each bank's name cache can be stored between runs, one JSON file per bank
+NAME_CACHE_DIR: str = './cache/names'
+
+class NameRules(NamedTuple):
+    """
+    Compiled rule table used to standardize transaction names.
+
+    Attributes:
+        prefix_renames (dict): Leading name segments mapped directly to a standardized name.
+        processor_renames (dict): Payment processor prefixes whose merchant is the second segment,
+            mapped to the renames applied to that merchant.
+        substring_renames (list): Compiled substring patterns and the standardized name they collapse
+            a name to, in priority order.
+        uppercase_first (bool): Whether names are uppercased before being split. If False, unmatched
+            names keep their leading segment stripped of trailing whitespace and uppercased.
+    """
+    prefix_renames: dict
+    processor_renames: dict
+    substring_renames: List[Tuple[re.Pattern, str]]
+    uppercase_first: bool
+
+def extend_rules(
+    base: NameRules,
+    prefix_renames: Optional[dict] = None,
+    processor_renames: Optional[dict] = None,
+    substring_renames: Optional[List[Tuple[tuple, str]]] = None,
+    uppercase_first: Optional[bool] = None
+) -> NameRules:
+    """
+    Builds a bank's rule table by overlaying its own rules on top of a shared rule table.
+
+    Overlay renames take precedence over base renames for the same prefix, and overlay
+    substring rules are checked after the base substring rules.
+
+    Args:
+        base (NameRules): The shared rule table to extend.
+        prefix_renames (dict, optional): Additional leading segments mapped to a standardized name.
+        processor_renames (dict, optional): Additional payment processor prefixes and their merchant renames.
+        substring_renames (List[Tuple[tuple, str]], optional): Additional substrings and the standardized
+            name they collapse a name to, in priority order.
+        uppercase_first (bool, optional): Overrides whether names are uppercased before being split.
+
+    Returns:
+        NameRules: The combined and compiled rule table.
+
+    Raises:
+        ValueError: If `base` is not of class NameRules.
+    """
+    if not isinstance(base, NameRules):
+        raise ValueError('Arg: base must be of class NameRules')
+
+    # Compile each group of substrings into a single pattern once, rather than on every name
+    compiled: List[Tuple[re.Pattern, str]] = [
+        (re.compile('|'.join(re.escape(substring) for substring in substrings)), standard_name)
+        for substrings, standard_name in (substring_renames or [])
+    ]
+
+    return NameRules(
+        prefix_renames={**base.prefix_renames, **(prefix_renames or {})},
+        processor_renames={**base.processor_renames, **(processor_renames or {})},
+        substring_renames=base.substring_renames + compiled,
+        uppercase_first=base.uppercase_first if uppercase_first is None else uppercase_first
+    )
+
+class NameCache:
+    """
+    Bounded memo of raw transaction names and the standardized names a rule table gives them.
+
+    Statements repeat the same few hundred raw names, so names seen in an earlier call are looked 
+    up instead of running the rules again. When the cache is full, the least recently used names 
+    are evicted. A cache must only ever be used with a single rule table.
+
+    Attributes:
+        max_size (int): The maximum number of raw names held.
+        hits (int): The number of distinct raw names found in the cache.
+        misses (int): The number of distinct raw names the rules had to be run for.
+        evictions (int): The number of raw names evicted to stay within `max_size`.
+    """
+    def __init__(self, max_size: int = DEFAULT_NAME_CACHE_SIZE) -> None:
+        """
+        Creates an empty name cache.
+
+        Args:
+            max_size (int): The maximum number of raw names held. Defaults to `DEFAULT_NAME_CACHE_SIZE`.
+
+        Raises:
+            ValueError: If `max_size` is not a positive int.
+        """
+        if not isinstance(max_size, int) or max_size <= 0:
+            raise ValueError('Arg: max_size must be a positive int')
+
+        self.max_size: int = max_size
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self._names: OrderedDict = OrderedDict()
+
+    def __len__(self) -> int:
+        """
+        Returns:
+            int: The number of raw names held.
+        """
+        return len(self._names)
+
+    def stats(self) -> dict:
+        """
+        Reports how much work the cache has saved.
+
+        Returns:
+            dict: The size, maximum size, hits, misses, evictions and hit rate of the cache.
+        """
+        lookups: int = self.hits + self.misses
+        return {
+            'size': len(self._names),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+    def save(self, cache_path: str, rules: NameRules) -> None:
+        """
+        Stores the cached names as JSON, so a later run can start with a warm cache.
+
+        Args:
+            cache_path (str): The file path of the JSON file to write.
+            rules (NameRules): The rule table the cached names were standardized with.
+
+        Raises:
+            ValueError: If `cache_path` is not a valid string or `rules` is not of class NameRules.
+        """
+        if not cache_path or not isinstance(cache_path, str):
+            raise ValueError('Arg: cache_path must exist and be of type str')
+        if not isinstance(rules, NameRules):
+            raise ValueError('Arg: rules must be of class NameRules')
+
+        os.makedirs(os.path.dirname(cache_path) or '.', exist_ok=True)
+
+        # Write to a temporary file of this process first, so an interrupted run never leaves a partial
+        # cache behind and processes cleaning exports of the same bank never write to the same file
+        temp_path: str = f'{cache_path}.{os.getpid()}.tmp'
+        with open(temp_path, 'w') as file:
+            json.dump({'rules': _rules_fingerprint(rules), 'names': list(self._names.items())}, file)
+        os.replace(temp_path, cache_path)
+
+    def load(self, cache_path: str, rules: NameRules) -> None:
+        """
+        Adds the names stored by `save` to the cache, if they were standardized with the same rule table.
+
+        Names already in the cache are kept, and the least recently used names are evicted if the
+        stored names do not fit.
+
+        Args:
+            cache_path (str): The file path of the JSON file to read. Nothing is added if it does not exist.
+            rules (NameRules): The rule table the cache is used with.
+
+        Raises:
+            ValueError: If `cache_path` is not a valid string or `rules` is not of class NameRules.
+        """
+        if not cache_path or not isinstance(cache_path, str):
+            raise ValueError('Arg: cache_path must exist and be of type str')
+        if not isinstance(rules, NameRules):
+            raise ValueError('Arg: rules must be of class NameRules')
+        if not os.path.exists(cache_path):
+            return
+
+        with open(cache_path) as file:
+            stored: dict = json.load(file)
+
+        # Names standardized by a different version of the rules may no longer be correct
+        if stored['rules'] != _rules_fingerprint(rules):
+            return
+
+        # Stored names are older than the ones this process standardized, so they are evicted first
+        names: OrderedDict = OrderedDict(
+            (name, standard_name) for name, standard_name in stored['names'] if name not in self._names
+        )
+        names.update(self._names)
+        while len(names) > self.max_size:
+            names.popitem(last=False)
+            self.evictions += 1
+        self._names = names
+
+    def _normalize(self, distinct: pd.Series, rules: NameRules) -> np.ndarray:
+        """
+        Standardizes distinct raw names, running the rules only for names missing from the cache.
+
+        Args:
+            distinct (pd.Series): The distinct raw names to standardize.
+            rules (NameRules): The rule table of the bank the names come from.
+
+        Returns:
+            np.ndarray: The standardized names, aligned with `distinct`.
+        """
+        cleaned: np.ndarray = np.empty(len(distinct), dtype=object)
+        missing: List[int] = []
+
+        # Look up every distinct name, marking the ones found as recently used
+        for position, name in enumerate(distinct):
+            if isinstance(name, str) and name in self._names:
+                self._names.move_to_end(name)
+                cleaned[position] = self._names[name]
+            else:
+                missing.append(position)
+
+        self.hits += len(distinct) - len(missing)
+        self.misses += len(missing)
+        if not missing:
+            return cleaned
+
+        # Run the rules once for all missing names and remember the results
+        missing_names: pd.Series = distinct.iloc[missing].reset_index(drop=True)
+        cleaned[missing] = _apply_rules(missing_names, rules).to_numpy()
+        for name, standard_name in zip(missing_names, cleaned[missing]):
+            if isinstance(name, str):
+                self._names[name] = standard_name
+
+        # Evict the least recently used names beyond the maximum size
+        while len(self._names) > self.max_size:
+            self._names.popitem(last=False)
+            self.evictions += 1
+
+        return cleaned
+
+@stage
+def normalize_names(names: pd.Series, rules: NameRules, cache: Optional[NameCache] = None) -> pd.Series:
+    """
+    Cleans and standardizes a column of transaction names with the given rule table.
+
+    The rules are applied to the distinct names of the whole column at once instead of row by row, 
+    and the result is dictionary encoded: each transaction only holds the code of its standardized 
+    name, so a name repeated on millions of rows is stored once.
+
+    Args:
+        names (pd.Series): The 'Name' column of the DataFrame containing transaction data.
+        rules (NameRules): The rule table of the bank the names come from.
+        cache (NameCache, optional): A cache of names standardized with `rules` by earlier calls, 
+            which is updated with the names of this call. Defaults to None.
+
+    Returns:
+        pd.Series: The standardized transaction names as a categorical, aligned with `names`.
+
+    Raises:
+        ValueError: If `names` is not of type `pd.Series`, `rules` is not of class NameRules, 
+            or `cache` is not of class NameCache.
+    """
+    if not isinstance(names, pd.Series):
+        raise ValueError('Arg: names must be of class pd.Series')
+    if not isinstance(rules, NameRules):
+        raise ValueError('Arg: rules must be of class NameRules')
+    if cache is not None and not isinstance(cache, NameCache):
+        raise ValueError('Arg: cache must be of class NameCache')
+
+    # Statements repeat the same descriptors, so run the rules once per distinct name
+    codes, uniques = pd.factorize(names, use_na_sentinel=False)
+    distinct: pd.Series = pd.Series(uniques, dtype=object)
+    if cache is None:
+        cleaned: np.ndarray = _apply_rules(distinct, rules).to_numpy()
+    else:
+        cleaned = cache._normalize(distinct, rules)
+
+    # Merge raw names that standardize to the same name, and map every transaction to the code of its name
+    name_codes, standard_names = pd.factorize(cleaned)
+    return pd.Series(
+        pd.Categorical.from_codes(name_codes[codes], categories=standard_names), index=names.index, name=names.name
+    )
+
+def _apply_rules(distinct: pd.Series, rules: NameRules) -> pd.Series:
+    """
+    Runs a rule table over distinct raw names.
+
+    Args:
+        distinct (pd.Series): The distinct raw names, with a default index.
+        rules (NameRules): The rule table of the bank the names come from.
+
+    Returns:
+        pd.Series: The standardized names, aligned with `distinct`.
+    """
+    if rules.uppercase_first:
+        distinct = distinct.str.upper()
+
+    # Split off the leading segment of each name and the segment following the first separator
+    parts: pd.DataFrame = distinct.str.extract(_NAME_SEGMENTS)
+    head: pd.Series = parts['head']
+
+    # By default use the leading segment, stripping trailing whitespace and converting to uppercase
+    default: pd.Series = head if rules.uppercase_first else head.str.rstrip().str.upper()
+    cleaned: pd.Series = default.copy()
+
+    # Collapse names containing known substrings, applied in reverse so the first rule wins
+    for pattern, standard_name in reversed(rules.substring_renames):
+        cleaned = cleaned.mask(default.str.contains(pattern), standard_name)
+
+    # Rename names whose leading segment maps directly to a standardized name
+    cleaned = cleaned.mask(head.isin(rules.prefix_renames.keys()), head.map(rules.prefix_renames))
+
+    # For payment processors the merchant is the second segment, which may also need renaming
+    merchant: pd.Series = parts['segment'].str.rstrip()
+    for prefix, renames in rules.processor_renames.items():
+        is_processor: pd.Series = head == prefix
+        renamed: pd.Series = merchant.mask(merchant.isin(renames.keys()), merchant.map(renames))
+        cleaned = cleaned.mask(is_processor, renamed)
+
+    return cleaned
+
+def _rules_fingerprint(rules: NameRules) -> str:
+    """
+    Hashes a rule table, so names stored by a `NameCache` are only reused with the same rules.
+
+    Args:
+        rules (NameRules): The rule table to hash.
+
+    Returns:
+        str: The hex digest of the rule table's contents.
+    """
+    return hashlib.sha256(repr(rules).encode()).hexdigest()
+
+# Rule table with no rules, used as the base for banks that share nothing with card statements
+EMPTY_RULES: NameRules = NameRules(
+    prefix_renames={},
+    processor_renames={},
+    substring_renames=[],
+    uppercase_first=False
+)
+
+# Rules shared by credit card statements, which bank cleaners extend with their own overlay
+CARD_RULES: NameRules = extend_rules(
+    EMPTY_RULES,
+    prefix_renames={
+        TransactionName.CPI.value: TransactionName.VENDING_MACHINE.value,
+        TransactionName.VC.value: TransactionName.VET.value,
+        TransactionName.AMAZON_PRIME.value: TransactionName.AMAZON_PRIME.value.upper(),
+    },
+    processor_renames={
+        TransactionName.PAYPAL.value: {TransactionName.STARBUCKSSE.value: TransactionName.STARBUCKS.value},
+        TransactionName.SQ.value: {TransactionName.A_CLIP_ABOVE.value: TransactionName.GROOMER.value},
+    },
+    substring_renames=[
+        (TransactionName.AMAZON.value, TransactionName.AMAZON.value[0]),
+    ]
+)
@@ -11,6 +11,28 @@ class TransactionType(Enum):
     DEBIT = 'DEBIT'
     CREDIT = 'CREDIT'
 
+class Bank(Enum):
+    """
+    Enum representing the banks whose statement exports can be ingested.
+
+    Attributes:
+        FIDELITY (str): Indicates a Fidelity credit card export.
+        COSTCO (str): Indicates a Costco credit card export.
+        SOFI (str): Indicates a SoFi bank account export.
+    """
+    FIDELITY = 'FIDELITY'
+    COSTCO = 'COSTCO'
+    SOFI = 'SOFI'
+
+class DateFormat(Enum):
+    """
+    Enum representing the formats used to display transaction dates.
+
+    Attributes:
+        DISPLAY (str): The MM/DD/YYYY format dates are written in when exported.
+    """
+    DISPLAY = '%m/%d/%Y'
+
 class PaidOff(Enum):
     """
     Enum representing paid-off transactions that should be excluded.
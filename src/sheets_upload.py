@@ -0,0 +1,223 @@
+import random
+import threading
+import time
+import httplib2
+
+from concurrent.futures import ThreadPoolExecutor
+from google_auth_httplib2 import AuthorizedHttp
+from google.oauth2.credentials import Credentials
+from googleapiclient.errors import HttpError
+from googleapiclient.http import HttpRequest
+from typing import Callable, List, Optional
+
+# Number of Google Sheets API requests in flight at once, each sent over its own connection
+MAX_CONCURRENT_REQUESTS: int = 4
+
+# Requests sent per minute, matching the Google Sheets API's default write quota per user
+REQUESTS_PER_MINUTE: int = 60
+
+# Number of times a request is retried after a rate limit, server or connection error
+MAX_RETRIES: int = 5
+
+# Upper bound on the delay before the first retry, doubled on every later retry
+BACKOFF_SECONDS: float = 1.0
+
+# Upper bound on the delay before any retry
+MAX_BACKOFF_SECONDS: float = 32.0
+
+# HTTP status codes of errors that are retried: rate limits and transient server errors
+RETRY_STATUSES: frozenset = frozenset({429, 500, 502, 503, 504})
+
+class SheetsUploader:
+    """
+    Sends Google Sheets API requests concurrently within a request budget, retrying transient errors.
+
+    Requests are sent by a pool of worker threads. httplib2 connections are not thread-safe, so
+    each worker creates its own HTTP session on its first request and reuses it, with its open
+    connection, for every later request. Every attempt, including retries, takes a slot of the
+    per-minute budget shared by all workers, so syncing several spreadsheets at once stays
+    within the quota. Rate limit (429) and server (5xx) errors are retried with capped
+    exponential backoff and full jitter, honouring the server's Retry-After header.
+
+    Without an `http_factory`, requests are sent one at a time over the service's own HTTP session.
+
+    Attributes:
+        max_concurrent_requests (int): The number of requests in flight at once.
+        max_retries (int): The number of times a failed request is retried.
+    """
+    def __init__(
+        self,
+        http_factory: Optional[Callable[[], httplib2.Http]] = None,
+        max_concurrent_requests: Optional[int] = None,
+        requests_per_minute: int = REQUESTS_PER_MINUTE,
+        max_retries: int = MAX_RETRIES
+    ) -> None:
+        """
+        Creates an uploader, starting its worker threads if requests are sent concurrently.
+
+        Args:
+            http_factory (Callable[[], httplib2.Http], optional): Creates the HTTP session of a worker thread,
+                such as `authorized_http_factory(credentials)`. Defaults to None, which sends requests one
+                at a time over the service's own HTTP session.
+            max_concurrent_requests (int, optional): The number of requests in flight at once. Defaults to
+                `MAX_CONCURRENT_REQUESTS` with an `http_factory`, and to 1 without.
+            requests_per_minute (int): The number of requests sent per minute. Defaults to `REQUESTS_PER_MINUTE`.
+            max_retries (int): The number of times a failed request is retried. Defaults to `MAX_RETRIES`.
+
+        Raises:
+            ValueError: If any of the limits is not a positive int, if `max_retries` is negative, or if
+                requests are sent concurrently without an `http_factory`.
+        """
+        if max_concurrent_requests is None:
+            max_concurrent_requests = MAX_CONCURRENT_REQUESTS if http_factory else 1
+        if not isinstance(max_concurrent_requests, int) or max_concurrent_requests <= 0:
+            raise ValueError('Arg: max_concurrent_requests must be a positive int')
+        if not isinstance(requests_per_minute, int) or requests_per_minute <= 0:
+            raise ValueError('Arg: requests_per_minute must be a positive int')
+        if not isinstance(max_retries, int) or max_retries < 0:
+            raise ValueError('Arg: max_retries must be a non-negative int')
+        if http_factory is None and max_concurrent_requests > 1:
+            raise ValueError('Arg: http_factory must be given to send requests concurrently')
+
+        self.max_concurrent_requests: int = max_concurrent_requests
+        self.max_retries: int = max_retries
+        self._http_factory: Optional[Callable[[], httplib2.Http]] = http_factory
+        self._local: threading.local = threading.local()
+        self._budget: _RequestBudget = _RequestBudget(requests_per_minute)
+        self._pool: Optional[ThreadPoolExecutor] = (
+            ThreadPoolExecutor(max_concurrent_requests, thread_name_prefix='sheets')
+            if max_concurrent_requests > 1 else None
+        )
+
+    def __enter__(self) -> 'SheetsUploader':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Stops the worker threads once the requests already submitted have been sent.
+        """
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+
+    def execute_all(self, requests: List[HttpRequest]) -> List[dict]:
+        """
+        Sends requests that do not depend on each other, concurrently if the uploader has workers.
+
+        Args:
+            requests (List[HttpRequest]): The Google Sheets API requests to send.
+
+        Returns:
+            List[dict]: The response of each request, in the order of `requests`.
+
+        Raises:
+            HttpError: If a request fails with an error that is not retried, or still fails after `max_retries`.
+        """
+        if self._pool is None or len(requests) <= 1:
+            return [self.execute(request) for request in requests]
+        return list(self._pool.map(self.execute, requests))
+
+    def execute(self, request: HttpRequest) -> dict:
+        """
+        Sends a request within the budget, retrying rate limit, server and connection errors.
+
+        Args:
+            request (HttpRequest): The Google Sheets API request to send.
+
+        Returns:
+            dict: The response of the request.
+
+        Raises:
+            HttpError: If the request fails with an error that is not retried, or still fails after `max_retries`.
+            OSError: If the connection still fails after `max_retries`.
+            httplib2.ServerNotFoundError: If the server's name still cannot be resolved after `max_retries`.
+        """
+        attempt: int = 0
+        while True:
+            self._budget.acquire()
+            try:
+                return request.execute(http=self._http())
+            except HttpError as error:
+                if error.resp.status not in RETRY_STATUSES or attempt >= self.max_retries:
+                    raise
+                retry_after: float = _retry_after(error)
+            except (OSError, httplib2.ServerNotFoundError):
+                # Covers dropped connections, timeouts and TLS errors, as well as DNS lookups that failed
+                if attempt >= self.max_retries:
+                    raise
+                retry_after = 0.0
+
+            # Back off exponentially with full jitter, so concurrent workers do not retry in lockstep
+            time.sleep(max(retry_after, random.uniform(0, min(MAX_BACKOFF_SECONDS, BACKOFF_SECONDS * 2 ** attempt))))
+            attempt += 1
+
+    def _http(self) -> Optional[httplib2.Http]:
+        """
+        Gets the HTTP session of the current thread, creating it on the thread's first request.
+
+        Returns:
+            httplib2.Http: The thread's HTTP session, or None to use the service's own session.
+        """
+        if self._http_factory is None:
+            return None
+        if not hasattr(self._local, 'http'):
+            self._local.http = self._http_factory()
+        return self._local.http
+
+def authorized_http_factory(credentials: Credentials) -> Callable[[], httplib2.Http]:
+    """
+    Creates HTTP sessions authorized with the same credentials, one per worker thread.
+
+    Args:
+        credentials (Credentials): The credentials to authorize requests with.
+
+    Returns:
+        Callable[[], httplib2.Http]: A function creating a new authorized HTTP session.
+    """
+    return lambda: AuthorizedHttp(credentials, http=httplib2.Http())
+
+class _RequestBudget:
+    """
+    Token bucket limiting the number of requests sent per minute across threads.
+
+    The bucket starts full, so up to a minute's worth of requests are sent at once, then refills
+    one request at a time at the per-minute rate.
+    """
+    def __init__(self, requests_per_minute: int) -> None:
+        self._capacity: float = float(requests_per_minute)
+        self._tokens: float = float(requests_per_minute)
+        self._rate: float = requests_per_minute / 60
+        self._updated: float = time.monotonic()
+        self._lock: threading.Lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """
+        Waits until a request may be sent and takes its slot in the budget.
+        """
+        with self._lock:
+            now: float = time.monotonic()
+            self._tokens = min(self._capacity, self._tokens + (now - self._updated) * self._rate)
+            self._updated = now
+
+            # Reserve the slot now, and wait for the bucket to refill it if it was empty
+            self._tokens -= 1
+            wait: float = -self._tokens / self._rate if self._tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+
+def _retry_after(error: HttpError) -> float:
+    """
+    Reads the delay requested by the server before retrying a failed request.
+
+    Args:
+        error (HttpError): The error the request failed with.
+
+    Returns:
+        float: The delay in seconds from the Retry-After header, or 0 if the header is missing or a date.
+    """
+    try:
+        return float(error.resp.get('retry-after', 0))
+    except ValueError:
+        return 0.0
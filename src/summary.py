@@ -0,0 +1,111 @@
+import os
+import numpy as np
+import pandas as pd
+
+from categorize import CATEGORY_DTYPE
+from instrument import stage
+from ledger import BANK_DTYPE, LEDGER_DIR, read_ledger
+from project_enums import Bank
+from typing import List
+
+# File name of the summary within the ledger directory; the leading underscore keeps it out of the ledger's dataset
+SUMMARY_FILE: str = '_summary.parquet'
+
+# Columns of the summary, in column order: the month, category, name and bank grouped by, then their aggregates
+SUMMARY_COLUMNS: List[str] = ['Month', 'Category', 'Name', 'Bank', 'Total', 'Count']
+
+# Columns the summary is grouped by
+_GROUP_COLUMNS: List[str] = ['Month', 'Category', 'Name', 'Bank']
+
+def summarize(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Sums and counts transactions by month, category, name and bank in a single groupby.
+
+    Args:
+        df (pd.DataFrame): Categorized transactions with 'Date', 'Name', 'Amount', 'Category' and 'Bank' columns.
+
+    Returns:
+        pd.DataFrame: One row per (month, category, name, bank) with `SUMMARY_COLUMNS`, where 'Month' is
+            the first day of the month, 'Total' the sum of the amounts and 'Count' the number of transactions.
+            Rows are sorted by the grouped columns.
+    """
+    # Truncate every date to the first day of its month
+    months: np.ndarray = df['Date'].to_numpy().astype('datetime64[M]').astype('datetime64[ns]')
+
+    summary: pd.DataFrame = df.groupby(
+        [pd.Series(months, index=df.index, name='Month'), 'Category', 'Name', 'Bank'], observed=True, sort=True
+    )['Amount'].agg(Total='sum', Count='size').reset_index()
+
+    summary['Total'] = summary['Total'].round(2)
+    return summary.astype({'Category': CATEGORY_DTYPE, 'Bank': BANK_DTYPE})
+
+@stage
+def update_summary(df: pd.DataFrame, ledger_dir: str = LEDGER_DIR) -> pd.DataFrame:
+    """
+    Updates the summary of the ledger for the months and banks of newly appended transactions.
+
+    Only the ledger partitions in the range of months of `df`, and of its banks, are read back and
+    summarized, replacing their rows of the stored summary. Every other row is kept as is, so
+    importing a new month costs about as much as summarizing that month. The summary is stored
+    as `SUMMARY_FILE` in the ledger directory.
+
+    Args:
+        df (pd.DataFrame): The categorized transactions that were just appended to the ledger.
+        ledger_dir (str): The directory of the ledger. Defaults to `LEDGER_DIR`.
+
+    Returns:
+        pd.DataFrame: The updated summary of the whole ledger, with `SUMMARY_COLUMNS`.
+
+    Raises:
+        ValueError: If `df` is not of class `pd.DataFrame` or if `ledger_dir` is not a valid string.
+    """
+    if not isinstance(df, pd.DataFrame):
+        raise ValueError('Arg: df must be of class pd.DataFrame')
+    if not ledger_dir or not isinstance(ledger_dir, str):
+        raise ValueError('Arg: ledger_dir must exist and be of type str')
+
+    summary: pd.DataFrame = read_summary(ledger_dir)
+    if df.empty:
+        return summary
+
+    # Re-read the affected partitions, so the summary includes transactions appended by earlier runs
+    start: pd.Timestamp = df['Date'].min().to_period('M').start_time
+    end: pd.Timestamp = df['Date'].max().to_period('M').end_time
+    banks: List[Bank] = [Bank(bank) for bank in pd.unique(df['Bank'].astype(object))]
+    updated: pd.DataFrame = summarize(read_ledger(ledger_dir, start, end, banks))
+
+    # Keep the rows of every month and bank that was not summarized again
+    kept: pd.DataFrame = summary[~(
+        summary['Month'].between(start, end) & summary['Bank'].isin([bank.value for bank in banks])
+    )]
+    summary = pd.concat([kept, updated], ignore_index=True).sort_values(_GROUP_COLUMNS, ignore_index=True)
+
+    # Write to a temporary file first so an interrupted run never leaves a partial summary behind
+    summary_path: str = os.path.join(ledger_dir, SUMMARY_FILE)
+    os.makedirs(ledger_dir, exist_ok=True)
+    summary.to_parquet(f'{summary_path}.tmp', index=False)
+    os.replace(f'{summary_path}.tmp', summary_path)
+
+    return summary
+
+def read_summary(ledger_dir: str = LEDGER_DIR) -> pd.DataFrame:
+    """
+    Reads the stored summary of the ledger.
+
+    Args:
+        ledger_dir (str): The directory of the ledger. Defaults to `LEDGER_DIR`.
+
+    Returns:
+        pd.DataFrame: The summary with `SUMMARY_COLUMNS`, or an empty summary if none was stored yet.
+    """
+    summary_path: str = os.path.join(ledger_dir, SUMMARY_FILE)
+    if not os.path.exists(summary_path):
+        return pd.DataFrame({
+            'Month': pd.Series(dtype='datetime64[ns]'),
+            'Category': pd.Series(dtype=CATEGORY_DTYPE),
+            'Name': pd.Series(dtype=object),
+            'Bank': pd.Series(dtype=BANK_DTYPE),
+            'Total': pd.Series(dtype=np.float64),
+            'Count': pd.Series(dtype=np.int64),
+        })
+    return pd.read_parquet(summary_path).astype({'Category': CATEGORY_DTYPE, 'Bank': BANK_DTYPE})
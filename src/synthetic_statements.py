@@ -0,0 +1,289 @@
+import csv
+import os
+import numpy as np
+import pandas as pd
+
+from project_enums import Bank
+from typing import Iterator, List, NamedTuple
+
+class Descriptor(NamedTuple):
+    """
+    A kind of transaction that appears on a bank's statements.
+
+    Attributes:
+        template (str): The raw description, where '{code}' is replaced by a random reference code
+            unique to each transaction and '{store}' by one of a few hundred store numbers.
+        weight (float): The relative frequency of the transaction.
+        low (float): The smallest amount of the transaction.
+        high (float): The largest amount of the transaction.
+        kind (str): The transaction type as written in the export, e.g. 'DEBIT' or 'Direct Deposit'.
+    """
+    template: str
+    weight: float
+    low: float
+    high: float
+    kind: str
+
+# Number of rows generated at a time, which bounds memory use when writing large statements
+CHUNK_ROWS: int = 1_000_000
+
+# Number of distinct store numbers used in '{store}' descriptors
+_STORES: int = 300
+
+# Characters of the random reference codes used in '{code}' descriptors
+_CODE_CHARS: np.ndarray = np.frombuffer(b'ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789', dtype=np.uint8)
+
+# Mix of transactions on each bank's statements, modeled on real exports
+DESCRIPTORS: dict = {
+    Bank.FIDELITY: [
+        Descriptor('AMAZON MKTPL*{code} Amzn.com/bill WA', 0.16, 5.00, 120.00, 'DEBIT'),
+        Descriptor('AMAZON MARK* {code} HTTPSAMAZON.C WA', 0.05, 5.00, 80.00, 'DEBIT'),
+        Descriptor('Amazon Prime*{code} Amzn.com/bill WA', 0.01, 14.99, 14.99, 'DEBIT'),
+        Descriptor('ROVER.COM* PET SVCS.   WWW.ROVER.COM WA', 0.06, 10.00, 90.00, 'DEBIT'),
+        Descriptor('CSC SERVICEWORKS ULTRA PLAINVIEW     NY', 0.06, 2.00, 4.00, 'DEBIT'),
+        Descriptor('KING SOOPERS #{store} DENVER CO', 0.12, 15.00, 180.00, 'DEBIT'),
+        Descriptor('SAFEWAY #{store} DENVER CO', 0.06, 10.00, 140.00, 'DEBIT'),
+        Descriptor('COSTCO WHSE #{store} LONE TREE CO', 0.05, 40.00, 350.00, 'DEBIT'),
+        Descriptor('PAYPAL *STARBUCKSSE {store} 402-935-7733 CA', 0.05, 4.00, 12.00, 'DEBIT'),
+        Descriptor('SQ *A CLIP ABOVE Denver CO', 0.02, 40.00, 90.00, 'DEBIT'),
+        Descriptor('CPI*VENDING {store} DENVER CO', 0.02, 1.00, 3.00, 'DEBIT'),
+        Descriptor('VC*VCA ANIMAL HOSP {store} DENVER CO', 0.02, 80.00, 400.00, 'DEBIT'),
+        Descriptor('SHELL OIL {store} DENVER CO', 0.04, 25.00, 70.00, 'DEBIT'),
+        Descriptor('SPOTIFY 877-778-1161 NY', 0.01, 11.99, 11.99, 'DEBIT'),
+        Descriptor('HULU 877-824-4858 CA', 0.01, 17.99, 17.99, 'DEBIT'),
+        Descriptor('WAGTOPIA DENVER CO', 0.01, 30.00, 60.00, 'DEBIT'),
+        Descriptor('RX PLUS PHARMACY DENVER CO', 0.01, 5.00, 60.00, 'DEBIT'),
+        Descriptor('CHIPOTLE {store} DENVER CO', 0.06, 9.00, 30.00, 'DEBIT'),
+        Descriptor('TARGET 000{store} DENVER CO', 0.05, 10.00, 200.00, 'DEBIT'),
+        Descriptor('AMAZON MKTPLACE PMTS Amzn.com/bill WA', 0.01, 5.00, 80.00, 'CREDIT'),
+        Descriptor('INTERNET PAYMENT THANK YOU', 0.02, 200.00, 2500.00, 'CREDIT'),
+    ],
+    Bank.COSTCO: [
+        Descriptor('COSTCO GAS #{store} LONE TREE CO', 0.18, 20.00, 70.00, 'DEBIT'),
+        Descriptor('COSTCO WHSE #{store} LONE TREE CO', 0.16, 40.00, 350.00, 'DEBIT'),
+        Descriptor('European Wax Center Denver CO', 0.03, 50.00, 160.00, 'DEBIT'),
+        Descriptor('AMAZON MKTPL*{code} Amzn.com/billWA', 0.14, 5.00, 120.00, 'DEBIT'),
+        Descriptor('COMCAST CABLE COMM 800-266-2278 CO', 0.02, 65.00, 65.00, 'DEBIT'),
+        Descriptor('XFINITY MOBILE 888-936-4968 PA', 0.02, 45.00, 45.00, 'DEBIT'),
+        Descriptor('KING SOOPERS #{store} DENVER CO', 0.10, 15.00, 180.00, 'DEBIT'),
+        Descriptor('SAFEWAY #{store} DENVER CO', 0.05, 10.00, 140.00, 'DEBIT'),
+        Descriptor('SHELL OIL {store} DENVER CO', 0.05, 25.00, 70.00, 'DEBIT'),
+        Descriptor('CRUNCHYROLL*{code} SAN FRANCISCOCA', 0.01, 7.99, 7.99, 'DEBIT'),
+        Descriptor('SPOT PET INSURANCE 855-412-8823 FL', 0.01, 42.00, 42.00, 'DEBIT'),
+        Descriptor('HEADWAY 800-555-1234 NY', 0.01, 30.00, 30.00, 'DEBIT'),
+        Descriptor('TARGET 000{store} DENVER CO', 0.08, 10.00, 200.00, 'DEBIT'),
+        Descriptor('CHIPOTLE {store} DENVER CO', 0.06, 9.00, 30.00, 'DEBIT'),
+        Descriptor('AMAZON MKTPL*{code} Amzn.com/billWA', 0.02, 5.00, 80.00, 'CREDIT'),
+        Descriptor('ONLINE PAYMENT, THANK YOU', 0.03, 200.00, 2500.00, 'CREDIT'),
+    ],
+    Bank.SOFI: [
+        Descriptor('DENVER HEALTH AN', 0.08, 1200.00, 1400.00, 'Direct Deposit'),
+        Descriptor('AH ROCKY MOUNTAI', 0.04, 200.00, 300.00, 'Direct Deposit'),
+        Descriptor('Interest earned', 0.03, 5.00, 30.00, 'Interest Earned'),
+        Descriptor('CARDMEMBER SERV', 0.08, 300.00, 6500.00, 'Direct Payment'),
+        Descriptor('FID BKG SVC LLC', 0.08, 100.00, 400.00, 'Direct Payment'),
+        Descriptor('From Spending Vault', 0.10, 10.00, 500.00, 'Deposit'),
+        Descriptor('To Savings Vault', 0.08, 10.00, 500.00, 'Withdrawal'),
+        Descriptor('XCEL ENERGY-PSCO', 0.06, 60.00, 180.00, 'Direct Payment'),
+        Descriptor('LIBERTY MUTUAL', 0.06, 10.00, 200.00, 'Direct Payment'),
+        Descriptor('ENT CU', 0.05, 300.00, 450.00, 'Direct Payment'),
+        Descriptor('STRATFORD STATIO', 0.05, 1500.00, 1900.00, 'Direct Payment'),
+        Descriptor('HEALTHONE', 0.03, 20.00, 300.00, 'Direct Payment'),
+        Descriptor('VENMO', 0.10, 5.00, 100.00, 'Direct Payment'),
+        Descriptor('ATM WITHDRAWAL {store}', 0.04, 20.00, 200.00, 'Direct Payment'),
+        Descriptor('Zelle payment to {code}', 0.06, 10.00, 300.00, 'Direct Payment'),
+    ],
+}
+
+def generate_statement(
+    bank: Bank,
+    rows: int,
+    seed: int = 0,
+    start: str = '2024-01-01',
+    days: int = 365
+) -> Iterator[pd.DataFrame]:
+    """
+    Generates a synthetic statement in a bank's CSV export format, `CHUNK_ROWS` rows at a time.
+
+    The rows follow the bank's mix of transactions in `DESCRIPTORS`, are dated across `days` days
+    from `start` in the order the bank exports them, and are fully determined by `seed`.
+
+    Args:
+        bank (Bank): The bank whose export format and transaction mix to generate.
+        rows (int): The number of rows to generate.
+        seed (int): The seed of the random generator. Defaults to 0.
+        start (str): The first date of the statement. Defaults to '2024-01-01'.
+        days (int): The number of days the statement covers. Defaults to 365.
+
+    Yields:
+        pd.DataFrame: Consecutive chunks of the statement, with the columns of the bank's export.
+
+    Raises:
+        ValueError: If `bank` is not of class Bank, or if `rows` or `days` is not a positive int.
+    """
+    if not isinstance(bank, Bank):
+        raise ValueError('Arg: bank must be of class Bank')
+    if not isinstance(rows, int) or rows <= 0:
+        raise ValueError('Arg: rows must be a positive int')
+    if not isinstance(days, int) or days <= 0:
+        raise ValueError('Arg: days must be a positive int')
+
+    descriptors: List[Descriptor] = DESCRIPTORS[bank]
+    weights: np.ndarray = np.array([descriptor.weight for descriptor in descriptors])
+    first_day: pd.Timestamp = pd.Timestamp(start)
+    chunks: int = -(-rows // CHUNK_ROWS)
+
+    # Fidelity lists transactions oldest first, the other banks newest first
+    newest_first: bool = bank != Bank.FIDELITY
+
+    for chunk_index in range(chunks):
+        # Seed each chunk on its own, so every chunk is the same no matter how many are generated
+        rng: np.random.Generator = np.random.default_rng([seed, chunk_index])
+        chunk_rows: int = min(CHUNK_ROWS, rows - chunk_index * CHUNK_ROWS)
+
+        # Each chunk covers its share of the days, so dates stay in order across chunks
+        position: int = chunks - 1 - chunk_index if newest_first else chunk_index
+        day_low: int = days * position // chunks
+        day_high: int = max(days * (position + 1) // chunks, day_low + 1)
+        dates: pd.DatetimeIndex = first_day + pd.to_timedelta(
+            np.sort(rng.integers(day_low, day_high, chunk_rows)), unit='D'
+        )
+
+        kinds: np.ndarray = rng.choice(len(descriptors), chunk_rows, p=weights / weights.sum())
+        names: np.ndarray = _fill_templates(rng, [descriptor.template for descriptor in descriptors], kinds)
+        low: np.ndarray = np.array([descriptor.low for descriptor in descriptors])[kinds]
+        high: np.ndarray = np.array([descriptor.high for descriptor in descriptors])[kinds]
+        amounts: np.ndarray = np.round(low + (high - low) * rng.random(chunk_rows), 2)
+        types: np.ndarray = np.array([descriptor.kind for descriptor in descriptors], dtype=object)[kinds]
+
+        yield _export_format(bank, rng, dates, names, amounts, types)
+
+def write_statement(
+    bank: Bank,
+    rows: int,
+    csv_path: str,
+    seed: int = 0,
+    start: str = '2024-01-01',
+    days: int = 365
+) -> None:
+    """
+    Writes a synthetic statement in a bank's CSV export format, one chunk at a time.
+
+    Args:
+        bank (Bank): The bank whose export format and transaction mix to generate.
+        rows (int): The number of rows to generate.
+        csv_path (str): The file path of the CSV file to write.
+        seed (int): The seed of the random generator. Defaults to 0.
+        start (str): The first date of the statement. Defaults to '2024-01-01'.
+        days (int): The number of days the statement covers. Defaults to 365.
+
+    Raises:
+        ValueError: If `csv_path` is not a valid string or is not a CSV file, or if any of the
+            other arguments are invalid.
+    """
+    if not csv_path or not isinstance(csv_path, str):
+        raise ValueError('Arg: csv_path must exist and be of type str')
+    if not csv_path.endswith('.csv'):
+        raise ValueError('Arg: csv_path must be of file type .csv')
+
+    os.makedirs(os.path.dirname(csv_path) or '.', exist_ok=True)
+
+    # Fidelity quotes every field, the other banks only the fields that need it
+    quoting: int = csv.QUOTE_ALL if bank == Bank.FIDELITY else csv.QUOTE_MINIMAL
+
+    for chunk_index, chunk in enumerate(generate_statement(bank, rows, seed, start, days)):
+        chunk.to_csv(
+            csv_path, mode='a' if chunk_index else 'w', header=not chunk_index, index=False,
+            quoting=quoting, float_format='%.2f'
+        )
+
+def _fill_templates(rng: np.random.Generator, templates: List[str], kinds: np.ndarray) -> np.ndarray:
+    """
+    Builds the raw description of every row from the template of its kind of transaction.
+
+    Args:
+        rng (np.random.Generator): The random generator of the chunk.
+        templates (List[str]): The description template of each kind of transaction.
+        kinds (np.ndarray): The kind of transaction of each row.
+
+    Returns:
+        np.ndarray: The raw description of each row.
+    """
+    names: np.ndarray = np.empty(len(kinds), dtype=object)
+
+    for kind, template in enumerate(templates):
+        rows: np.ndarray = np.flatnonzero(kinds == kind)
+        if not len(rows):
+            # Small statements may not draw every kind of transaction
+            continue
+        if '{code}' in template:
+            # Reference codes are 9 random characters, different for every transaction
+            codes: np.ndarray = _CODE_CHARS[rng.integers(0, len(_CODE_CHARS), (len(rows), 9))]
+            fill: pd.Series = pd.Series(codes.view('S9').ravel()).str.decode('ascii')
+            prefix, suffix = template.split('{code}')
+            names[rows] = (prefix + fill + suffix).to_numpy()
+        elif '{store}' in template:
+            stores: pd.Series = pd.Series(rng.integers(1, _STORES + 1, len(rows))).map('{:04d}'.format)
+            prefix, suffix = template.split('{store}')
+            names[rows] = (prefix + stores + suffix).to_numpy()
+        else:
+            names[rows] = template
+
+    return names
+
+def _export_format(
+    bank: Bank,
+    rng: np.random.Generator,
+    dates: pd.DatetimeIndex,
+    names: np.ndarray,
+    amounts: np.ndarray,
+    types: np.ndarray
+) -> pd.DataFrame:
+    """
+    Lays out generated transactions in the columns and conventions of a bank's CSV export.
+
+    Args:
+        bank (Bank): The bank whose export format to use.
+        rng (np.random.Generator): The random generator of the chunk.
+        dates (pd.DatetimeIndex): The date of each transaction, in ascending order.
+        names (np.ndarray): The raw description of each transaction.
+        amounts (np.ndarray): The positive amount of each transaction.
+        types (np.ndarray): The transaction type of each transaction.
+
+    Returns:
+        pd.DataFrame: The transactions with the columns of the bank's export.
+    """
+    is_debit: np.ndarray = np.isin(types, ['DEBIT', 'Direct Payment', 'Withdrawal'])
+
+    if bank == Bank.FIDELITY:
+        # Fidelity lists transactions oldest first, with debits as negative amounts
+        memo: pd.Series = pd.Series(rng.integers(10**17, 10**18, len(names))).astype(str)
+        return pd.DataFrame({
+            'Date': dates.strftime('%Y-%m-%d'),
+            'Transaction': types,
+            'Name': names,
+            'Memo': (memo + '; 05942; ; ; ;').to_numpy(),
+            'Amount': np.where(is_debit, -amounts, amounts),
+        })
+
+    if bank == Bank.COSTCO:
+        # Costco lists transactions newest first, with separate debit and credit columns
+        return pd.DataFrame({
+            'Status': 'Cleared',
+            'Date': dates.strftime('%m/%d/%Y'),
+            'Description': names,
+            'Debit': np.where(is_debit, amounts, np.nan),
+            'Credit': np.where(is_debit, np.nan, amounts),
+            'Member Name': np.where(rng.random(len(names)) < 0.5, 'PERSON ONE', 'PERSON TWO'),
+        }).iloc[::-1]
+
+    # SoFi lists transactions newest first, with debits as negative amounts and a running balance
+    signed: np.ndarray = np.where(is_debit, -amounts, amounts)
+    return pd.DataFrame({
+        'Date': dates.strftime('%Y-%m-%d'),
+        'Description': names,
+        'Type': types,
+        'Amount': signed,
+        'Current balance': np.round(5000 + np.cumsum(signed), 2),
+        'Status': 'Posted',
+    }).iloc[::-1]
@@ -0,0 +1,220 @@
+import json
+import os
+import time
+import pandas as pd
+
+from bank_adapters import detect_bank
+from ledger import LEDGER_DIR, append_ledger, read_ledger
+from project_enums import Bank
+from summary import update_summary
+from typing import Callable, Dict, List, Optional, Tuple
+from wrangle_data import wrangle_data
+
+# Directory watched for new CSV exports, such as the folder statements are downloaded to
+INBOX_DIR: str = './inbox'
+
+# Seconds between two scans of the inbox
+POLL_SECONDS: float = 5.0
+
+# JSON file recording the exports already processed and the tabs still to sync, so a restart resumes
+CHECKPOINT_PATH: str = './cache/watch_checkpoint.json'
+
+def watch_inbox(
+    inbox_dir: str = INBOX_DIR,
+    sync: Optional[Callable[[pd.DataFrame, List[str]], None]] = None,
+    ledger_dir: str = LEDGER_DIR,
+    checkpoint_path: str = CHECKPOINT_PATH,
+    poll_seconds: float = POLL_SECONDS,
+    once: bool = False,
+    **wrangle_options
+) -> None:
+    """
+    Watches a directory for new CSV exports and imports each one into the ledger as it lands.
+
+    The inbox is polled every `poll_seconds`. A scan only lists the directory and compares the
+    size and modification time of every .csv file with the checkpoint, so an idle watcher costs
+    next to nothing. A new or changed file is processed once it stopped changing between two
+    scans, so partially downloaded exports are never read. Its bank is detected from its header
+    row, and only that file is cleaned, categorized and appended to the ledger. The tabs of the
+    categories that gained transactions are then synced from the ledger by `sync`, leaving every
+    other tab untouched.
+
+    The checkpoint is written after every step, so a restarted watcher skips the exports it
+    already processed and first syncs any tabs an interrupted run left behind.
+
+    Args:
+        inbox_dir (str): The directory watched for CSV exports. Defaults to `INBOX_DIR`.
+        sync (Callable[[pd.DataFrame, List[str]], None], optional): Syncs the tabs of the given categories
+            with the ledger's transactions of those categories. Defaults to None, which only updates the ledger.
+        ledger_dir (str): The directory of the ledger. Defaults to `LEDGER_DIR`.
+        checkpoint_path (str): The checkpoint file. Defaults to `CHECKPOINT_PATH`.
+        poll_seconds (float): The seconds between two scans of the inbox. Defaults to `POLL_SECONDS`.
+        once (bool): Whether to process the exports already in the inbox and return, instead of
+            watching it until interrupted. Defaults to False.
+        **wrangle_options: The options passed to `wrangle_data`, such as `fuzzy`.
+
+    Raises:
+        ValueError: If `inbox_dir` is not a valid directory or `poll_seconds` is not a positive number.
+    """
+    if not inbox_dir or not isinstance(inbox_dir, str) or not os.path.isdir(inbox_dir):
+        raise ValueError('Arg: inbox_dir must be a valid directory')
+    if not isinstance(poll_seconds, (int, float)) or poll_seconds <= 0:
+        raise ValueError('Arg: poll_seconds must be a positive number')
+
+    checkpoint: dict = _load_checkpoint(checkpoint_path)
+
+    # Signature of every unprocessed file at the last scan, to tell when a download has finished
+    last_seen: Dict[str, List[int]] = {}
+
+    while True:
+        for name, signature in _scan(inbox_dir):
+            if checkpoint['files'].get(name) == signature:
+                continue
+            if not once and last_seen.get(name) != signature:
+                last_seen[name] = signature
+                continue
+            last_seen.pop(name, None)
+            _import_export(
+                os.path.join(inbox_dir, name), signature, checkpoint, checkpoint_path, ledger_dir, wrangle_options
+            )
+
+        # Sync the tabs that gained transactions, including those left behind by an interrupted run
+        if checkpoint['pending'] and sync is not None:
+            _sync_pending(checkpoint, checkpoint_path, ledger_dir, sync)
+
+        if once:
+            return
+        time.sleep(poll_seconds)
+
+def _import_export(
+    csv_path: str,
+    signature: List[int],
+    checkpoint: dict,
+    checkpoint_path: str,
+    ledger_dir: str,
+    wrangle_options: dict
+) -> None:
+    """
+    Cleans and categorizes a single CSV export and appends its new transactions to the ledger.
+
+    The categories of the export are added to the checkpoint's pending tabs before its transactions
+    are appended, and the summary is updated even if none of them were new to the ledger, so an
+    import that died part way is completed when the export is imported again. Exports that match
+    no bank or fail to parse are recorded as processed, so they are only tried again once the file
+    changes, while an export that could not be read or stored is tried again after the next scan.
+
+    Args:
+        csv_path (str): The file path to the CSV export.
+        signature (List[int]): The size and modification time of the file.
+        checkpoint (dict): The checkpoint, updated in place and written to `checkpoint_path`.
+        checkpoint_path (str): The checkpoint file.
+        ledger_dir (str): The directory of the ledger.
+        wrangle_options (dict): The options passed to `wrangle_data`.
+    """
+    name: str = os.path.basename(csv_path)
+    bank: Optional[Bank] = detect_bank(csv_path)
+    if bank is None:
+        print(f'{name}: header matches no bank, skipped')
+    else:
+        try:
+            df: pd.DataFrame = wrangle_data([(bank, csv_path)], ledger_dir=None, **wrangle_options)
+
+            # Mark the tabs as pending first, so they are still synced if the watcher dies while appending
+            if not df.empty:
+                categories: List[str] = [str(category) for category in pd.unique(df['Category'].astype(object))]
+                checkpoint['pending'] = sorted(set(checkpoint['pending']).union(categories))
+                _save_checkpoint(checkpoint_path, checkpoint)
+
+            added: int = append_ledger(df, ledger_dir)
+
+            # Summarize even if the ledger had every transaction already, as an earlier try may have died before it
+            if not df.empty:
+                update_summary(df, ledger_dir)
+        except (ValueError, pd.errors.ParserError) as error:
+            # Keep watching: a malformed export must not stop the imports of later ones
+            print(f'{name}: import failed, {error}')
+        except OSError as error:
+            # Leave the export unprocessed, as the file or the ledger may only be unavailable for now
+            print(f'{name}: import failed, retrying after the next scan: {error}')
+            return
+        else:
+            print(f'{name}: {bank.value}, {added} new transactions')
+
+    checkpoint['files'][name] = signature
+    _save_checkpoint(checkpoint_path, checkpoint)
+
+def _sync_pending(
+    checkpoint: dict,
+    checkpoint_path: str,
+    ledger_dir: str,
+    sync: Callable[[pd.DataFrame, List[str]], None]
+) -> None:
+    """
+    Syncs the tabs of the checkpoint's pending categories with the ledger.
+
+    The pending categories are only cleared once the sync succeeds, so a failed sync, such as
+    while offline, is retried after the next scan.
+
+    Args:
+        checkpoint (dict): The checkpoint, updated in place and written to `checkpoint_path`.
+        checkpoint_path (str): The checkpoint file.
+        ledger_dir (str): The directory of the ledger.
+        sync (Callable[[pd.DataFrame, List[str]], None]): Syncs the tabs of the given categories.
+    """
+    categories: List[str] = checkpoint['pending']
+    ledger: pd.DataFrame = read_ledger(ledger_dir)
+    try:
+        sync(ledger[ledger['Category'].isin(categories)], categories)
+    except Exception as error:
+        print(f"sync of {', '.join(categories)} failed, retrying after the next scan: {error}")
+        return
+
+    checkpoint['pending'] = []
+    _save_checkpoint(checkpoint_path, checkpoint)
+
+def _scan(inbox_dir: str) -> List[Tuple[str, List[int]]]:
+    """
+    Lists the CSV files of the inbox with their size and modification time, without opening them.
+
+    Args:
+        inbox_dir (str): The directory watched for CSV exports.
+
+    Returns:
+        List[Tuple[str, List[int]]]: The name and [size, modification time in ns] of every .csv file, sorted by name.
+    """
+    files: List[Tuple[str, List[int]]] = []
+    for entry in os.scandir(inbox_dir):
+        if entry.is_file() and entry.name.endswith('.csv'):
+            stat: os.stat_result = entry.stat()
+            files.append((entry.name, [stat.st_size, stat.st_mtime_ns]))
+    return sorted(files)
+
+def _load_checkpoint(checkpoint_path: str) -> dict:
+    """
+    Loads the checkpoint of the watcher.
+
+    Args:
+        checkpoint_path (str): The checkpoint file.
+
+    Returns:
+        dict: The [size, modification time] of every processed file under 'files', and the categories
+            whose tabs are still to be synced under 'pending'. Both are empty if there is no checkpoint.
+    """
+    if not os.path.exists(checkpoint_path):
+        return {'files': {}, 'pending': []}
+    with open(checkpoint_path) as file:
+        return json.load(file)
+
+def _save_checkpoint(checkpoint_path: str, checkpoint: dict) -> None:
+    """
+    Writes the checkpoint of the watcher.
+
+    Args:
+        checkpoint_path (str): The checkpoint file.
+        checkpoint (dict): The checkpoint.
+    """
+    # Write to a temporary file first so an interrupted run never leaves a partial checkpoint behind
+    os.makedirs(os.path.dirname(checkpoint_path) or '.', exist_ok=True)
+    with open(f'{checkpoint_path}.tmp', 'w') as file:
+        json.dump(checkpoint, file)
+    os.replace(f'{checkpoint_path}.tmp', checkpoint_path)
@@ -1,54 +1,354 @@
+import numpy as np
+import os
 import pandas as pd
 
-from clean_data_fidelity import clean_data_fidelity
-from clean_data_costco import clean_data_costco
-from clean_data_sofi import clean_data_sofi
-from categorize import _categorize_data_expenses, _categorize_data_income
+from bank_adapters import get_adapter
+from categorize import CATEGORY_DTYPE, _category_lookup
+from clean_cache import CACHE_DIR, cached_clean, evict_cache
+from concurrent.futures import ProcessPoolExecutor
+from dedup import deduplicate, record_keys
+from functools import partial
+from instrument import stage
+from ledger import BANK_DTYPE, LEDGER_DIR, append_ledger
+from project_enums import Bank, Category, DateFormat, TransactionType
+from summary import update_summary
+from typing import Iterable, Iterator, List, Optional, Tuple
 
-def wrangle_data() -> pd.DataFrame:
+# Text columns kept dictionary encoded from the cleaners to the output: each row holds a small integer code
+# into the column's distinct values, instead of a pointer to a Python string
+ENCODED_COLUMNS: List[str] = ['Transaction', 'Name']
+
+# Number of raw rows read per chunk when streaming
+DEFAULT_CHUNKSIZE: int = 100_000
+
+# CSV exports that are processed when no inputs are given
+DEFAULT_INPUTS: List[Tuple[Bank, str]] = [
+    (Bank.FIDELITY, './test_csv/october_2024_fidelity.csv'),
+    (Bank.COSTCO, './test_csv/october_2024_costco.csv'),
+    (Bank.SOFI, './test_csv/october_2024_sofi.csv'),
+]
+
+@stage
+def wrangle_data(
+    inputs: Optional[List[Tuple[Bank, str]]] = None,
+    max_workers: Optional[int] = None,
+    cache_dir: Optional[str] = CACHE_DIR,
+    ledger_dir: Optional[str] = LEDGER_DIR,
+    dedup_index: Optional[str] = None,
+    fuzzy: bool = False,
+    name_cache_dir: Optional[str] = None
+) -> pd.DataFrame:
     """
     Cleans, combines, categorizes, and sorts transaction data from multiple sources.
 
     This function orchestrates the entire data processing workflow by combining cleaned data 
     from multiple sources, categorizing transactions as either income or expenses, and sorting 
-    the final data by date.
+    the final data by date. The transactions are then appended to the local ledger, which skips 
+    any it already contains, and the ledger's monthly summary is updated for their months and banks.
+    With a `dedup_index`, the new transactions are only added to the index once all of this succeeded,
+    so a failed run imports them again.
+
+    Args:
+        inputs (List[Tuple[Bank, str]], optional): The bank and file path of each CSV export to process.
+            Defaults to `DEFAULT_INPUTS`.
+        max_workers (int, optional): The maximum number of processes used to clean the exports.
+            Defaults to the number of CPUs.
+        cache_dir (str, optional): The directory where cleaned exports are cached between runs, 
+            or None to always clean every export. Defaults to `CACHE_DIR`.
+        ledger_dir (str, optional): The directory of the ledger the transactions are appended to, 
+            or None to not append them. Defaults to `LEDGER_DIR`.
+        dedup_index (str, optional): The .npy file of the keys of transactions imported by earlier runs, 
+            such as `DEDUP_INDEX_PATH`, whose transactions are dropped. Defaults to None, which only drops 
+            transactions repeated between the given exports.
+        fuzzy (bool): Whether to categorize names without an exact match by their closest known name,
+            instead of as 'OTHER'. Defaults to False.
+        name_cache_dir (str, optional): The directory where each bank's standardized names are kept 
+            between runs, such as `NAME_CACHE_DIR`. Defaults to None, which only reuses the names 
+            standardized earlier in the same process.
+
+    Returns:
+        pd.DataFrame: A fully cleaned, categorized, and sorted DataFrame, whose 'Transaction', 'Name', 
+            'Category' and 'Bank' columns are categorical. It is empty if every transaction was 
+            dropped, such as when all of them were imported by earlier runs.
+    """
+    df, keys = wrangle_new_data(inputs, max_workers, cache_dir, dedup_index, fuzzy, name_cache_dir)
+
+    # Append the transactions to the ledger, so reports can be built without parsing the exports again
+    if ledger_dir is not None and not df.empty:
+        append_ledger(df, ledger_dir)
+        update_summary(df, ledger_dir)
+
+    # Mark the transactions as imported only now, so a failure in any step above leaves them to the next run
+    if dedup_index is not None:
+        record_keys(dedup_index, keys)
+
+    return df
+
+@stage
+def wrangle_new_data(
+    inputs: Optional[List[Tuple[Bank, str]]] = None,
+    max_workers: Optional[int] = None,
+    cache_dir: Optional[str] = CACHE_DIR,
+    dedup_index: Optional[str] = None,
+    fuzzy: bool = False,
+    name_cache_dir: Optional[str] = None
+) -> Tuple[pd.DataFrame, np.ndarray]:
+    """
+    Cleans, combines, categorizes, and sorts the transactions of multiple sources that were not imported before,
+    without storing them anywhere.
+
+    The keys of the returned transactions are not added to the `dedup_index`: the caller records them with
+    `record_keys` once it stored the transactions, so a failure to store them leaves them to the next run.
+
+    Args:
+        inputs (List[Tuple[Bank, str]], optional): The bank and file path of each CSV export to process.
+            Defaults to `DEFAULT_INPUTS`.
+        max_workers (int, optional): The maximum number of processes used to clean the exports.
+            Defaults to the number of CPUs.
+        cache_dir (str, optional): The directory where cleaned exports are cached between runs, 
+            or None to always clean every export. Defaults to `CACHE_DIR`.
+        dedup_index (str, optional): The .npy file of the keys of transactions imported by earlier runs, 
+            whose transactions are dropped. Defaults to None, which only drops transactions repeated 
+            between the given exports.
+        fuzzy (bool): Whether to categorize names without an exact match by their closest known name,
+            instead of as 'OTHER'. Defaults to False.
+        name_cache_dir (str, optional): The directory where each bank's standardized names are kept 
+            between runs. Defaults to None, which only reuses the names standardized earlier in the same process.
+
+    Returns:
+        Tuple[pd.DataFrame, np.ndarray]: The cleaned, categorized, and sorted transactions, as returned by 
+            `wrangle_data`, and the dedup keys of those transactions.
+    """
+    combined_df, keys = _combine_data(inputs or DEFAULT_INPUTS, max_workers, cache_dir, dedup_index, name_cache_dir)
+
+    # Nothing is left to categorize, such as when the exports were all imported before
+    if combined_df.empty:
+        combined_df['Category'] = pd.Categorical([], dtype=CATEGORY_DTYPE)
+        return combined_df.reset_index(drop=True), keys
+
+    return _fix_time_and_sort(_categorize_data(combined_df, fuzzy)), keys
+
+
+def stream_data(
+    inputs: List[Tuple[Bank, str]], chunksize: int = DEFAULT_CHUNKSIZE, fuzzy: bool = False
+) -> Iterator[pd.DataFrame]:
+    """
+    Cleans and categorizes transaction data from multiple sources one chunk at a time.
+
+    This function is a generator pipeline: each CSV export is read `chunksize` rows at a time, 
+    and every chunk is cleaned and categorized before the next one is read, so memory use is 
+    bounded by the chunk size rather than the size of the exports. Chunks are yielded in the 
+    order of `inputs` and are not sorted by date.
+
+    Args:
+        inputs (List[Tuple[Bank, str]]): The bank and file path of each CSV export to process.
+        chunksize (int): The number of raw rows read per chunk. Defaults to `DEFAULT_CHUNKSIZE`.
+        fuzzy (bool): Whether to categorize names without an exact match by their closest known name,
+            instead of as 'OTHER'. Defaults to False.
+
+    Yields:
+        pd.DataFrame: A cleaned and categorized DataFrame for each non-empty chunk.
+
+    Raises:
+        ValueError: If `inputs` is empty or contains an entry that is not a (Bank, str) pair.
+    """
+    _validate_inputs(inputs)
+
+    for bank, csv_path in inputs:
+        for chunk in get_adapter(bank).clean_chunks(csv_path, chunksize):
+            # Skip chunks that only contained filtered out rows, such as payments and transfers
+            if chunk.empty:
+                continue
+            chunk['Bank'] = pd.Categorical([bank.value] * len(chunk), dtype=BANK_DTYPE)
+            yield _categorize_data(chunk, fuzzy)
+
+def write_stream(chunks: Iterable[pd.DataFrame], csv_path: str) -> int:
+    """
+    Incrementally writes a stream of DataFrames to a single CSV file.
+
+    The file is overwritten by the first chunk and appended to by every following chunk, 
+    so only one chunk is held in memory at a time. Dates are written in MM/DD/YYYY format.
+
+    Args:
+        chunks (Iterable[pd.DataFrame]): The DataFrames to write, such as those yielded by `stream_data`.
+        csv_path (str): The file path of the CSV file to write.
 
     Returns:
-        pd.DataFrame: A fully cleaned, categorized, and sorted DataFrame.
+        int: The number of rows written.
+
+    Raises:
+        ValueError: If the `csv_path` is not a valid string or is not a CSV file.
     """
-    return _fix_time_and_sort(_categorize_data(_combine_data()))
+    if not csv_path or not isinstance(csv_path, str):
+        raise ValueError('Arg: csv_path must exist and be of type str')
+    if not csv_path.endswith('.csv'):
+        raise ValueError('Arg: csv_path must be of file type .csv')
+
+    rows: int = 0
+    for chunk in chunks:
+        # Write the header with the first chunk only
+        chunk.to_csv(
+            csv_path, mode='a' if rows else 'w', header=not rows, index=False, date_format=DateFormat.DISPLAY.value
+        )
+        rows += len(chunk)
 
+    return rows
 
-def _combine_data() -> pd.DataFrame:
+@stage
+def _combine_data(
+    inputs: List[Tuple[Bank, str]],
+    max_workers: Optional[int] = None,
+    cache_dir: Optional[str] = None,
+    dedup_index: Optional[str] = None,
+    name_cache_dir: Optional[str] = None
+) -> Tuple[pd.DataFrame, np.ndarray]:
     """
     Combines cleaned data from multiple CSV files into a single DataFrame.
 
-    This function reads, cleans, and concatenates data from Fidelity, Costco, and SoFi CSV files.
+    This function cleans each CSV export with the cleaning function of its bank, running the 
+    cleaners concurrently in a process pool, and concatenates the results in the order of `inputs`.
+    Exports cleaned by an earlier run are loaded from the cache instead of being cleaned again. 
+    Transactions that appear in more than one export, such as in overlapping date ranges, are 
+    only kept from the first export listed.
+
+    Args:
+        inputs (List[Tuple[Bank, str]]): The bank and file path of each CSV export to process.
+        max_workers (int, optional): The maximum number of processes used to clean the exports.
+            Defaults to the number of CPUs.
+        cache_dir (str, optional): The directory where cleaned exports are cached between runs, 
+            or None to always clean every export. Defaults to None.
+        dedup_index (str, optional): The .npy file of the keys of transactions imported by earlier runs, 
+            whose transactions are dropped. It is only read, never updated. Defaults to None.
+        name_cache_dir (str, optional): The directory where each bank's standardized names are kept 
+            between runs, or None to not store them. Defaults to None.
 
     Returns:
-        pd.DataFrame: A combined DataFrame containing cleaned data from all sources.
+        Tuple[pd.DataFrame, np.ndarray]: A combined DataFrame containing cleaned data from all sources, 
+            with the bank of each transaction in a categorical 'Bank' column, and the dedup key of 
+            each of its transactions.
+
+    Raises:
+        ValueError: If `inputs` is empty or contains an entry that is not a (Bank, str) pair.
     """
-    df_fidelity: pd.DataFrame = clean_data_fidelity('./test_csv/october_2024_fidelity.csv')
-    df_costco: pd.DataFrame = clean_data_costco('./test_csv/october_2024_costco.csv')
-    df_sofi: pd.DataFrame = clean_data_sofi('./test_csv/october_2024_sofi.csv')
+    _validate_inputs(inputs)
+    clean_input = partial(_clean_input, cache_dir=cache_dir, name_cache_dir=name_cache_dir)
 
-    # Concatenate all cleaned data into a single DataFrame
-    combined_df: pd.DataFrame = pd.concat([df_fidelity, df_costco, df_sofi])
+    # Clean a single export in this process, since starting a pool would cost more than it saves
+    if len(inputs) == 1 or max_workers == 1:
+        frames: List[pd.DataFrame] = [clean_input(bank_input) for bank_input in inputs]
+    else:
+        # Clean each export in its own process, `map` returns the results in the order of `inputs`
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            frames = list(executor.map(clean_input, inputs))
 
-    return combined_df
-    
-def _categorize_data(combined_df: pd.DataFrame) -> pd.DataFrame:
+    # Evict once all workers are done, so no worker removes a file another worker is reading
+    if cache_dir is not None:
+        evict_cache(cache_dir)
+
+    # Concatenate all cleaned data into a single DataFrame, keeping the encoded columns encoded
+    _share_categories(frames)
+    combined_df: pd.DataFrame = pd.concat(frames)
+
+    # Record the bank each transaction came from, as one code per row of each export
+    frame_lengths: List[int] = [len(frame) for frame in frames]
+    bank_codes: np.ndarray = np.repeat(
+        [BANK_DTYPE.categories.get_loc(bank.value) for bank, _ in inputs], frame_lengths
+    ).astype(np.int8)
+    combined_df['Bank'] = pd.Categorical.from_codes(bank_codes, dtype=BANK_DTYPE)
+
+    # Drop transactions already read from an earlier export or, with an index, by an earlier run
+    export_ids: np.ndarray = np.repeat(np.arange(len(frames)), frame_lengths)
+    return deduplicate(combined_df, export_ids, dedup_index)
+
+def _share_categories(frames: List[pd.DataFrame]) -> None:
+    """
+    Gives the `ENCODED_COLUMNS` of every cleaned export the same categories, in place.
+
+    `pd.concat` only keeps a categorical column if its categories are the same in every frame,
+    and otherwise falls back to one Python string per row. Only the categories are merged; the
+    codes of each frame are remapped to them without touching the strings of its rows.
+
+    Args:
+        frames (List[pd.DataFrame]): The cleaned exports about to be concatenated.
+    """
+    for column in ENCODED_COLUMNS:
+        # Encode the column of any cleaner that returned plain strings, a no-op for categoricals
+        encoded: List[pd.Series] = [frame[column].astype('category') for frame in frames]
+
+        categories: pd.Index = encoded[0].cat.categories
+        for values in encoded[1:]:
+            categories = categories.union(values.cat.categories, sort=False)
+
+        for frame, values in zip(frames, encoded):
+            frame[column] = values.cat.set_categories(categories)
+
+def _validate_inputs(inputs: List[Tuple[Bank, str]]) -> None:
+    """
+    Validates a list of CSV exports to process.
+
+    Args:
+        inputs (List[Tuple[Bank, str]]): The bank and file path of each CSV export to process.
+
+    Raises:
+        ValueError: If `inputs` is empty or contains an entry that is not a (Bank, str) pair.
+    """
+    if not inputs or not isinstance(inputs, list):
+        raise ValueError('Arg: inputs must not be empty and must be of type list')
+    for bank_input in inputs:
+        if len(bank_input) != 2 or not isinstance(bank_input[0], Bank) or not isinstance(bank_input[1], str):
+            raise ValueError('Arg: inputs must only contain (Bank, str) pairs')
+
+def _clean_input(
+    bank_input: Tuple[Bank, str], cache_dir: Optional[str] = None, name_cache_dir: Optional[str] = None
+) -> pd.DataFrame:
+    """
+    Cleans a single CSV export with the cleaning function of its bank's adapter.
+
+    With a `name_cache_dir`, the bank's name cache is first filled with the names stored by earlier 
+    runs, and stored again once the export is cleaned, including the names it added.
+
+    Args:
+        bank_input (Tuple[Bank, str]): The bank and file path of the CSV export.
+        cache_dir (str, optional): The directory where cleaned exports are cached between runs, 
+            or None to clean the export without the cache. Defaults to None.
+        name_cache_dir (str, optional): The directory where each bank's standardized names are kept 
+            between runs, or None to not store them. Defaults to None.
+
+    Returns:
+        pd.DataFrame: A cleaned DataFrame with standardized columns and values.
+    """
+    bank, csv_path = bank_input
+    adapter = get_adapter(bank)
+
+    # Start from the names earlier runs standardized, as this may be a new process with an empty cache
+    if name_cache_dir is not None:
+        name_cache_path: str = os.path.join(name_cache_dir, f'{bank.value.lower()}.json')
+        adapter.name_cache.load(name_cache_path, adapter.name_rules)
+
+    if cache_dir is None:
+        df: pd.DataFrame = adapter.clean(csv_path)
+    else:
+        df = cached_clean(adapter.clean, csv_path, cache_dir)
+
+    if name_cache_dir is not None:
+        adapter.name_cache.save(name_cache_path, adapter.name_rules)
+    return df
+
+@stage
+def _categorize_data(combined_df: pd.DataFrame, fuzzy: bool = False) -> pd.DataFrame:
     """
     Categorizes the combined transaction data into income and expenses.
 
-    This function splits the combined DataFrame into income and expense transactions,
-    applies category labels to each transaction, and then merges the results.
+    This function assigns the 'Category' column in place in a single pass: transactions classified 
+    as 'CREDIT' are categorized as 'INCOME', and all other transactions are categorized by their name.
 
     Args:
         combined_df (pd.DataFrame): A combined DataFrame containing all transaction data.
+        fuzzy (bool): Whether to categorize names without an exact match by their closest known name. 
+            Defaults to False.
 
     Returns:
-        pd.DataFrame: A DataFrame with categorized income and expenses.
+        pd.DataFrame: The same DataFrame with categorized income and expenses.
 
     Raises:
         ValueError: If the `combined_df` is empty or not of type `pd.DataFrame`.
@@ -56,27 +356,31 @@ def _categorize_data(combined_df: pd.DataFrame) -> pd.DataFrame:
     if combined_df.empty or not isinstance(combined_df, pd.DataFrame):
         raise ValueError('Arg: combined_df must not be empty and must be of class pd.DataFrame')
 
-    # Categorize income and expenses separately
-    df_income: pd.DataFrame = _categorize_data_income(combined_df)
-    df_expenses: pd.DataFrame = _categorize_data_expenses(combined_df)
+    # Select the 'INCOME' code for credits and the code looked up by name for everything else
+    category_codes: np.ndarray = np.select(
+        [(combined_df['Transaction'] == TransactionType.CREDIT.value).to_numpy()],
+        [CATEGORY_DTYPE.categories.get_loc(Category.INCOME.value)],
+        default=_category_lookup(combined_df['Name'], fuzzy).codes
+    ).astype(np.int8)
 
-    # Combine the categorized income and expenses into a single DataFrame
-    combined_df: pd.DataFrame = pd.concat([df_income, df_expenses])
+    # Assign the categories without splitting, copying, or concatenating the DataFrame
+    combined_df['Category'] = pd.Categorical.from_codes(category_codes, dtype=CATEGORY_DTYPE)
 
     return combined_df
 
+@stage
 def _fix_time_and_sort(combined_df: pd.DataFrame) -> pd.DataFrame:
     """
-    Fixes date formatting and sorts the combined DataFrame by date.
+    Sorts the combined DataFrame by date.
 
-    This function converts the date column to a standard format, sorts transactions 
-    by date, and resets the index.
+    This function sorts transactions by their datetime64 'Date' column and resets the index. 
+    Dates stay datetime64 and are only formatted as strings when the data is exported.
 
     Args:
         combined_df (pd.DataFrame): A combined DataFrame containing categorized transaction data.
 
     Returns:
-        pd.DataFrame: A sorted DataFrame with date formatting fixed.
+        pd.DataFrame: A DataFrame sorted by date.
 
     Raises:
         ValueError: If the `combined_df` is empty or not of type `pd.DataFrame`.
@@ -84,11 +388,7 @@ def _fix_time_and_sort(combined_df: pd.DataFrame) -> pd.DataFrame:
     if combined_df.empty or not isinstance(combined_df, pd.DataFrame):
         raise ValueError('Arg: combined_df must not be empty and must be of class pd.DataFrame')
 
-    # Convert 'Date' column to datetime objects and sort the DataFrame by date
-    combined_df['Date'] = pd.to_datetime(combined_df['Date'], format='%m/%d/%Y')
-    df_transactions: pd.DataFrame = combined_df.sort_values(by='Date').reset_index(drop=True)
-
-    # Reformat the 'Date' column to the standard MM/DD/YYYY format
-    df_transactions['Date'] = df_transactions['Date'].dt.strftime('%m/%d/%Y')
+    # Sort the DataFrame by date, keeping transactions on the same date in their original order
+    df_transactions: pd.DataFrame = combined_df.sort_values(by='Date', kind='stable').reset_index(drop=True)
 
-    return df_transactions
\ No newline at end of file
+    return df_transactions
@@ -0,0 +1,32 @@
+import os
+import sys
+import pytest
+
+from typing import List, Tuple
+
+# The modules in src/ import each other by bare name, as they do when run from there
+SRC_DIR: str = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+sys.path.insert(0, SRC_DIR)
+
+from project_enums import Bank  # noqa: E402
+
+# Directory of the sample CSV export of every bank
+CSV_DIR: str = os.path.join(os.path.dirname(SRC_DIR), 'csv')
+
+def sample_path(bank: Bank) -> str:
+    """
+    Args:
+        bank (Bank): The bank of the sample export.
+
+    Returns:
+        str: The file path to the bank's sample CSV export.
+    """
+    return os.path.join(CSV_DIR, f'sample_{bank.value.lower()}.csv')
+
+@pytest.fixture
+def sample_inputs() -> List[Tuple[Bank, str]]:
+    """
+    Returns:
+        List[Tuple[Bank, str]]: The bank and file path of the sample export of every bank.
+    """
+    return [(bank, sample_path(bank)) for bank in Bank]
@@ -0,0 +1,75 @@
+import tracemalloc
+import pandas as pd
+import pytest
+
+from categorize import CATEGORY_DTYPE
+from conftest import sample_path
+from project_enums import Bank, Category, TransactionType
+from wrangle_data import _combine_data, _categorize_data, wrangle_data
+
+# Category of every transaction name in the sample export of each bank
+SAMPLE_CATEGORIES: dict = {
+    Bank.FIDELITY: {
+        'ROVER': Category.PET,
+        'AMAZON': Category.OTHER,
+        'CSC SERVICEWORKS ULTRA': Category.OTHER,
+    },
+    Bank.COSTCO: {
+        'AMAZON': Category.OTHER,
+        'COSTCO GAS': Category.CAR,
+        'EUROPEAN WAX CENTER': Category.OTHER,
+    },
+    Bank.SOFI: {
+        'XCEL ENERGY': Category.UTILITIES,
+        'ADVENT HEALTH': Category.INCOME,
+        'DENVER HEALTH': Category.INCOME,
+        'INTEREST': Category.INCOME,
+    },
+}
+
+# Copies of the combined samples categorized when measuring memory, about 300k rows
+MEMORY_REPEATS: int = 20_000
+
+# Largest peak of Python allocations while categorizing, as a multiple of the frame's size. Splitting
+# the frame, copying both halves and concatenating them allocates at least twice its size
+MAX_PEAK_RATIO: float = 2.0
+
+@pytest.mark.parametrize('bank', list(Bank))
+def test_sample_categories(bank):
+    df = wrangle_data([(bank, sample_path(bank))], max_workers=1, cache_dir=None, ledger_dir=None)
+
+    expected = [SAMPLE_CATEGORIES[bank][name].value for name in df['Name']]
+    assert df['Category'].astype(str).tolist() == expected
+    assert df['Category'].dtype == CATEGORY_DTYPE
+
+def test_credits_are_income(sample_inputs):
+    combined_df, _ = _combine_data(sample_inputs, max_workers=1)
+    df = _categorize_data(combined_df)
+
+    credits = df['Transaction'] == TransactionType.CREDIT.value
+    assert credits.any()
+    assert (df.loc[credits, 'Category'] == Category.INCOME.value).all()
+    assert not (df.loc[~credits, 'Category'] == Category.INCOME.value).any()
+
+def test_categorizes_in_place(sample_inputs):
+    combined_df, _ = _combine_data(sample_inputs, max_workers=1)
+
+    assert _categorize_data(combined_df) is combined_df
+
+def test_peak_memory_is_bounded_by_frame_size(sample_inputs):
+    combined_df, _ = _combine_data(sample_inputs, max_workers=1)
+    df = pd.concat([combined_df] * MEMORY_REPEATS, ignore_index=True)
+    frame_bytes = df.memory_usage(deep=True).sum()
+
+    tracemalloc.start()
+    try:
+        _categorize_data(df)
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert peak_bytes < MAX_PEAK_RATIO * frame_bytes
+
+def test_empty_frame_is_rejected():
+    with pytest.raises(ValueError):
+        _categorize_data(pd.DataFrame())
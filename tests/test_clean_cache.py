@@ -0,0 +1,90 @@
+import functools
+import os
+import shutil
+import pandas as pd
+import pytest
+
+from bank_adapters import get_adapter
+from clean_cache import cached_clean, evict_cache
+from conftest import sample_path
+from project_enums import Bank
+from typing import Callable, Dict, List
+
+def _counting(cleaner: Callable[[str], pd.DataFrame], calls: List[str]) -> Callable[[str], pd.DataFrame]:
+    """
+    Wraps a bank's cleaning function to record every export it cleans, keeping its cache key.
+
+    Args:
+        cleaner (Callable[[str], pd.DataFrame]): The bank's cleaning function.
+        calls (List[str]): The list the file path of every cleaned export is appended to.
+
+    Returns:
+        Callable[[str], pd.DataFrame]: The wrapped cleaning function.
+    """
+    @functools.wraps(cleaner)
+    def counting(csv_path: str) -> pd.DataFrame:
+        calls.append(csv_path)
+        return cleaner(csv_path)
+    return counting
+
+@pytest.fixture
+def exports(tmp_path) -> Dict[Bank, str]:
+    """
+    Returns:
+        Dict[Bank, str]: A copy of the sample export of every bank, which the tests may edit.
+    """
+    os.makedirs(tmp_path / 'exports')
+    return {bank: shutil.copy(sample_path(bank), str(tmp_path / 'exports')) for bank in Bank}
+
+@pytest.mark.parametrize('bank', list(Bank))
+def test_hit_equals_the_cleaned_export(bank, exports, tmp_path):
+    calls: List[str] = []
+    cleaner = _counting(get_adapter(bank).clean, calls)
+
+    cached_clean(cleaner, exports[bank], str(tmp_path / 'cache'))
+    hit = cached_clean(cleaner, exports[bank], str(tmp_path / 'cache'))
+
+    # The hit is read back from the cache, with the same categorical columns as the cleaner's output
+    assert len(calls) == 1
+    pd.testing.assert_frame_equal(hit, get_adapter(bank).clean(exports[bank]))
+    assert isinstance(hit['Name'].dtype, pd.CategoricalDtype)
+
+def test_renamed_export_hits_and_edited_export_misses(exports, tmp_path):
+    calls: List[str] = []
+    cleaner = _counting(get_adapter(Bank.SOFI).clean, calls)
+    cached_clean(cleaner, exports[Bank.SOFI], str(tmp_path / 'cache'))
+
+    renamed = shutil.copy(exports[Bank.SOFI], str(tmp_path / 'renamed.csv'))
+    cached_clean(cleaner, renamed, str(tmp_path / 'cache'))
+    assert len(calls) == 1
+
+    # Repeat the first transaction on a new line, which the cleaner keeps as a second transaction
+    with open(exports[Bank.SOFI]) as file:
+        first_line: str = file.read().splitlines()[1]
+    with open(exports[Bank.SOFI], 'a') as file:
+        file.write(f'\n{first_line}\n')
+
+    edited = cached_clean(cleaner, exports[Bank.SOFI], str(tmp_path / 'cache'))
+    assert len(calls) == 2
+    assert len(edited) == len(cached_clean(cleaner, renamed, str(tmp_path / 'cache'))) + 1
+
+def test_evicts_the_least_recently_used_files_first(exports, tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    paths: Dict[Bank, str] = {}
+    for age, bank in enumerate(Bank):
+        cached_clean(get_adapter(bank).clean, exports[bank], cache_dir)
+        paths[bank] = max(os.scandir(cache_dir), key=lambda entry: entry.stat().st_mtime_ns).path
+
+        # Each bank's file was used an hour before the previous bank's, so the first bank is the oldest
+        os.utime(paths[bank], (0, 1_000_000 - 3_600 * (len(Bank) - age)))
+    oldest, second, newest = list(Bank)
+
+    # A hit marks the oldest file as just used, so the next oldest is evicted instead
+    cached_clean(get_adapter(oldest).clean, exports[oldest], cache_dir)
+    budget = os.path.getsize(paths[oldest]) + os.path.getsize(paths[newest])
+
+    assert evict_cache(cache_dir, budget) == 1
+    assert sorted(os.listdir(cache_dir)) == sorted(os.path.basename(paths[bank]) for bank in (oldest, newest))
+
+    assert evict_cache(cache_dir, 0) == 2
+    assert os.listdir(cache_dir) == []
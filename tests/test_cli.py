@@ -0,0 +1,78 @@
+import numpy as np
+import os
+import pandas as pd
+import re
+import subprocess
+import sys
+import pytest
+
+from cli import _parser, main
+from conftest import SRC_DIR, sample_path
+from project_enums import Bank
+from typing import List
+
+# Packages that `--help` and `validate` must start without, as they take most of the other commands' start up
+HEAVY_MODULES: List[str] = ['pandas', 'numpy', 'pyarrow', 'googleapiclient', 'google_auth_oauthlib']
+
+# Module name of a line of `python -X importtime` output
+_IMPORT_TIME_LINE: re.Pattern = re.compile(r'import time:\s+\d+ \|\s+\d+ \| *(\S+)')
+
+# Arguments of the commands that must start without any of `HEAVY_MODULES`
+LIGHT_COMMANDS: dict = {
+    'help': ['--help'],
+    'validate': ['validate'] + [arg for bank in Bank for arg in ('-i', bank.value.lower(), sample_path(bank))],
+}
+
+def _imported_packages(arguments: List[str]) -> set:
+    """
+    Runs the CLI in a new interpreter and lists the top level packages it imported.
+
+    Args:
+        arguments (List[str]): The command line arguments of the CLI.
+
+    Returns:
+        set: The name of every top level package imported.
+    """
+    stderr: str = subprocess.run(
+        [sys.executable, '-X', 'importtime', os.path.join(SRC_DIR, 'cli.py')] + arguments,
+        capture_output=True, text=True, check=True
+    ).stderr
+    return {match.group(1).split('.')[0] for match in map(_IMPORT_TIME_LINE.match, stderr.splitlines()) if match}
+
+@pytest.mark.parametrize('command', list(LIGHT_COMMANDS))
+def test_light_commands_skip_heavy_imports(command):
+    packages = _imported_packages(LIGHT_COMMANDS[command])
+
+    # The output was parsed, since the CLI always imports argparse
+    assert 'argparse' in packages
+    assert packages.isdisjoint(HEAVY_MODULES), sorted(packages.intersection(HEAVY_MODULES))
+
+@pytest.mark.parametrize('command', ['ingest', 'categorize'])
+def test_dedup_index_is_offered_by_commands_that_keep_history(command):
+    output_args = ['-o', 'out.csv'] if command == 'categorize' else []
+    args = _parser().parse_args([command, '--dedup-index', 'index.npy'] + output_args)
+
+    assert args.dedup_index == 'index.npy'
+
+@pytest.mark.parametrize('command', ['sync', 'watch'])
+def test_dedup_index_is_not_offered_by_commands_that_sync(command):
+    with pytest.raises(SystemExit):
+        _parser().parse_args([command, '--dedup-index', 'index.npy'])
+
+def test_categorize_records_dedup_keys_only_after_writing(sample_inputs, tmp_path):
+    index_path = str(tmp_path / 'index.npy')
+    input_args = [arg for bank, csv_path in sample_inputs for arg in ('-i', bank.value.lower(), csv_path)]
+    args = ['categorize', '--no-cache', '--workers', '1', '--dedup-index', index_path] + input_args
+
+    # An output below a regular file cannot be written, so no transaction may be marked as imported
+    (tmp_path / 'file').write_text('')
+    with pytest.raises(OSError):
+        main(args + ['-o', str(tmp_path / 'file' / 'out.csv')])
+    assert not os.path.exists(index_path)
+
+    # The retry writes every transaction, then skips them all on the next run
+    main(args + ['-o', str(tmp_path / 'out.csv')])
+    assert len(pd.read_csv(tmp_path / 'out.csv')) == len(np.load(index_path)) == 16
+
+    main(args + ['-o', str(tmp_path / 'again.csv')])
+    assert pd.read_csv(tmp_path / 'again.csv').empty
@@ -0,0 +1,60 @@
+import pandas as pd
+import pytest
+
+from bank_adapters import get_adapter
+from conftest import sample_path
+from csv_schema import CsvSchema, read_csv, read_csv_chunks
+from project_enums import Bank
+
+# Rows per chunk when reading the samples in chunks, small enough to split every sample
+CHUNKSIZE: int = 2
+
+def _read_and_drop(bank: Bank) -> pd.DataFrame:
+    """
+    Reads a sample export the way the cleaners did before the schemas: every column with inferred
+    dtypes, then dropping the unused columns and parsing the dates.
+
+    Args:
+        bank (Bank): The bank of the sample export.
+
+    Returns:
+        pd.DataFrame: The schema's columns, cast to the schema's dtypes.
+    """
+    schema: CsvSchema = get_adapter(bank).schema
+    df: pd.DataFrame = pd.read_csv(sample_path(bank))
+    df = df.drop([column for column in df.columns if column not in schema.columns], axis=1)
+    df[schema.date_column] = pd.to_datetime(df[schema.date_column], format=schema.date_format)
+    return df.astype(schema.dtypes)
+
+@pytest.mark.parametrize('bank', list(Bank))
+@pytest.mark.parametrize('engine', [None, 'pyarrow'])
+def test_read_csv_matches_read_and_drop(bank, engine):
+    df = read_csv(sample_path(bank), get_adapter(bank).schema, engine)
+
+    pd.testing.assert_frame_equal(df, _read_and_drop(bank))
+
+@pytest.mark.parametrize('bank', list(Bank))
+def test_read_csv_chunks_matches_read_and_drop(bank):
+    schema = get_adapter(bank).schema
+    chunks = list(read_csv_chunks(sample_path(bank), schema, CHUNKSIZE))
+
+    assert len(chunks) > 1
+    assert all(len(chunk) <= CHUNKSIZE for chunk in chunks)
+
+    # Chunks infer their own categories, so they are concatenated as strings and cast again
+    df = pd.concat(chunks, ignore_index=True).astype(schema.dtypes)
+    pd.testing.assert_frame_equal(df, _read_and_drop(bank))
+
+@pytest.mark.parametrize('bank', list(Bank))
+def test_cleaned_exports_match_across_readers(bank):
+    adapter = get_adapter(bank)
+    df = adapter.clean(sample_path(bank))
+
+    pd.testing.assert_frame_equal(adapter.clean(sample_path(bank), engine='pyarrow'), df)
+    # Chunks infer their own categories, so they are cast to the categories of the whole export
+    chunked = pd.concat(adapter.clean_chunks(sample_path(bank), CHUNKSIZE))
+    pd.testing.assert_frame_equal(chunked.astype(df.dtypes.to_dict()), df)
+
+def test_read_csv_rejects_unknown_engine():
+    with pytest.raises(ValueError):
+        read_csv(sample_path(Bank.SOFI), get_adapter(Bank.SOFI).schema, engine='python')
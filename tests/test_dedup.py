@@ -0,0 +1,92 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+
+from dedup import deduplicate, record_keys, transaction_keys
+from typing import List, Tuple
+from wrangle_data import wrangle_data
+
+# Transactions of the sample export of every bank
+SAMPLE_TRANSACTIONS: int = 16
+
+def _transactions(rows: List[Tuple[str, str, float]], bank: str = 'SOFI') -> pd.DataFrame:
+    """
+    Args:
+        rows (List[Tuple[str, str, float]]): The date, name and amount of each transaction.
+        bank (str): The bank of every transaction. Defaults to 'SOFI'.
+
+    Returns:
+        pd.DataFrame: The transactions, as cleaned by the bank adapters.
+    """
+    df = pd.DataFrame(rows, columns=['Date', 'Name', 'Amount'])
+    df['Date'] = pd.to_datetime(df['Date'])
+    df['Bank'] = bank
+    return df
+
+def _exports(*exports: List[Tuple[str, str, float]]) -> Tuple[pd.DataFrame, np.ndarray]:
+    """
+    Combines the transactions of several exports as `wrangle_data` does.
+
+    Returns:
+        Tuple[pd.DataFrame, np.ndarray]: The transactions of every export, in order, and the position of
+            the export each was read from.
+    """
+    df = pd.concat([_transactions(rows) for rows in exports], ignore_index=True)
+    return df, np.repeat(np.arange(len(exports)), [len(rows) for rows in exports])
+
+def test_identical_purchases_on_the_same_day_are_kept():
+    df, export_ids = _exports([('2024-09-03', 'COFFEE', 4.5), ('2024-09-03', 'COFFEE', 4.5)])
+
+    kept, keys = deduplicate(df, export_ids)
+
+    assert len(kept) == 2
+    assert keys[0] != keys[1]
+
+def test_overlapping_exports_are_deduplicated():
+    # Both exports hold the two coffees of the 3rd, and the second one holds a third coffee too
+    df, export_ids = _exports(
+        [('2024-09-01', 'RENT', 1500.0), ('2024-09-03', 'COFFEE', 4.5), ('2024-09-03', 'COFFEE', 4.5)],
+        [('2024-09-03', 'COFFEE', 4.5), ('2024-09-03', 'COFFEE', 4.5), ('2024-09-03', 'COFFEE', 4.5),
+         ('2024-09-05', 'GAS', 40.0)],
+    )
+
+    kept, keys = deduplicate(df, export_ids)
+
+    assert kept.index.tolist() == [0, 1, 2, 5, 6]
+    assert len(set(keys)) == len(keys)
+
+def test_keys_do_not_depend_on_how_amounts_are_stored():
+    df, export_ids = _exports([('2024-09-03', 'COFFEE', 4.5)])
+    as_float32 = df.astype({'Amount': np.float32, 'Name': 'category'})
+
+    assert (transaction_keys(df, export_ids) == transaction_keys(as_float32, export_ids)).all()
+
+def test_recorded_keys_are_skipped_by_later_runs(tmp_path):
+    index_path = str(tmp_path / 'index.npy')
+    first = [('2024-09-01', 'RENT', 1500.0), ('2024-09-03', 'COFFEE', 4.5)]
+
+    _, keys = deduplicate(*_exports(first), index_path)
+    record_keys(index_path, keys)
+
+    # The next export overlaps the first, so only its new transaction is left, and recording it twice is harmless
+    kept, keys = deduplicate(*_exports(first[1:] + [('2024-09-05', 'GAS', 40.0)]), index_path)
+    record_keys(index_path, keys)
+    record_keys(index_path, keys)
+
+    assert kept['Name'].tolist() == ['GAS']
+    assert len(np.load(index_path)) == 3
+
+def test_keys_are_not_recorded_when_storing_fails(sample_inputs, tmp_path):
+    index_path = str(tmp_path / 'index.npy')
+    options = {'max_workers': 1, 'cache_dir': None, 'dedup_index': index_path}
+
+    # A ledger below a regular file cannot be written, so no transaction may be marked as imported
+    (tmp_path / 'file').write_text('')
+    with pytest.raises(OSError):
+        wrangle_data(sample_inputs, ledger_dir=str(tmp_path / 'file' / 'ledger'), **options)
+    assert not os.path.exists(index_path)
+
+    # The retry imports every transaction, and the run after it none
+    assert len(wrangle_data(sample_inputs, ledger_dir=str(tmp_path / 'ledger'), **options)) == SAMPLE_TRANSACTIONS
+    assert wrangle_data(sample_inputs, ledger_dir=str(tmp_path / 'ledger'), **options).empty
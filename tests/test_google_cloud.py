@@ -0,0 +1,249 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+
+from googleapiclient.discovery import build, Resource
+from googleapiclient.http import HttpMockSequence
+from google_cloud import _changed_runs, sync_all_data, write_all_data
+from project_enums import DateFormat
+from wrangle_data import wrangle_data
+
+# Copies of the samples written when the values must be split over several requests
+CHUNKED_REPEATS: int = 200
+
+# Request size small enough to split the repeated samples, and some tabs, over several requests
+CHUNKED_PAYLOAD_BYTES: int = 20_000
+
+class FakeSheets(HttpMockSequence):
+    """
+    Fake Google Sheets API answering every request with a successful update, and recording it.
+
+    Attributes:
+        calls (list): The method, URI and decoded JSON body of every request, in the order sent.
+    """
+    def __init__(self) -> None:
+        super().__init__([({'status': '200'}, json.dumps({'totalUpdatedCells': 0}))] * 1_000)
+        self.calls: list = []
+
+    def request(self, uri, method='GET', body=None, headers=None, **kwargs):
+        self.calls.append((method, uri, json.loads(body) if body else None))
+        return super().request(uri, method, body, headers, **kwargs)
+
+@pytest.fixture
+def fake_sheets() -> FakeSheets:
+    return FakeSheets()
+
+@pytest.fixture
+def service(fake_sheets) -> Resource:
+    return build('sheets', 'v4', http=fake_sheets, static_discovery=True)
+
+@pytest.fixture
+def transactions(sample_inputs) -> pd.DataFrame:
+    return wrangle_data(sample_inputs, max_workers=1, cache_dir=None, ledger_dir=None)
+
+@pytest.fixture
+def synced(service, fake_sheets, transactions, tmp_path) -> dict:
+    """
+    Returns:
+        dict: The tabs of a spreadsheet after a first sync of the sample transactions, whose requests are
+            then forgotten by `fake_sheets`.
+    """
+    sync_all_data(service, 'spreadsheet', transactions, state_dir=str(tmp_path))
+    tabs: dict = _apply({}, fake_sheets.calls)
+    fake_sheets.calls.clear()
+    return tabs
+
+def _expected_tabs(df: pd.DataFrame) -> dict:
+    """
+    Builds the rows every tab should hold, one row at a time.
+
+    Args:
+        df (pd.DataFrame): Categorized transaction data.
+
+    Returns:
+        dict: The rows of every category's tab, keyed by tab name.
+    """
+    tabs: dict = {}
+    for row in df.itertuples():
+        tabs.setdefault(row.Category.capitalize(), []).append(
+            [row.Date.strftime(DateFormat.DISPLAY.value), row.Name, row.Amount]
+        )
+    return tabs
+
+def _written_tabs(calls: list) -> dict:
+    """
+    Rebuilds the rows of every tab from the batchUpdate requests sent.
+
+    Args:
+        calls (list): The requests recorded by `FakeSheets`.
+
+    Returns:
+        dict: The rows written to every tab, keyed by tab name.
+    """
+    tabs: dict = {}
+    for _, _, body in calls:
+        for value_range in body['data']:
+            sheet_name, cells = value_range['range'].split('!')
+            rows: list = tabs.setdefault(sheet_name, [])
+
+            # Every range must continue where the previous range of its tab ended
+            assert cells == f'A{2 + len(rows)}:C'
+            rows.extend(value_range['values'])
+    return tabs
+
+def _apply(tabs: dict, calls: list) -> dict:
+    """
+    Applies the batchClear and batchUpdate requests sent to the tabs of a spreadsheet.
+
+    Args:
+        tabs (dict): The rows of every tab before the requests, keyed by tab name. Left unchanged.
+        calls (list): The requests recorded by `FakeSheets`.
+
+    Returns:
+        dict: The rows of every tab that holds any after the requests, keyed by tab name.
+    """
+    tabs = {sheet_name: list(rows) for sheet_name, rows in tabs.items()}
+    for _, uri, body in calls:
+        if 'values:batchClear?' in uri:
+            # The cleared ranges always reach the bottom of the tab
+            for cleared in body['ranges']:
+                sheet_name, cells = cleared.split('!')
+                del tabs.setdefault(sheet_name, [])[int(cells[1:-2]) - 2:]
+        else:
+            for value_range in body['data']:
+                sheet_name, cells = value_range['range'].split('!')
+                start: int = int(cells[1:-2]) - 2
+                rows: list = tabs.setdefault(sheet_name, [])
+                rows.extend([None] * (start + len(value_range['values']) - len(rows)))
+                rows[start:start + len(value_range['values'])] = value_range['values']
+    return {sheet_name: rows for sheet_name, rows in tabs.items() if rows}
+
+def _ranges(calls: list, method: str) -> list:
+    """
+    Args:
+        calls (list): The requests recorded by `FakeSheets`.
+        method (str): 'batchClear' or 'batchUpdate'.
+
+    Returns:
+        list: The ranges cleared or written by the requests of that method, in the order sent.
+    """
+    return [
+        value_range if method == 'batchClear' else value_range['range']
+        for _, uri, body in calls if f'values:{method}?' in uri
+        for value_range in body['ranges' if method == 'batchClear' else 'data']
+    ]
+
+def _tab_row(df: pd.DataFrame, category: str, position: int) -> int:
+    """
+    Returns:
+        int: The index label of the row written at `position` of the category's tab.
+    """
+    return df.index[df['Category'] == category][position]
+
+def test_writes_every_tab_in_one_batch_update(service, fake_sheets, transactions):
+    write_all_data(service, 'spreadsheet', transactions)
+
+    assert len(fake_sheets.calls) == 1
+    method, uri, body = fake_sheets.calls[0]
+    assert method == 'POST'
+    assert '/spreadsheets/spreadsheet/values:batchUpdate?' in uri
+    assert body['valueInputOption'] == 'USER_ENTERED'
+    assert _written_tabs(fake_sheets.calls) == _expected_tabs(transactions)
+
+def test_splits_large_payloads_over_several_requests(service, fake_sheets, transactions):
+    df = pd.concat([transactions] * CHUNKED_REPEATS, ignore_index=True)
+    write_all_data(service, 'spreadsheet', df, max_payload_bytes=CHUNKED_PAYLOAD_BYTES)
+
+    assert len(fake_sheets.calls) > 1
+    for _, uri, body in fake_sheets.calls:
+        assert '/spreadsheets/spreadsheet/values:batchUpdate?' in uri
+        assert sum(len(json.dumps(value_range['values'])) for value_range in body['data']) <= CHUNKED_PAYLOAD_BYTES
+
+    # A tab that does not fit in one request continues in the next one
+    sheet_names = [
+        value_range['range'].split('!')[0] for _, _, body in fake_sheets.calls for value_range in body['data']
+    ]
+    assert len(sheet_names) > len(set(sheet_names))
+    assert _written_tabs(fake_sheets.calls) == _expected_tabs(df)
+
+def test_packs_tabs_into_as_few_requests_as_fit(service, fake_sheets, transactions):
+    df = pd.concat([transactions] * CHUNKED_REPEATS, ignore_index=True)
+    payload_bytes = sum(len(json.dumps(rows)) for rows in _expected_tabs(df).values())
+    write_all_data(service, 'spreadsheet', df, max_payload_bytes=payload_bytes)
+
+    assert len(fake_sheets.calls) == 1
+
+def test_rejects_empty_data(service):
+    with pytest.raises(ValueError):
+        write_all_data(service, 'spreadsheet', pd.DataFrame())
+
+def test_first_sync_writes_every_tab_and_clears_below(service, fake_sheets, transactions, tmp_path):
+    sync_all_data(service, 'spreadsheet', transactions, state_dir=str(tmp_path))
+    expected = _expected_tabs(transactions)
+
+    # The clear is sent first, and only below the rows written
+    assert 'values:batchClear?' in fake_sheets.calls[0][1]
+    assert sorted(_ranges(fake_sheets.calls, 'batchClear')) == sorted(
+        f'{sheet_name}!A{2 + len(rows)}:C' for sheet_name, rows in expected.items()
+    )
+    assert _written_tabs(fake_sheets.calls[1:]) == expected
+
+def test_unchanged_data_sends_nothing(service, fake_sheets, transactions, synced, tmp_path):
+    sync_all_data(service, 'spreadsheet', transactions, state_dir=str(tmp_path))
+
+    assert fake_sheets.calls == []
+
+def test_changed_row_writes_only_its_run(service, fake_sheets, transactions, synced, tmp_path):
+    df = transactions.copy()
+    df.loc[_tab_row(df, 'OTHER', 1), 'Amount'] += 1
+    sync_all_data(service, 'spreadsheet', df, state_dir=str(tmp_path))
+
+    assert _ranges(fake_sheets.calls, 'batchClear') == []
+    assert _ranges(fake_sheets.calls, 'batchUpdate') == ['Other!A3:C']
+    assert _apply(synced, fake_sheets.calls) == _expected_tabs(df)
+
+def test_shrunk_tab_clears_the_leftover_rows(service, fake_sheets, transactions, synced, tmp_path):
+    df = transactions.drop(index=_tab_row(transactions, 'OTHER', -1))
+    sync_all_data(service, 'spreadsheet', df, state_dir=str(tmp_path))
+
+    assert _ranges(fake_sheets.calls, 'batchClear') == [f"Other!A{1 + len(synced['Other'])}:C"]
+    assert _ranges(fake_sheets.calls, 'batchUpdate') == []
+    assert _apply(synced, fake_sheets.calls) == _expected_tabs(df)
+
+def test_disappeared_category_clears_its_tab(service, fake_sheets, transactions, synced, tmp_path):
+    df = transactions[transactions['Category'] != 'PET']
+    sync_all_data(service, 'spreadsheet', df, state_dir=str(tmp_path))
+
+    assert _ranges(fake_sheets.calls, 'batchClear') == ['Pet!A2:C']
+    assert _ranges(fake_sheets.calls, 'batchUpdate') == []
+    assert _apply(synced, fake_sheets.calls) == _expected_tabs(df)
+
+def test_categories_keep_the_state_of_other_tabs(service, fake_sheets, transactions, synced, tmp_path):
+    df = transactions.copy()
+    for category in ['INCOME', 'OTHER']:
+        df.loc[_tab_row(df, category, 0), 'Amount'] += 1
+
+    sync_all_data(service, 'spreadsheet', df, state_dir=str(tmp_path), categories=['INCOME'])
+    assert _ranges(fake_sheets.calls, 'batchUpdate') == ['Income!A2:C']
+
+    # The change to the other tab is still pending, so the next full sync writes it
+    tabs = _apply(synced, fake_sheets.calls)
+    fake_sheets.calls.clear()
+    sync_all_data(service, 'spreadsheet', df, state_dir=str(tmp_path))
+    assert _ranges(fake_sheets.calls, 'batchUpdate') == ['Other!A2:C']
+    assert _apply(tabs, fake_sheets.calls) == _expected_tabs(df)
+
+@pytest.mark.parametrize('last_hashes, hashes, runs', [
+    (None, [1, 2, 3], [(0, 3)]),
+    (None, [], []),
+    ([1, 2, 3], [1, 2, 3], []),
+    ([1, 2, 3, 4, 5], [1, 9, 3, 9, 9], [(1, 2), (3, 5)]),
+    ([1, 2, 3], [9, 2, 3, 4], [(0, 1), (3, 4)]),
+    ([1, 2, 3], [1, 9], [(1, 2)]),
+])
+def test_changed_runs_split_rows_that_are_not_consecutive(last_hashes, hashes, runs):
+    if last_hashes is not None:
+        last_hashes = np.array(last_hashes, dtype=np.uint64)
+
+    assert _changed_runs(last_hashes, np.array(hashes, dtype=np.uint64)) == runs
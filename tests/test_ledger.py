@@ -0,0 +1,75 @@
+import pandas as pd
+import pytest
+
+from ledger import LEDGER_COLUMNS, append_ledger, read_ledger
+from project_enums import Bank
+from wrangle_data import wrangle_data
+
+@pytest.fixture
+def transactions(sample_inputs) -> pd.DataFrame:
+    """
+    Returns:
+        pd.DataFrame: The sample transactions of September, and a copy of them a month later, so the
+            ledger has partitions for two months of every bank.
+    """
+    df = wrangle_data(sample_inputs, max_workers=1, cache_dir=None, ledger_dir=None)
+    october = df.assign(Date=df['Date'] + pd.DateOffset(months=1))
+    return pd.concat([df, october], ignore_index=True)
+
+def _rows(df: pd.DataFrame) -> list:
+    """
+    Args:
+        df (pd.DataFrame): Transactions with `LEDGER_COLUMNS`.
+
+    Returns:
+        list: Every transaction as a list of strings, sorted, to compare transactions regardless of order and dtype.
+    """
+    return sorted(df[LEDGER_COLUMNS].astype(str).values.tolist())
+
+def test_reappending_adds_nothing(transactions, tmp_path):
+    assert append_ledger(transactions, str(tmp_path)) == len(transactions)
+    assert append_ledger(transactions, str(tmp_path)) == 0
+
+    assert _rows(read_ledger(str(tmp_path))) == _rows(transactions)
+
+def test_repeated_purchases_within_one_import_are_kept(transactions, tmp_path):
+    # The Fidelity sample holds three identical purchases on the same day
+    repeated = transactions[transactions['Name'] == 'CSC SERVICEWORKS ULTRA'].head(3)
+    assert len(repeated.drop_duplicates()) == 1
+
+    append_ledger(transactions, str(tmp_path))
+    assert (read_ledger(str(tmp_path))['Name'] == 'CSC SERVICEWORKS ULTRA').sum() == 6
+
+    # Only the occurrences past the three stored ones are new
+    assert append_ledger(pd.concat([repeated, repeated.head(1)]), str(tmp_path)) == 1
+    assert append_ledger(repeated.head(2), str(tmp_path)) == 0
+
+@pytest.mark.parametrize('start, end, banks', [
+    ('2024-09-20', None, None),
+    (None, '2024-10-05', None),
+    ('2024-09-20', '2024-10-05', None),
+    ('2024-09-03', '2024-09-03', None),
+    (None, None, [Bank.SOFI]),
+    ('2024-09-20', '2024-10-05', [Bank.COSTCO, Bank.SOFI]),
+    ('2025-01-01', None, None),
+])
+def test_filters_return_exactly_the_matching_rows(transactions, tmp_path, start, end, banks):
+    append_ledger(transactions, str(tmp_path))
+
+    expected = transactions
+    if start is not None:
+        expected = expected[expected['Date'] >= pd.Timestamp(start)]
+    if end is not None:
+        expected = expected[expected['Date'] <= pd.Timestamp(end)]
+    if banks is not None:
+        expected = expected[expected['Bank'].isin([bank.value for bank in banks])]
+
+    df = read_ledger(str(tmp_path), start and pd.Timestamp(start), end and pd.Timestamp(end), banks)
+    assert _rows(df) == _rows(expected)
+    assert df['Date'].is_monotonic_increasing
+
+def test_empty_ledger_reads_no_rows(tmp_path):
+    df = read_ledger(str(tmp_path))
+
+    assert df.empty
+    assert list(df.columns) == LEDGER_COLUMNS
@@ -0,0 +1,209 @@
+import json
+import os
+import ssl
+import threading
+import time
+import httplib2
+import pytest
+import sheets_upload
+
+from googleapiclient.discovery import build, Resource
+from googleapiclient.errors import HttpError
+from google_cloud import sync_spreadsheets
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from sheets_upload import SheetsUploader
+from typing import Optional
+from wrangle_data import wrangle_data
+
+# Seconds the mock server takes to answer a request, long enough for concurrent requests to overlap
+LATENCY_SECONDS: float = 0.2
+
+# Requests per minute given to the uploaders, so the budget never delays a test
+REQUESTS_PER_MINUTE: int = 10_000
+
+# Status that makes the mock server close the connection without answering
+DROP_CONNECTION: int = 0
+
+class MockSheetsServer(ThreadingHTTPServer):
+    """
+    Local HTTP server standing in for the Google Sheets API.
+
+    Every request is answered with the next status of `statuses`, or 200 once they run out, after
+    `latency` seconds. A `DROP_CONNECTION` status closes the connection without answering instead.
+
+    Attributes:
+        statuses (list): The statuses of the next responses, in order.
+        retry_after (str, optional): The Retry-After header sent with error responses.
+        latency (float): The seconds taken to answer a request.
+        paths (list): The path of every request received, in the order received.
+        max_in_flight (int): The largest number of requests answered at the same time.
+    """
+    # Do not wait for the clients to close their kept-alive connections when the server stops
+    daemon_threads = True
+    block_on_close = False
+
+    def __init__(self) -> None:
+        super().__init__(('127.0.0.1', 0), _MockSheetsHandler)
+        self.statuses: list = []
+        self.retry_after: Optional[str] = None
+        self.latency: float = 0.0
+        self.paths: list = []
+        self.max_in_flight: int = 0
+        self.in_flight: int = 0
+        self.lock: threading.Lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.server_port}/'
+
+class _MockSheetsHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def do_POST(self) -> None:
+        server: MockSheetsServer = self.server
+        self.rfile.read(int(self.headers['Content-Length']))
+        with server.lock:
+            server.paths.append(self.path)
+            status: int = server.statuses.pop(0) if server.statuses else 200
+            if status != DROP_CONNECTION:
+                server.in_flight += 1
+                server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        if status == DROP_CONNECTION:
+            self.close_connection = True
+            return
+
+        time.sleep(server.latency)
+        with server.lock:
+            server.in_flight -= 1
+
+        body: bytes = json.dumps(
+            {'totalUpdatedCells': 0} if status == 200 else {'error': {'code': status, 'message': 'mock error'}}
+        ).encode()
+        self.send_response(status)
+        if status != 200 and server.retry_after is not None:
+            self.send_header('Retry-After', server.retry_after)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+class FlakyHttp(httplib2.Http):
+    """
+    HTTP session whose first requests fail before reaching the server, such as on a failed TLS handshake.
+
+    Attributes:
+        failures (list): The errors raised by the next requests, in order.
+    """
+    def __init__(self, failures: list) -> None:
+        super().__init__()
+        self.failures: list = failures
+
+    def request(self, *args, **kwargs):
+        if self.failures:
+            raise self.failures.pop(0)
+        return super().request(*args, **kwargs)
+
+@pytest.fixture
+def server():
+    server = MockSheetsServer()
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.01}, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def service(server) -> Resource:
+    return build(
+        'sheets', 'v4', http=httplib2.Http(), static_discovery=True, client_options={'api_endpoint': server.url}
+    )
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(sheets_upload, 'BACKOFF_SECONDS', 0.01)
+
+def _update(service: Resource, spreadsheet_id: str = 'spreadsheet'):
+    return service.spreadsheets().values().batchUpdate(
+        spreadsheetId=spreadsheet_id, body={'valueInputOption': 'USER_ENTERED', 'data': []}
+    )
+
+@pytest.mark.parametrize('status', sorted(sheets_upload.RETRY_STATUSES))
+def test_retries_rate_limit_and_server_errors(server, service, status):
+    server.statuses = [status, status]
+
+    with SheetsUploader(requests_per_minute=REQUESTS_PER_MINUTE) as uploader:
+        assert uploader.execute(_update(service)) == {'totalUpdatedCells': 0}
+    assert len(server.paths) == 3
+
+@pytest.mark.parametrize('status', [400, 401, 403, 404])
+def test_does_not_retry_client_errors(server, service, status):
+    server.statuses = [status]
+
+    with SheetsUploader(requests_per_minute=REQUESTS_PER_MINUTE) as uploader:
+        with pytest.raises(HttpError) as error:
+            uploader.execute(_update(service))
+    assert error.value.resp.status == status
+    assert len(server.paths) == 1
+
+def test_gives_up_after_max_retries(server, service):
+    server.statuses = [503] * 10
+
+    with SheetsUploader(requests_per_minute=REQUESTS_PER_MINUTE, max_retries=2) as uploader:
+        with pytest.raises(HttpError):
+            uploader.execute(_update(service))
+    assert len(server.paths) == 3
+
+def test_retries_dropped_connections(server, service):
+    server.statuses = [DROP_CONNECTION] * 3
+
+    with SheetsUploader(requests_per_minute=REQUESTS_PER_MINUTE) as uploader:
+        assert uploader.execute(_update(service)) == {'totalUpdatedCells': 0}
+    assert len(server.paths) == 4
+
+@pytest.mark.parametrize('error', [
+    ssl.SSLError('handshake failed'),
+    httplib2.ServerNotFoundError('Unable to find the server'),
+    TimeoutError('timed out'),
+])
+def test_retries_failures_before_the_server_answers(server, service, error):
+    http = FlakyHttp([error, error])
+
+    with SheetsUploader(lambda: http, requests_per_minute=REQUESTS_PER_MINUTE) as uploader:
+        assert uploader.execute(_update(service)) == {'totalUpdatedCells': 0}
+    assert http.failures == []
+    assert len(server.paths) == 1
+
+def test_honours_retry_after(server, service):
+    server.statuses = [429]
+    server.retry_after = '0.5'
+
+    start = time.perf_counter()
+    with SheetsUploader(requests_per_minute=REQUESTS_PER_MINUTE) as uploader:
+        uploader.execute(_update(service))
+    assert time.perf_counter() - start >= 0.5
+    assert len(server.paths) == 2
+
+def test_syncs_spreadsheets_concurrently(server, service, sample_inputs, tmp_path):
+    server.latency = LATENCY_SECONDS
+    df = wrangle_data(sample_inputs, max_workers=1, cache_dir=None, ledger_dir=None)
+    spreadsheet_ids = [f'member{index}' for index in range(4)]
+
+    with SheetsUploader(httplib2.Http, len(spreadsheet_ids), REQUESTS_PER_MINUTE) as uploader:
+        sync_spreadsheets(service, {spreadsheet_id: df for spreadsheet_id in spreadsheet_ids}, uploader, str(tmp_path))
+
+    # Each spreadsheet sends a batchClear and a batchUpdate, and as many requests as workers are in flight at once
+    assert sorted(path.split('/')[3] for path in server.paths) == sorted(spreadsheet_ids * 2)
+    assert server.max_in_flight == len(spreadsheet_ids)
+    assert sorted(os.listdir(tmp_path)) == sorted(f'{spreadsheet_id}.npz' for spreadsheet_id in spreadsheet_ids)
+
+def test_retried_requests_share_the_budget(server, service):
+    server.statuses = [503]
+
+    with SheetsUploader(requests_per_minute=60) as uploader:
+        uploader.execute(_update(service))
+
+        # The retry took a second slot of the budget, so only 58 requests remain without waiting
+        assert uploader._budget._tokens < 59
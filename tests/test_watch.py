@@ -0,0 +1,107 @@
+import json
+import os
+import shutil
+import pytest
+import watch
+
+from conftest import sample_path
+from ledger import read_ledger
+from project_enums import Bank
+from summary import read_summary
+from typing import List
+
+# Options of `wrangle_data` that keep the tests from caching exports or starting a process pool
+WRANGLE_OPTIONS: dict = {'cache_dir': None, 'max_workers': 1}
+
+# Categories of the sample SoFi export
+SOFI_CATEGORIES: List[str] = ['INCOME', 'UTILITIES']
+
+# Transactions of the sample SoFi export
+SOFI_TRANSACTIONS: int = 4
+
+def _fail_once(monkeypatch, name: str, error: BaseException) -> None:
+    """
+    Makes the first call of a function used by the watcher raise, and later calls run it.
+
+    Args:
+        name (str): The name of the function in the `watch` module.
+        error (BaseException): The error raised by the first call.
+    """
+    function = getattr(watch, name)
+    calls: List[int] = []
+
+    def fail_once(*args, **kwargs):
+        calls.append(1)
+        if len(calls) == 1:
+            raise error
+        return function(*args, **kwargs)
+
+    monkeypatch.setattr(watch, name, fail_once)
+
+@pytest.fixture
+def inbox(tmp_path) -> str:
+    """
+    Returns:
+        str: An inbox directory holding a copy of the sample SoFi export as 'sofi.csv'.
+    """
+    inbox_dir = tmp_path / 'inbox'
+    inbox_dir.mkdir()
+    shutil.copy(sample_path(Bank.SOFI), inbox_dir / 'sofi.csv')
+    return str(inbox_dir)
+
+@pytest.fixture
+def paths(tmp_path) -> dict:
+    """
+    Returns:
+        dict: The ledger directory and checkpoint file of the watcher, under the test's directory.
+    """
+    return {'ledger_dir': str(tmp_path / 'ledger'), 'checkpoint_path': str(tmp_path / 'checkpoint.json')}
+
+def _checkpoint(paths: dict) -> dict:
+    """
+    Returns:
+        dict: The checkpoint the watcher wrote.
+    """
+    with open(paths['checkpoint_path']) as file:
+        return json.load(file)
+
+def test_unavailable_export_is_retried(inbox, paths, monkeypatch):
+    _fail_once(monkeypatch, 'append_ledger', PermissionError('ledger is locked'))
+
+    watch.watch_inbox(inbox, once=True, **paths, **WRANGLE_OPTIONS)
+    assert 'sofi.csv' not in _checkpoint(paths)['files']
+
+    watch.watch_inbox(inbox, once=True, **paths, **WRANGLE_OPTIONS)
+    assert 'sofi.csv' in _checkpoint(paths)['files']
+    assert len(read_ledger(paths['ledger_dir'])) == SOFI_TRANSACTIONS
+
+def test_malformed_export_is_not_retried(inbox, paths):
+    # A SoFi header recognizes the bank, while the amount of its row cannot be parsed
+    with open(sample_path(Bank.SOFI)) as file:
+        header: str = file.readline()
+    with open(os.path.join(inbox, 'sofi.csv'), 'w') as file:
+        file.write(header + '2024-09-30,Interest earned,Interest Earned,twenty,2114.11,Posted\n')
+
+    watch.watch_inbox(inbox, once=True, **paths, **WRANGLE_OPTIONS)
+
+    assert 'sofi.csv' in _checkpoint(paths)['files']
+    assert _checkpoint(paths)['pending'] == []
+
+def test_interrupted_import_is_completed_on_restart(inbox, paths, monkeypatch):
+    synced: List[List[str]] = []
+
+    # The watcher dies once the transactions are in the ledger, before they were summarized
+    _fail_once(monkeypatch, 'update_summary', KeyboardInterrupt())
+    with pytest.raises(KeyboardInterrupt):
+        watch.watch_inbox(inbox, once=True, **paths, **WRANGLE_OPTIONS)
+    assert _checkpoint(paths)['pending'] == SOFI_CATEGORIES
+
+    # The restart adds no transactions, yet summarizes them and syncs their tabs
+    def sync(df, categories):
+        synced.append(categories)
+    watch.watch_inbox(inbox, sync, once=True, **paths, **WRANGLE_OPTIONS)
+
+    assert len(read_ledger(paths['ledger_dir'])) == SOFI_TRANSACTIONS
+    assert sorted(read_summary(paths['ledger_dir'])['Category'].astype(str).unique()) == SOFI_CATEGORIES
+    assert synced == [SOFI_CATEGORIES]
+    assert _checkpoint(paths)['pending'] == []